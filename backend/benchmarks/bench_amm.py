@@ -0,0 +1,121 @@
+"""Pool mirror benchmark.
+
+Mirrors a set of v2 and v3 pools, then measures single quotes, vectorized
+what-if sweeps over many trade sizes, and applying a block's worth of
+Sync/Swap logs.
+
+    python -m benchmarks.bench_amm --pools 200 --sizes 1000
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+import numpy as np
+
+from src.hft.amm import Q96, SWAP_V3_TOPIC, SYNC_TOPIC, PoolMirror, V2Pool, V3Pool
+from src.hft.decoder import WETH
+
+def address() -> str:
+    return "0x" + os.urandom(20).hex()
+
+def word(value: int) -> str:
+    return (value % (1 << 256)).to_bytes(32, "big").hex()
+
+def build_mirror(pools: int, rng: random.Random):
+    mirror = PoolMirror()
+    tokens = [address() for _ in range(max(pools // 2, 1))]
+    for i in range(pools):
+        token = tokens[i % len(tokens)]
+        if i % 2:
+            mirror.add_pool(V3Pool(
+                address(), token, WETH, fee=500,
+                sqrt_price_x96=int(Q96 * rng.uniform(0.01, 0.1)),
+                liquidity=rng.randrange(10 ** 20, 10 ** 22),
+                tick=-40000
+            ))
+        else:
+            mirror.add_pool(V2Pool(
+                address(), token, WETH,
+                reserve0=rng.randrange(10 ** 24, 10 ** 26),
+                reserve1=rng.randrange(10 ** 21, 10 ** 23)
+            ))
+    return mirror, tokens
+
+def block_logs(mirror: PoolMirror, count: int, rng: random.Random):
+    pools = list(mirror.pools.values())
+    logs = []
+    for _ in range(count):
+        pool = rng.choice(pools)
+        if pool.kind == "v2":
+            data = word(rng.randrange(10 ** 24, 10 ** 26)) + word(rng.randrange(10 ** 21, 10 ** 23))
+            topic = SYNC_TOPIC
+        else:
+            data = (word(10 ** 18) + word(-(10 ** 15)) + word(int(Q96 * rng.uniform(0.01, 0.1)))
+                    + word(rng.randrange(10 ** 20, 10 ** 22)) + word(-40000))
+            topic = SWAP_V3_TOPIC
+        logs.append({"address": pool.address, "topics": [topic], "data": "0x" + data, "blockNumber": "0x1"})
+    return logs
+
+def per_call_us(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pools", type=int, default=200)
+    parser.add_argument("--sizes", type=int, default=1000)
+    parser.add_argument("--logs", type=int, default=500, help="Sync/Swap logs per block")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    mirror, tokens = build_mirror(args.pools, rng)
+    token = tokens[0]
+    v2 = next(pool for pool in mirror.pools.values() if pool.kind == "v2")
+    v3 = next(pool for pool in mirror.pools.values() if pool.kind == "v3")
+    amount = 10 ** 18
+    sizes = np.linspace(1e16, 1e20, args.sizes)
+
+    # Vectorized sweep versus quoting each size separately
+    started = time.perf_counter()
+    for _ in range(100):
+        mirror.quote_sizes(WETH, token, sizes)
+    batched = (time.perf_counter() - started) / 100
+    started = time.perf_counter()
+    for size in sizes:
+        mirror.quote(WETH, token, int(size))
+    looped = time.perf_counter() - started
+
+    logs = block_logs(mirror, args.logs, rng)
+    started = time.perf_counter()
+    for _ in range(20):
+        mirror.apply_logs(logs)
+    apply_block = (time.perf_counter() - started) / 20
+
+    print(json.dumps({
+        "pools": args.pools,
+        "quote_us": {
+            "v2": per_call_us(lambda: v2.quote(amount, False), args.iterations),
+            "v3": per_call_us(lambda: v3.quote(amount, False), args.iterations),
+            "best_of_pair": per_call_us(lambda: mirror.quote(WETH, token, amount), args.iterations),
+            "price": per_call_us(lambda: mirror.price(token), args.iterations)
+        },
+        "what_if": {
+            "sizes": args.sizes,
+            "batched_ms": batched * 1000,
+            "looped_ms": looped * 1000,
+            "per_size_us": batched / args.sizes * 1e6
+        },
+        "apply_logs": {
+            "logs": args.logs,
+            "block_ms": apply_block * 1000,
+            "per_log_us": apply_block / args.logs * 1e6
+        }
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
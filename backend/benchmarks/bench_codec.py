@@ -0,0 +1,116 @@
+"""WebSocket wire encoding benchmark.
+
+Encodes representative trade, position and analysis messages with every
+``Encoding`` and reports bytes on the wire (raw and after raw-deflate, as
+permessage-deflate would send them) and encode CPU per message.
+
+    python -m benchmarks.bench_codec --iterations 20000
+"""
+import argparse
+import json
+import time
+import zlib
+
+from src.websocket.codec import EncodedMessage, Encoding, encode
+from src.websocket.server import WebSocketManager as AnalysisManager
+
+def trade_message() -> dict:
+    return {
+        "type": "trade_update",
+        "data": {
+            "id": 184467,
+            "token_symbol": "ETH",
+            "amount": 1.25,
+            "price": 1843.17,
+            "type": "buy",
+            "status": "executed"
+        },
+        "timestamp": time.time()
+    }
+
+def position_message(positions: int = 20) -> dict:
+    return {
+        "type": "position_updates",
+        "data": [
+            {
+                "id": 5000 + i,
+                "token_symbol": "ETH",
+                "amount": 0.5 + i,
+                "entry_price": 1800.0 + i,
+                "current_price": 1843.17,
+                "pnl": 21.585 * (i + 1),
+                "status": "open"
+            }
+            for i in range(positions)
+        ],
+        "timestamp": time.time()
+    }
+
+def analysis_message() -> dict:
+    manager = AnalysisManager()
+    return {
+        "type": "analysis",
+        "symbol": "ETH",
+        "version": 1,
+        "analysis": manager._build_analysis("ETH")
+    }
+
+def deflated(frame) -> int:
+    data = frame.encode() if isinstance(frame, str) else frame
+    compressor = zlib.compressobj(wbits=-15)
+    return len(compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH))
+
+def measure(message: dict, encoding: Encoding, iterations: int) -> dict:
+    frame = encode(message, encoding)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        encode(message, encoding)
+    elapsed = time.perf_counter() - started
+    return {
+        "bytes": len(frame.encode() if isinstance(frame, str) else frame),
+        "deflate_bytes": deflated(frame),
+        "encode_us": elapsed / iterations * 1e6
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--recipients", type=int, default=1000)
+    args = parser.parse_args()
+
+    messages = {
+        "trade": trade_message(),
+        "position_batch": position_message(),
+        "analysis": analysis_message()
+    }
+    results = {
+        name: {encoding.value: measure(message, encoding, args.iterations) for encoding in Encoding}
+        for name, message in messages.items()
+    }
+
+    # Fan-out to a mixed audience: the cache encodes once per encoding, not per recipient
+    encodings = [Encoding.JSON, Encoding.MSGPACK] * (args.recipients // 2)
+    started = time.perf_counter()
+    for _ in range(100):
+        encoded = EncodedMessage(messages["trade"])
+        for encoding in encodings:
+            encoded.frame(encoding)
+    cached = (time.perf_counter() - started) / 100
+    started = time.perf_counter()
+    for _ in range(10):
+        for encoding in encodings:
+            encode(messages["trade"], encoding)
+    uncached = (time.perf_counter() - started) / 10
+
+    print(json.dumps({
+        "iterations": args.iterations,
+        "messages": results,
+        "fanout": {
+            "recipients": len(encodings),
+            "cached_ms": cached * 1000,
+            "encode_per_recipient_ms": uncached * 1000
+        }
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
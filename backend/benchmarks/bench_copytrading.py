@@ -0,0 +1,103 @@
+"""Copy-trading fan-out benchmark.
+
+Replicates leader fills to N followers with randomized allocations, caps
+and slippage limits. Order groups are "submitted" with a simulated
+per-group round-trip. Reports the time from the leader fill to the last
+follower order submitted, plus the bulk trade hand-off and position-update
+fan-out after it.
+
+    python -m benchmarks.bench_copytrading --followers 10000 --fills 50 --submit-latency-ms 20
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import numpy as np
+
+from src.copytrading.engine import CopyTradingEngine
+from src.utils.metrics import Histogram
+
+class TradeSink:
+    """Stands in for the write-behind writer: JSON-encodes rows like its journal does"""
+
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+
+    def submit_trades(self, trades):
+        self.rows += len(trades)
+        self.bytes += sum(len(json.dumps(trade, separators=(",", ":"))) for trade in trades)
+        return True
+
+class Broadcasts:
+    def __init__(self):
+        self.count = 0
+
+    async def broadcast(self, message, channel=None, client_id=None, coalesce_key=None, local=False):
+        self.count += 1
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--followers", type=int, default=10_000)
+    parser.add_argument("--fills", type=int, default=50, help="leader fills, alternating buy and sell")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--submit-latency-ms", type=float, default=20.0, help="simulated round-trip per order group")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+
+    async def submit_batch(trade, orders):
+        await asyncio.sleep(args.submit_latency_ms / 1000)
+        return np.full(len(orders), float(trade["price"]))
+
+    sink, broadcasts = TradeSink(), Broadcasts()
+    engine = CopyTradingEngine(
+        submit_batch=submit_batch, persistence=sink, manager=broadcasts,
+        batch_size=args.batch_size, concurrency=args.concurrency
+    )
+    for i in range(args.followers):
+        engine.follow(
+            "leader", f"follower-{i}", rng.uniform(0.01, 2.0),
+            max_trade_value=rng.choice([None, 500.0, 5_000.0]),
+            max_exposure=rng.choice([None, 20_000.0]),
+            max_slippage=rng.choice([0.5, 1.0, 3.0])
+        )
+
+    async def run():
+        submit, total = Histogram(), Histogram()
+        runs = []
+        for i in range(args.fills):
+            trade = {
+                "user_id": "leader", "token_symbol": "ETH", "token_address": "ETH",
+                "amount": 1.0, "price": 1800.0 + rng.uniform(-5, 5),
+                "type": "buy" if i % 2 == 0 else "sell", "status": "executed", "tx_hash": f"0x{i:064x}"
+            }
+            started = time.perf_counter()
+            result = await engine.on_leader_fill("leader", trade)
+            total.observe(time.perf_counter() - started)
+            submit.observe((result["scale_ms"] + result["submit_ms"]) / 1000)
+            runs.append(result)
+        return submit, total, runs
+
+    submit, total, runs = asyncio.run(run())
+    print(json.dumps({
+        "followers": args.followers,
+        "fills": args.fills,
+        "batch_size": args.batch_size,
+        "concurrency": args.concurrency,
+        "submit_latency_ms": args.submit_latency_ms,
+        "orders": engine.stats["orders"],
+        "filled": engine.stats["filled"],
+        "fill_to_last_submit": submit.as_dict(),
+        "fill_to_recorded": total.as_dict(),
+        "scale_ms_mean": sum(run["scale_ms"] for run in runs) / len(runs),
+        "record_ms_mean": sum(run["record_ms"] for run in runs) / len(runs),
+        "trade_rows": sink.rows,
+        "position_updates": broadcasts.count
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
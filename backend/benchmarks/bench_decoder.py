@@ -0,0 +1,66 @@
+"""Swap classifier throughput over a corpus of pending blocks.
+
+    python -m benchmarks.bench_decoder                       # synthetic corpus
+    python -m benchmarks.bench_decoder --corpus pending.jsonl
+    python -m benchmarks.bench_decoder --record http://localhost:8545 --corpus pending.jsonl --blocks 50
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+
+from benchmarks.corpus import read_corpus, record, synthesize
+from src.hft.decoder import SwapDecoder
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="JSON-lines file of pending blocks")
+    parser.add_argument("--record", metavar="RPC_URL", help="record --blocks pending blocks into --corpus first")
+    parser.add_argument("--blocks", type=int, default=20)
+    parser.add_argument("--txs-per-block", type=int, default=5000)
+    parser.add_argument("--swap-ratio", type=float, default=0.15)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.record:
+        if not args.corpus:
+            parser.error("--record needs --corpus")
+        asyncio.run(record(args.record, args.corpus, args.blocks))
+
+    if args.corpus:
+        blocks = list(read_corpus(args.corpus))
+    else:
+        blocks = synthesize(args.blocks, args.txs_per_block, args.swap_ratio)
+    transactions = [tx for block in blocks for tx in block.get("transactions", [])]
+
+    decoder = SwapDecoder()
+    functions = Counter()
+    best = None
+    for _ in range(args.rounds):
+        started = time.perf_counter()
+        decoded = [decoder.classify(tx) for tx in transactions]
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    for swap in decoded:
+        if swap is not None:
+            functions[swap.function] += 1
+
+    # Cost of rejecting irrelevant transactions on their own
+    irrelevant = [tx for tx, swap in zip(transactions, decoded) if swap is None]
+    started = time.perf_counter()
+    for tx in irrelevant:
+        decoder.classify(tx)
+    reject = time.perf_counter() - started
+
+    print(json.dumps({
+        "transactions": len(transactions),
+        "swaps_decoded": sum(functions.values()),
+        "functions": dict(functions),
+        "classify_tx_per_s": len(transactions) / best,
+        "classify_us_per_tx": best / len(transactions) * 1e6,
+        "reject_us_per_tx": reject / max(len(irrelevant), 1) * 1e6
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
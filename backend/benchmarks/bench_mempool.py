@@ -0,0 +1,74 @@
+"""Mempool ingestion benchmark against the stub RPC node.
+
+Runs MempoolIngestor against an in-process StubNode producing pending
+transactions at a fixed rate and reports per-stage latency and event-loop
+responsiveness while ingesting.
+
+    python -m benchmarks.bench_mempool --tx-rate 5000 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.stub_rpc import StubNode
+from src.hft.mempool import MempoolIngestor
+from src.hft.rpc import JsonRpcClient
+
+async def measure_loop_lag(samples: list, interval: float = 0.01):
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append((time.perf_counter() - started - interval) * 1000)
+
+async def run(args) -> dict:
+    node = StubNode(tx_rate=args.tx_rate, latency=args.rpc_latency / 1000)
+    url = await node.start(port=args.port)
+    rpc = JsonRpcClient(url)
+
+    async def analyzer(tx):
+        # Stand-in for opportunity analysis
+        return int(tx["value"], 16) > 0
+
+    ingestor = MempoolIngestor(
+        rpc,
+        analyzer,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        poll_interval=args.poll_interval / 1000
+    )
+    lag: list = []
+    lag_task = asyncio.create_task(measure_loop_lag(lag))
+    runner = asyncio.create_task(ingestor.run())
+    await asyncio.sleep(args.duration)
+    await ingestor.stop()
+    await runner
+    lag_task.cancel()
+    await rpc.close()
+    await node.stop()
+
+    metrics = ingestor.get_metrics()
+    lag.sort()
+    metrics["loop_lag_ms"] = {
+        "p50": lag[len(lag) // 2] if lag else 0.0,
+        "p99": lag[int(len(lag) * 0.99)] if lag else 0.0,
+        "max": lag[-1] if lag else 0.0
+    }
+    metrics["analyzed_per_s"] = metrics["counters"]["analyzed"] / args.duration
+    metrics["rpc_requests"] = node.requests
+    return metrics
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tx-rate", type=float, default=2000.0)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--poll-interval", type=float, default=50.0, help="ms")
+    parser.add_argument("--rpc-latency", type=float, default=0.0, help="ms added per RPC request")
+    parser.add_argument("--port", type=int, default=18545)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
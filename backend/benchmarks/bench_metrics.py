@@ -0,0 +1,62 @@
+"""Instrumentation overhead benchmark.
+
+Measures the per-sample cost of histogram observations, counter increments
+and timers against an empty loop, plus the cost of rendering /metrics.
+
+    python -m benchmarks.bench_metrics --samples 1000000
+"""
+import argparse
+import json
+import random
+import time
+
+from src.utils.metrics import MetricsRegistry
+
+def per_sample_ns(fn, values) -> float:
+    started = time.perf_counter()
+    for value in values:
+        fn(value)
+    return (time.perf_counter() - started) / len(values) * 1e9
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    values = [rng.lognormvariate(-7, 1.5) for _ in range(args.samples)]
+    registry = MetricsRegistry()
+    histogram = registry.histogram("bench_seconds", "Benchmark latency")
+    counter = registry.counter("bench_total", "Benchmark events", labels=("channel",)).labels("trades")
+
+    def noop(value):
+        pass
+
+    baseline = per_sample_ns(noop, values)
+    observe = per_sample_ns(histogram.observe, values)
+    inc = per_sample_ns(lambda value: counter.inc(), values)
+    latency = histogram.as_dict()
+
+    started = time.perf_counter()
+    for _ in range(len(values) // 10):
+        with histogram.time():
+            pass
+    timer = (time.perf_counter() - started) / (len(values) // 10) * 1e9
+
+    started = time.perf_counter()
+    rendered = registry.render()
+    render_ms = (time.perf_counter() - started) * 1000
+
+    print(json.dumps({
+        "samples": args.samples,
+        "call_baseline_ns": baseline,
+        "observe_ns": observe - baseline,
+        "counter_inc_ns": inc - baseline,
+        "timer_ns": timer,
+        "render_ms": render_ms,
+        "render_bytes": len(rendered),
+        "latency": latency
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Pending-transaction corpora for benchmarks.
+
+A corpus is a JSON-lines file with one pending block per line, in the same
+shape ``eth_getBlockByNumber("pending", true)`` returns. Corpora can be
+recorded from a node or synthesized with a realistic share of router swaps.
+"""
+import asyncio
+import json
+import os
+import random
+from typing import Dict, Iterator, List
+
+from eth_abi import encode
+from eth_utils import function_signature_to_4byte_selector
+
+from src.hft.decoder import KNOWN_ROUTERS, WETH
+from src.hft.rpc import JsonRpcClient
+
+TOKENS = [
+    WETH,
+    "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48",  # USDC
+    "0xdac17f958d2ee523a2206206994597c13d831ec7",  # USDT
+    "0x6b175474e89094c44da98b954eedeac495271d0f",  # DAI
+    "0x2260fac5e5542a773aa44fbcfedf7c193bc2c599",  # WBTC
+]
+
+V2_SWAP = "swapExactTokensForTokens(uint256,uint256,address[],address,uint256)"
+V2_ETH_SWAP = "swapExactETHForTokens(uint256,address[],address,uint256)"
+V3_SINGLE = "exactInputSingle((address,address,uint24,address,uint256,uint256,uint256,uint160))"
+TRANSFER = "transfer(address,uint256)"
+
+def _hex(nbytes: int) -> str:
+    return "0x" + os.urandom(nbytes).hex()
+
+def _calldata(signature: str, types: List[str], values: list) -> str:
+    return "0x" + (function_signature_to_4byte_selector(signature) + encode(types, values)).hex()
+
+def synthetic_transaction(rng: random.Random, swap_ratio: float = 0.15) -> Dict:
+    """A pending transaction; ``swap_ratio`` of them are router swaps"""
+    tx = {
+        "hash": _hex(32),
+        "from": _hex(20),
+        "value": "0x0",
+        "gas": hex(rng.randrange(21000, 500000)),
+        "gasPrice": hex(rng.randrange(10 ** 9, 10 ** 11)),
+        "nonce": hex(rng.randrange(1000))
+    }
+    roll = rng.random()
+    token_in, token_out = rng.sample(TOKENS, 2)
+    amount = rng.randrange(10 ** 15, 10 ** 21)
+    if roll < swap_ratio * 0.5:
+        tx["to"] = "0x7a250d5630b4cf539739df2c5dacb4c659f2488d"
+        tx["input"] = _calldata(
+            V2_SWAP,
+            ["uint256", "uint256", "address[]", "address", "uint256"],
+            [amount, amount // 2, [token_in, token_out], tx["from"], 2 ** 32]
+        )
+    elif roll < swap_ratio * 0.75:
+        tx["to"] = "0x7a250d5630b4cf539739df2c5dacb4c659f2488d"
+        tx["value"] = hex(amount)
+        tx["input"] = _calldata(
+            V2_ETH_SWAP,
+            ["uint256", "address[]", "address", "uint256"],
+            [amount // 2, [WETH, token_out], tx["from"], 2 ** 32]
+        )
+    elif roll < swap_ratio:
+        tx["to"] = "0xe592427a0aece92de3edee1f18e0157c05861564"
+        tx["input"] = _calldata(
+            V3_SINGLE,
+            ["(address,address,uint24,address,uint256,uint256,uint256,uint160)"],
+            [(token_in, token_out, 3000, tx["from"], 2 ** 32, amount, amount // 2, 0)]
+        )
+    elif roll < swap_ratio + 0.05:
+        # Router call we do not decode (e.g. liquidity management)
+        tx["to"] = rng.choice(list(KNOWN_ROUTERS))
+        tx["input"] = "0xe8e33700" + os.urandom(64).hex()
+    elif roll < 0.6:
+        tx["to"] = rng.choice(TOKENS)
+        tx["input"] = _calldata(TRANSFER, ["address", "uint256"], [_hex(20), amount])
+    else:
+        tx["to"] = _hex(20)
+        tx["input"] = "0x"
+        tx["value"] = hex(amount)
+    return tx
+
+def synthesize(blocks: int, txs_per_block: int, swap_ratio: float = 0.15, seed: int = 1) -> List[Dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "number": hex(n),
+            "transactions": [synthetic_transaction(rng, swap_ratio) for _ in range(txs_per_block)]
+        }
+        for n in range(blocks)
+    ]
+
+def read_corpus(path: str) -> Iterator[Dict]:
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def write_corpus(path: str, blocks: List[Dict]):
+    with open(path, "w") as f:
+        for block in blocks:
+            f.write(json.dumps(block, separators=(",", ":")) + "\n")
+
+async def record(url: str, path: str, blocks: int, interval: float = 1.0):
+    """Record ``blocks`` pending-block snapshots from a node"""
+    rpc = JsonRpcClient(url, timeout=30)
+    try:
+        with open(path, "w") as f:
+            for _ in range(blocks):
+                block = await rpc.call("eth_getBlockByNumber", ["pending", True])
+                if block:
+                    f.write(json.dumps(block, separators=(",", ":")) + "\n")
+                await asyncio.sleep(interval)
+    finally:
+        await rpc.close()
@@ -0,0 +1,508 @@
+"""WebSocket and REST load test.
+
+Serves the FastAPI app (in-process, or under uvicorn in a subprocess),
+connects thousands of simulated clients to ``/ws/{client_id}`` and
+``/ws/analysis/{symbol}`` from worker processes, drives
+``broadcast_trade_update`` / ``broadcast_position_update`` at a target rate
+(with a price tick per update into the analysis feed, for an in-process
+server) and hammers REST endpoints at the same time. The JSON report has delivery
+latency percentiles, throughput, server memory per connection and CPU, and
+the commit it ran on, so runs can be compared across commits. A run whose
+broadcasts reached no client exits with an error.
+
+    python -m benchmarks.loadtest --clients 5000 --analysis-clients 1000 --rate 500 --duration 30 --out load.json
+    python -m benchmarks.loadtest --server uvicorn --workers 4 --redis-url redis://localhost:6379/0
+
+Under ``--server uvicorn`` broadcasts reach the server workers through the
+Redis broker, so ``--redis-url`` is required. Memory and CPU are read from
+``/proc`` (Linux).
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import aiohttp
+import msgpack
+
+from src.utils.metrics import Histogram
+
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """``trades=0.7,positions=0.3`` -> normalized weights"""
+    weights = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    total = sum(weights.values())
+    return {name: weight / total for name, weight in weights.items()}
+
+class ProcessSampler:
+    """CPU time and RSS of a set of processes, from /proc"""
+
+    def __init__(self, pids: List[int]):
+        self.pids = pids
+
+    def _read(self, pid: int):
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{pid}/statm") as f:
+                rss_pages = int(f.read().split()[1])
+        except OSError:
+            return 0.0, 0
+        return (int(fields[11]) + int(fields[12])) / CLK_TCK, rss_pages * PAGE_SIZE
+
+    def sample(self) -> Dict:
+        readings = [self._read(pid) for pid in self.pids]
+        return {
+            "time": time.monotonic(),
+            "cpu_seconds": sum(cpu for cpu, _ in readings),
+            "rss_bytes": sum(rss for _, rss in readings)
+        }
+
+def _child_pids(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+def _sent_timestamps(message: Dict) -> List:
+    """When the updates in a frame were broadcast. A coalesced batch carries each
+    update's own timestamp in its items; the frame's timestamp is the flush time"""
+    data = message.get("data")
+    if isinstance(data, list) and data and all(isinstance(item, dict) and "timestamp" in item for item in data):
+        return [item["timestamp"] for item in data]
+    return [message.get("timestamp")]
+
+def _received_at_latency(timestamp, now: float) -> Optional[float]:
+    if isinstance(timestamp, int):
+        return now - timestamp / 1000
+    if isinstance(timestamp, str):
+        sent = datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).timestamp()
+        return now - sent
+    return None
+
+async def _run_clients(spec: Dict, ready, stop) -> Dict:
+    raise_fd_limit()
+    latency: Dict[str, Histogram] = {}
+    counts = {"connected": 0, "failed": 0, "messages": 0, "bytes": 0, "closed": 0}
+    # Updates received per message type; a batched frame counts each of its items
+    updates: Dict[str, int] = {}
+    connect_latency = Histogram()
+    session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=0),
+        timeout=aiohttp.ClientTimeout(total=None, connect=30)
+    )
+    semaphore = asyncio.Semaphore(spec["connect_concurrency"])
+    sockets = []
+
+    async def connect(path: str):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                ws = await session.ws_connect(spec["base_url"] + path, autoping=True, max_msg_size=0)
+            except Exception:
+                counts["failed"] += 1
+                return None
+            connect_latency.observe(time.perf_counter() - started)
+            counts["connected"] += 1
+            sockets.append(ws)
+            return ws
+
+    async def read(ws):
+        async for frame in ws:
+            now = time.time()
+            if frame.type == aiohttp.WSMsgType.TEXT:
+                counts["bytes"] += len(frame.data)
+                message = json.loads(frame.data)
+            elif frame.type == aiohttp.WSMsgType.BINARY:
+                counts["bytes"] += len(frame.data)
+                message = msgpack.unpackb(frame.data, raw=False)
+            else:
+                break
+            counts["messages"] += 1
+            kind = message.get("type", "unknown")
+            histogram = latency.get(kind)
+            if histogram is None:
+                histogram = latency[kind] = Histogram()
+            timestamps = _sent_timestamps(message)
+            updates[kind] = updates.get(kind, 0) + len(timestamps)
+            for timestamp in timestamps:
+                seconds = _received_at_latency(timestamp, now)
+                if seconds is not None:
+                    histogram.observe(max(seconds, 0.0))
+        counts["closed"] += 1
+
+    paths = spec["paths"]
+    connections = await asyncio.gather(*(connect(path) for path in paths))
+    readers = [asyncio.create_task(read(ws)) for ws in connections if ws is not None]
+    ready.put(spec["worker"])
+    # Block on the stop event without stalling the readers
+    await asyncio.get_running_loop().run_in_executor(None, stop.wait)
+
+    for ws in sockets:
+        await ws.close()
+    for reader in readers:
+        reader.cancel()
+    await asyncio.gather(*readers, return_exceptions=True)
+    await session.close()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return {
+        "counts": counts,
+        "updates": updates,
+        "latency": latency,
+        "connect_latency": connect_latency,
+        "cpu_seconds": usage.ru_utime + usage.ru_stime
+    }
+
+def client_worker(spec: Dict, ready, stop, results):
+    results.put(asyncio.run(_run_clients(spec, ready, stop)))
+
+async def _run_rest(spec: Dict, ready, stop) -> Dict:
+    latency = {endpoint: Histogram() for endpoint in spec["endpoints"]}
+    counts = {endpoint: {"requests": 0, "errors": 0} for endpoint in spec["endpoints"]}
+    ready.put("rest")
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=spec["concurrency"])) as session:
+        async def hammer(index: int):
+            endpoints = spec["endpoints"]
+            while not stop.is_set():
+                endpoint = endpoints[index % len(endpoints)]
+                index += 1
+                started = time.perf_counter()
+                try:
+                    async with session.get(spec["base_url"] + endpoint) as response:
+                        await response.read()
+                        if response.status >= 400:
+                            counts[endpoint]["errors"] += 1
+                except Exception:
+                    counts[endpoint]["errors"] += 1
+                latency[endpoint].observe(time.perf_counter() - started)
+                counts[endpoint]["requests"] += 1
+
+        await asyncio.gather(*(hammer(i) for i in range(spec["concurrency"])))
+    return {"counts": counts, "latency": latency}
+
+def rest_worker(spec: Dict, ready, stop, results):
+    results.put(asyncio.run(_run_rest(spec, ready, stop)))
+
+def client_channels(args, mix: Dict[str, float], symbols: List[str]) -> List[str]:
+    """The channel each ``/ws/lt-{index}`` client subscribes to, by index"""
+    rng = random.Random(0)
+    names, weights = list(mix), list(mix.values())
+    return [f"{rng.choices(names, weights=weights)[0]}.{rng.choice(symbols)}" for _ in range(args.clients)]
+
+def position_owners(channels: List[str]) -> Dict[str, List[str]]:
+    """symbol -> the clients subscribed to ``positions.<symbol>``, who position updates are sent to"""
+    owners: Dict[str, List[str]] = {}
+    for index, channel in enumerate(channels):
+        root, _, symbol = channel.partition(".")
+        if root == "positions":
+            owners.setdefault(symbol, []).append(f"lt-{index}")
+    return owners
+
+def client_paths(args, worker: int, channels: List[str], symbols: List[str]) -> List[str]:
+    query = f"encoding={args.encoding}"
+    paths = []
+    clients = range(worker, args.clients, args.client_processes)
+    for index in clients:
+        paths.append(f"/ws/lt-{index}?channels={channels[index]}&{query}")
+    analysis = range(worker, args.analysis_clients, args.client_processes)
+    for index in analysis:
+        paths.append(f"/ws/analysis/{symbols[index % len(symbols)]}?{query}")
+    return paths
+
+class Server:
+    """The app under test: in this process on this event loop, or a uvicorn subprocess"""
+
+    def __init__(self, args):
+        self.args = args
+        self.base_url = f"http://{args.host}:{args.port}"
+        self._server = None
+        self._task = None
+        self._process: Optional[subprocess.Popen] = None
+        self.manager = None
+        # The analysis feed's tick listener; only reachable when the app runs in this process
+        self.analysis = None
+
+    async def start(self):
+        if self.args.server == "inprocess":
+            import uvicorn
+            from src.main import app
+            from src.websocket.manager import manager
+            from src.websocket.server import manager as analysis_manager
+
+            config = uvicorn.Config(app, host=self.args.host, port=self.args.port, log_level="warning")
+            self._server = uvicorn.Server(config)
+            self._task = asyncio.create_task(self._server.serve())
+            while not self._server.started:
+                await asyncio.sleep(0.05)
+            self.manager = manager
+            self.analysis = analysis_manager
+            self.pids = [os.getpid()]
+            return
+
+        from src.websocket.broker import RedisBroker
+        from src.websocket.manager import WebSocketManager
+
+        env = {**os.environ, "WS_BROKER": "redis", "REDIS_URL": self.args.redis_url}
+        self._process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "src.main:app", "--host", self.args.host,
+             "--port", str(self.args.port), "--workers", str(self.args.workers), "--log-level", "warning"],
+            env=env
+        )
+        async with aiohttp.ClientSession() as session:
+            for _ in range(200):
+                try:
+                    async with session.get(self.base_url + "/health") as response:
+                        if response.status == 200:
+                            break
+                except aiohttp.ClientError:
+                    pass
+                await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn did not come up")
+        # Broadcasts are published to Redis; every server worker delivers to its own clients
+        self.manager = WebSocketManager(broker=RedisBroker(self.args.redis_url))
+        await self.manager.start()
+        self.pids = [self._process.pid] + _child_pids(self._process.pid)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.should_exit = True
+            await self._task
+        if self._process is not None:
+            await self.manager.stop()
+            self._process.terminate()
+            self._process.wait(timeout=10)
+
+async def drive_broadcasts(server: Server, args, mix: Dict[str, float], symbols: List[str],
+                           owners: Dict[str, List[str]], deadline: float) -> Dict:
+    """Trade and position updates at ``args.rate`` per second until the deadline, each
+    with a price tick for the analysis feed. Position updates go to a client that is
+    subscribed to the position's symbol"""
+    from src.models.trade import PositionStatus, TradeStatus
+
+    manager, analysis = server.manager, server.analysis
+    rng = random.Random(0)
+    sent = {"trade_update": 0, "position_update": 0, "price_tick": 0}
+    prices = {symbol: 1843.17 for symbol in symbols}
+    trade_share = mix.get("trades", 0) / ((mix.get("trades", 0) + mix.get("positions", 0)) or 1)
+    if not owners:
+        trade_share = 1.0
+    carry = 0.0
+    last = time.perf_counter()
+    sequence = 0
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.005)
+        now = time.perf_counter()
+        carry += (now - last) * args.rate
+        last = now
+        for _ in range(int(carry)):
+            sequence += 1
+            if rng.random() < trade_share:
+                symbol = rng.choice(symbols)
+                await manager.broadcast_trade_update(SimpleNamespace(
+                    id=sequence, token_symbol=symbol, amount=1.0, price=prices[symbol], type="buy",
+                    status=TradeStatus.EXECUTED
+                ))
+                sent["trade_update"] += 1
+            else:
+                symbol = rng.choice(list(owners))
+                await manager.broadcast_position_update(SimpleNamespace(
+                    id=sequence % 1000, user_id=rng.choice(owners[symbol]), token_symbol=symbol,
+                    amount=1.0, entry_price=1800.0, current_price=prices[symbol],
+                    pnl=prices[symbol] - 1800.0, status=PositionStatus.OPEN
+                ))
+                sent["position_update"] += 1
+            prices[symbol] *= 1 + rng.gauss(0, 0.001)
+            if analysis is not None:
+                analysis.on_bot_event("price", {"token": symbol, "symbol": symbol, "price": prices[symbol]})
+                sent["price_tick"] += 1
+        carry -= int(carry)
+    return sent
+
+def check_delivery(report: Dict) -> Optional[str]:
+    """Why the run measured nothing, if it did not: broadcasts went out but no client received one"""
+    sent = report["broadcast"]["sent"]
+    updates = report["delivery"]["updates"]
+    for kind, delivered_as in (("trade_update", "trade_update"), ("position_update", "position_updates")):
+        if sent[kind] and not updates.get(delivered_as):
+            return f"{sent[kind]} {kind} broadcasts were sent but none was delivered"
+    return None
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+async def run(args) -> Dict:
+    raise_fd_limit()
+    mix = parse_mix(args.channels)
+    symbols = args.symbols.split(",")
+    channels = client_channels(args, mix, symbols)
+    server = Server(args)
+    await server.start()
+    sampler = ProcessSampler(server.pids)
+    idle = sampler.sample()
+
+    context = multiprocessing.get_context("spawn")
+    ready, results, stop = context.Queue(), context.Queue(), context.Event()
+    workers = [
+        context.Process(target=client_worker, args=({
+            "worker": worker,
+            "base_url": server.base_url.replace("http", "ws", 1),
+            "paths": client_paths(args, worker, channels, symbols),
+            "connect_concurrency": args.connect_concurrency
+        }, ready, stop, results))
+        for worker in range(args.client_processes)
+    ]
+    rest = None
+    if args.rest_concurrency:
+        rest = context.Process(target=rest_worker, args=({
+            "base_url": server.base_url,
+            "endpoints": args.rest_endpoints.split(","),
+            "concurrency": args.rest_concurrency
+        }, ready, stop, results))
+
+    connect_started = time.monotonic()
+    for worker in workers:
+        worker.start()
+    loop = asyncio.get_running_loop()
+    for _ in workers:
+        await loop.run_in_executor(None, ready.get)
+    connect_seconds = time.monotonic() - connect_started
+    connected = sampler.sample()
+
+    if rest is not None:
+        rest.start()
+        await loop.run_in_executor(None, ready.get)
+    started = sampler.sample()
+    sent = await drive_broadcasts(server, args, mix, symbols, position_owners(channels),
+                                  time.monotonic() + args.duration)
+    # Let in-flight frames (and the coalescing window) drain
+    await asyncio.sleep(args.drain)
+    finished = sampler.sample()
+    stop.set()
+
+    reports = [await loop.run_in_executor(None, results.get) for _ in range(len(workers) + (rest is not None))]
+    for process in workers + ([rest] if rest is not None else []):
+        process.join()
+    await server.stop()
+
+    client_reports = [report for report in reports if "connect_latency" in report]
+    rest_report = next((report for report in reports if "connect_latency" not in report), None)
+    totals = {key: sum(report["counts"][key] for report in client_reports) for key in client_reports[0]["counts"]}
+    delivery: Dict[str, Histogram] = {}
+    updates: Dict[str, int] = {}
+    connect_latency = Histogram()
+    for report in client_reports:
+        connect_latency.merge(report["connect_latency"])
+        for kind, count in report["updates"].items():
+            updates[kind] = updates.get(kind, 0) + count
+        for kind, histogram in report["latency"].items():
+            delivery.setdefault(kind, Histogram()).merge(histogram)
+
+    elapsed = finished["time"] - started["time"]
+    rest_results = {}
+    if rest_report is not None:
+        for endpoint, counts in rest_report["counts"].items():
+            rest_results[endpoint] = {
+                **counts,
+                "rps": counts["requests"] / elapsed,
+                "latency": rest_report["latency"][endpoint].as_dict()
+            }
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": vars(args),
+        "connections": {
+            "requested": args.clients + args.analysis_clients,
+            "connected": totals["connected"],
+            "failed": totals["failed"],
+            "connect_seconds": connect_seconds,
+            "connect_latency": connect_latency.as_dict(),
+            "server_rss_per_connection_bytes":
+                (connected["rss_bytes"] - idle["rss_bytes"]) / totals["connected"] if totals["connected"] else None
+        },
+        "broadcast": {
+            "sent": sent,
+            "target_rate": args.rate,
+            "achieved_rate": (sent["trade_update"] + sent["position_update"]) / args.duration
+        },
+        "delivery": {
+            "messages": totals["messages"],
+            "updates": updates,
+            "bytes": totals["bytes"],
+            "messages_per_s": totals["messages"] / elapsed,
+            "bytes_per_s": totals["bytes"] / elapsed,
+            "latency": {kind: histogram.as_dict() for kind, histogram in delivery.items()}
+        },
+        "rest": rest_results,
+        "server": {
+            "processes": len(server.pids),
+            "cpu_percent": (finished["cpu_seconds"] - started["cpu_seconds"]) / elapsed * 100,
+            "rss_bytes_idle": idle["rss_bytes"],
+            "rss_bytes_loaded": finished["rss_bytes"]
+        },
+        "clients": {
+            "processes": len(client_reports),
+            "cpu_seconds": sum(report["cpu_seconds"] for report in client_reports)
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--server", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (--server uvicorn)")
+    parser.add_argument("--redis-url", help="broker URL, required with --server uvicorn")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18000)
+    parser.add_argument("--clients", type=int, default=2000, help="/ws/{client_id} connections")
+    parser.add_argument("--analysis-clients", type=int, default=500, help="/ws/analysis/{symbol} connections")
+    parser.add_argument("--channels", default="trades=0.7,positions=0.3", help="channel mix, name=weight,...")
+    parser.add_argument("--symbols", default="ETH,BTC,LINK,UNI")
+    parser.add_argument("--encoding", choices=("json", "msgpack"), default="json")
+    parser.add_argument("--rate", type=float, default=200.0, help="broadcasts per second")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--drain", type=float, default=1.0, help="seconds to wait for in-flight frames")
+    parser.add_argument("--client-processes", type=int, default=max((os.cpu_count() or 2) // 2, 1))
+    parser.add_argument("--connect-concurrency", type=int, default=200, help="per client process")
+    parser.add_argument("--rest-endpoints", default="/api/v1/hft/status,/api/v1/hft/trades,/health")
+    parser.add_argument("--rest-concurrency", type=int, default=16, help="0 disables REST load")
+    parser.add_argument("--out", help="also write the report to this file")
+    args = parser.parse_args()
+    if args.server == "uvicorn" and not args.redis_url:
+        parser.error("--server uvicorn needs --redis-url to reach the server workers")
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2, default=str)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    error = check_delivery(report)
+    if error:
+        sys.exit(f"loadtest: {error}")
+
+if __name__ == "__main__":
+    main()
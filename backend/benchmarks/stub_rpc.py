@@ -0,0 +1,270 @@
+"""Minimal Ethereum JSON-RPC stub node for local testing and benchmarks.
+
+Generates synthetic pending transactions at a fixed rate and answers the
+calls the bot makes, including JSON-RPC batches and transaction
+submission. Submitted transactions are not executed: ``mine()`` gives
+them receipts (status from ``reverts``) and applies ERC-20 approvals to
+the allowances ``eth_call`` reports. Run standalone with
+
+    python -m benchmarks.stub_rpc --port 8545 --tx-rate 2000
+
+or start it in-process with ``await StubNode(...).start()``.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import rlp
+from aiohttp import web
+from eth_account import Account
+from eth_utils import function_signature_to_4byte_selector, keccak, to_checksum_address
+
+APPROVE = function_signature_to_4byte_selector("approve(address,uint256)")
+ALLOWANCE = function_signature_to_4byte_selector("allowance(address,address)")
+
+def random_hex(nbytes: int) -> str:
+    return "0x" + os.urandom(nbytes).hex()
+
+def decode_raw_transaction(raw: str) -> Dict:
+    """Sender, nonce, recipient, value and input of a signed legacy or EIP-1559 transaction"""
+    data = bytes.fromhex(raw[2:])
+    if data[0] == 2:
+        fields = rlp.decode(data[1:])
+        nonce, to, value, payload = fields[1], fields[5], fields[6], fields[7]
+    else:
+        fields = rlp.decode(data)
+        nonce, to, value, payload = fields[0], fields[3], fields[4], fields[5]
+    return {
+        "hash": "0x" + keccak(data).hex(),
+        "from": Account.recover_transaction(raw).lower(),
+        "nonce": int.from_bytes(nonce, "big"),
+        "to": "0x" + to.hex() if to else None,
+        "value": int.from_bytes(value, "big"),
+        "input": payload
+    }
+
+def synthetic_transaction(rng: random.Random) -> Dict:
+    return {
+        "hash": random_hex(32),
+        "from": random_hex(20),
+        "to": random_hex(20),
+        "input": "0x",
+        "value": hex(rng.randrange(10 ** 18)),
+        "gas": hex(21000),
+        "gasPrice": hex(rng.randrange(10 ** 9, 10 ** 11)),
+        "nonce": hex(rng.randrange(1000))
+    }
+
+class StubNode:
+    """In-memory node: a rolling pool of pending transactions plus handlers per method"""
+
+    def __init__(
+        self,
+        tx_rate: float = 1000.0,
+        pool_size: int = 50_000,
+        latency: float = 0.0,
+        tx_factory: Optional[Callable[[random.Random], Dict]] = None,
+        seed: int = 1
+    ):
+        self.tx_rate = tx_rate
+        self.pool_size = pool_size
+        self.latency = latency
+        self.tx_factory = tx_factory or synthetic_transaction
+        self.rng = random.Random(seed)
+        self.pending: "OrderedDict[str, Dict]" = OrderedDict()
+        self.filters: Dict[str, List[str]] = {}
+        self.logs: List[Dict] = []
+        self.raw_transactions: List[str] = []
+        self.nonces: Dict[str, int] = {}
+        self.used_nonces: set = set()
+        # Submitted transactions not yet mined, and receipts of mined ones
+        self.mempool: List[Dict] = []
+        self.receipts: Dict[str, Dict] = {}
+        # (token, owner, spender) -> allowance, all lower case
+        self.allowances: Dict[tuple, int] = {}
+        # Decides which submitted transactions revert when mined
+        self.reverts: Callable[[Dict], bool] = lambda tx: False
+        self.gas_price = 30 * 10 ** 9
+        self._filter_ids = itertools.count(1)
+        self.block_number = 1
+        self.requests = 0
+        self._runner: Optional[web.AppRunner] = None
+        self._producer: Optional[asyncio.Task] = None
+        self.handlers: Dict[str, Callable] = {
+            "eth_blockNumber": lambda: hex(self.block_number),
+            "eth_chainId": lambda: hex(1),
+            "eth_newPendingTransactionFilter": self._new_filter,
+            "eth_getFilterChanges": self._filter_changes,
+            "eth_uninstallFilter": lambda filter_id: self.filters.pop(filter_id, None) is not None,
+            "eth_getTransactionByHash": lambda tx_hash: self.pending.get(tx_hash),
+            "eth_getBlockByNumber": self._get_block,
+            "eth_getLogs": self._get_logs,
+            "eth_gasPrice": lambda: hex(self.gas_price),
+            "eth_getTransactionCount": lambda address, block="latest": hex(self.nonces.get(address.lower(), 0)),
+            "eth_sendRawTransaction": self._send_raw_transaction,
+            "eth_getTransactionReceipt": lambda tx_hash: self.receipts.get(tx_hash),
+            "eth_call": self._call
+        }
+
+    def add_transaction(self, tx: Dict):
+        self.pending[tx["hash"]] = tx
+        while len(self.pending) > self.pool_size:
+            self.pending.popitem(last=False)
+        for hashes in self.filters.values():
+            hashes.append(tx["hash"])
+
+    def add_log(self, log: Dict):
+        """Record a log in the current block (``address``, ``topics``, ``data``)"""
+        self.logs.append({**log, "blockNumber": hex(self.block_number)})
+
+    def _get_logs(self, criteria: Dict):
+        first = int(criteria.get("fromBlock", "0x0"), 16)
+        last = int(criteria.get("toBlock", hex(self.block_number)), 16)
+        addresses = criteria.get("address")
+        if isinstance(addresses, str):
+            addresses = [addresses]
+        addresses = {address.lower() for address in addresses} if addresses else None
+        topics = (criteria.get("topics") or [None])[0]
+        if isinstance(topics, str):
+            topics = [topics]
+        return [
+            log for log in self.logs
+            if first <= int(log["blockNumber"], 16) <= last
+            and (addresses is None or log["address"].lower() in addresses)
+            and (not topics or log["topics"][0] in topics)
+        ]
+
+    def _send_raw_transaction(self, raw: str) -> str:
+        """Accept a signed transaction unless its sender already used the nonce; it
+        waits in ``mempool`` for ``mine``"""
+        tx = decode_raw_transaction(raw)
+        if (tx["from"], tx["nonce"]) in self.used_nonces:
+            raise ValueError(f"nonce too low: {tx['nonce']}")
+        self.used_nonces.add((tx["from"], tx["nonce"]))
+        self.nonces[tx["from"]] = max(self.nonces.get(tx["from"], 0), tx["nonce"] + 1)
+        self.raw_transactions.append(raw)
+        self.mempool.append(tx)
+        return tx["hash"]
+
+    def mine(self) -> List[Dict]:
+        """Start a new block holding every submitted transaction; returns their receipts"""
+        self.block_number += 1
+        mined, self.mempool = self.mempool, []
+        receipts = []
+        for tx in mined:
+            success = not self.reverts(tx)
+            if success and tx["to"] and tx["input"][:4] == APPROVE:
+                spender = "0x" + tx["input"][16:36].hex()
+                self.allowances[(tx["to"], tx["from"], spender)] = int.from_bytes(tx["input"][36:68], "big")
+            receipt = self.receipts[tx["hash"]] = {
+                "transactionHash": tx["hash"],
+                "blockNumber": hex(self.block_number),
+                "from": to_checksum_address(tx["from"]),
+                "to": to_checksum_address(tx["to"]) if tx["to"] else None,
+                "gasUsed": hex(21_000 + 16 * len(tx["input"])),
+                "status": "0x1" if success else "0x0",
+                "logs": []
+            }
+            receipts.append(receipt)
+        return receipts
+
+    def _call(self, call: Dict, block="latest") -> str:
+        """Answers ERC-20 ``allowance`` from ``allowances``; any other call returns zero"""
+        data = bytes.fromhex(call.get("data", call.get("input", "0x"))[2:])
+        value = 0
+        if data[:4] == ALLOWANCE:
+            owner, spender = "0x" + data[16:36].hex(), "0x" + data[48:68].hex()
+            value = self.allowances.get((call["to"].lower(), owner, spender), 0)
+        return "0x" + value.to_bytes(32, "big").hex()
+
+    def _new_filter(self):
+        filter_id = hex(next(self._filter_ids))
+        self.filters[filter_id] = []
+        return filter_id
+
+    def _filter_changes(self, filter_id):
+        if filter_id not in self.filters:
+            raise KeyError("filter not found")
+        changes, self.filters[filter_id] = self.filters[filter_id], []
+        return changes
+
+    def _get_block(self, number, full_transactions=False):
+        transactions = list(self.pending.values())[-1000:]
+        return {
+            "number": hex(self.block_number),
+            "transactions": transactions if full_transactions else [tx["hash"] for tx in transactions]
+        }
+
+    def _dispatch(self, request: Dict) -> Dict:
+        reply = {"jsonrpc": "2.0", "id": request.get("id")}
+        handler = self.handlers.get(request.get("method"))
+        if handler is None:
+            reply["error"] = {"code": -32601, "message": "Method not found"}
+            return reply
+        try:
+            reply["result"] = handler(*request.get("params", []))
+        except Exception as e:
+            reply["error"] = {"code": -32000, "message": str(e)}
+        return reply
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if isinstance(payload, list):
+            self.requests += len(payload)
+            return web.json_response([self._dispatch(item) for item in payload])
+        self.requests += 1
+        return web.json_response(self._dispatch(payload))
+
+    async def _produce(self):
+        interval = 0.01
+        carry = 0.0
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(interval)
+            now = time.perf_counter()
+            carry += (now - last) * self.tx_rate
+            last = now
+            for _ in range(int(carry)):
+                self.add_transaction(self.tx_factory(self.rng))
+            carry -= int(carry)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8545) -> str:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        if self.tx_rate:
+            self._producer = asyncio.create_task(self._produce())
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        if self._producer is not None:
+            self._producer.cancel()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+async def _serve(args):
+    node = StubNode(tx_rate=args.tx_rate, latency=args.latency / 1000)
+    url = await node.start(args.host, args.port)
+    print(f"Stub RPC node listening on {url}")
+    await asyncio.Event().wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Ethereum JSON-RPC stub node")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--tx-rate", type=float, default=1000.0, help="pending transactions per second")
+    parser.add_argument("--latency", type=float, default=0.0, help="added latency per request, ms")
+    asyncio.run(_serve(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
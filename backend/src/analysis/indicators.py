@@ -0,0 +1,324 @@
+import math
+from collections import deque
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+FIBONACCI_RATIOS = (0.236, 0.382, 0.5, 0.618, 0.786)
+
+# Block length for the vectorized EMA recurrence; keeps (1 - alpha) ** -k well
+# inside float64 range for every smoothing factor we use
+_EMA_BLOCK = 64
+
+class IndicatorState:
+    """Streaming RSI, MACD, SMA and Fibonacci levels for one symbol.
+
+    Every ``update`` is O(1): EMAs and Wilder averages are recursive, the
+    moving average keeps a running sum over a fixed window and the rolling
+    high/low used for Fibonacci levels come from monotonic deques.
+    """
+
+    __slots__ = (
+        "rsi_period", "macd_fast", "macd_slow", "macd_signal", "ma_period", "fib_window",
+        "_alpha_fast", "_alpha_slow", "_alpha_signal",
+        "count", "price", "ema_fast", "ema_slow", "signal",
+        "_gain_sum", "_loss_sum", "avg_gain", "avg_loss",
+        "_ma_window", "_ma_sum", "_highs", "_lows"
+    )
+
+    def __init__(
+        self,
+        rsi_period: int = 14,
+        macd_fast: int = 12,
+        macd_slow: int = 26,
+        macd_signal: int = 9,
+        ma_period: int = 20,
+        fib_window: int = 100
+    ):
+        self.rsi_period = rsi_period
+        self.macd_fast = macd_fast
+        self.macd_slow = macd_slow
+        self.macd_signal = macd_signal
+        self.ma_period = ma_period
+        self.fib_window = fib_window
+        self._alpha_fast = 2.0 / (macd_fast + 1)
+        self._alpha_slow = 2.0 / (macd_slow + 1)
+        self._alpha_signal = 2.0 / (macd_signal + 1)
+        self.count = 0
+        self.price = math.nan
+        self.ema_fast = math.nan
+        self.ema_slow = math.nan
+        self.signal = 0.0
+        self._gain_sum = 0.0
+        self._loss_sum = 0.0
+        self.avg_gain = math.nan
+        self.avg_loss = math.nan
+        self._ma_window: deque = deque()
+        self._ma_sum = 0.0
+        # (index, price) pairs, prices decreasing / increasing respectively
+        self._highs: deque = deque()
+        self._lows: deque = deque()
+
+    def update(self, price: float):
+        """Apply one price tick"""
+        price = float(price)
+        index = self.count
+
+        if index == 0:
+            self.ema_fast = price
+            self.ema_slow = price
+        else:
+            self.ema_fast += self._alpha_fast * (price - self.ema_fast)
+            self.ema_slow += self._alpha_slow * (price - self.ema_slow)
+            self.signal += self._alpha_signal * (self.ema_fast - self.ema_slow - self.signal)
+
+            change = price - self.price
+            gain = change if change > 0 else 0.0
+            loss = -change if change < 0 else 0.0
+            if index <= self.rsi_period:
+                self._gain_sum += gain
+                self._loss_sum += loss
+                if index == self.rsi_period:
+                    self.avg_gain = self._gain_sum / self.rsi_period
+                    self.avg_loss = self._loss_sum / self.rsi_period
+            else:
+                self.avg_gain += (gain - self.avg_gain) / self.rsi_period
+                self.avg_loss += (loss - self.avg_loss) / self.rsi_period
+
+        self._ma_window.append(price)
+        self._ma_sum += price
+        if len(self._ma_window) > self.ma_period:
+            self._ma_sum -= self._ma_window.popleft()
+
+        highs = self._highs
+        while highs and highs[-1][1] <= price:
+            highs.pop()
+        highs.append((index, price))
+        if highs[0][0] <= index - self.fib_window:
+            highs.popleft()
+        lows = self._lows
+        while lows and lows[-1][1] >= price:
+            lows.pop()
+        lows.append((index, price))
+        if lows[0][0] <= index - self.fib_window:
+            lows.popleft()
+
+        self.price = price
+        self.count = index + 1
+
+    @property
+    def rsi(self) -> Optional[float]:
+        if self.count <= self.rsi_period:
+            return None
+        return _rsi(self.avg_gain, self.avg_loss)
+
+    @property
+    def macd(self) -> Optional[float]:
+        if not self.count:
+            return None
+        return self.ema_fast - self.ema_slow
+
+    @property
+    def ma(self) -> Optional[float]:
+        if len(self._ma_window) < self.ma_period:
+            return None
+        return self._ma_sum / self.ma_period
+
+    @property
+    def high(self) -> Optional[float]:
+        return self._highs[0][1] if self._highs else None
+
+    @property
+    def low(self) -> Optional[float]:
+        return self._lows[0][1] if self._lows else None
+
+    def fibonacci_levels(self) -> list:
+        if not self.count:
+            return []
+        high, low = self.high, self.low
+        levels = []
+        for ratio in FIBONACCI_RATIOS:
+            value = high - ratio * (high - low)
+            levels.append({
+                "name": str(ratio),
+                "value": value,
+                "type": "resistance" if value > self.price else "support"
+            })
+        return levels
+
+    def load(self, prices: np.ndarray, batch: Dict[str, np.ndarray]):
+        """Adopt the final state of a batch computation so streaming continues from it"""
+        n = len(prices)
+        if not n:
+            return
+        self.count = n
+        self.price = float(prices[-1])
+        self.ema_fast = float(batch["ema_fast"][-1])
+        self.ema_slow = float(batch["ema_slow"][-1])
+        self.signal = float(batch["signal"][-1])
+        self.avg_gain = float(batch["avg_gain"][-1])
+        self.avg_loss = float(batch["avg_loss"][-1])
+        if n <= self.rsi_period:
+            changes = np.diff(prices)
+            self._gain_sum = float(np.clip(changes, 0, None).sum())
+            self._loss_sum = float(np.clip(-changes, 0, None).sum())
+
+        tail = prices[-self.ma_period:]
+        self._ma_window = deque(float(p) for p in tail)
+        self._ma_sum = float(tail.sum())
+
+        self._highs.clear()
+        self._lows.clear()
+        start = max(0, n - self.fib_window)
+        for index in range(start, n):
+            price = float(prices[index])
+            while self._highs and self._highs[-1][1] <= price:
+                self._highs.pop()
+            self._highs.append((index, price))
+            while self._lows and self._lows[-1][1] >= price:
+                self._lows.pop()
+            self._lows.append((index, price))
+
+def _rsi(avg_gain: float, avg_loss: float) -> float:
+    if avg_loss == 0:
+        return 100.0 if avg_gain > 0 else 50.0
+    return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+def _ema(values: np.ndarray, alpha: float, initial: float) -> np.ndarray:
+    """Vectorized y[i] = y[i-1] + alpha * (x[i] - y[i-1]) with y[-1] = initial.
+
+    Uses the closed form y[i] = d^(i+1) * y0 + alpha * d^i * sum_k(x[k] * d^-k)
+    with d = 1 - alpha, evaluated per block so the powers stay well conditioned.
+    """
+    out = np.empty(len(values), dtype=np.float64)
+    decay = 1.0 - alpha
+    powers = decay ** np.arange(_EMA_BLOCK + 1, dtype=np.float64)
+    inverse = 1.0 / powers[:_EMA_BLOCK]
+    previous = initial
+    for start in range(0, len(values), _EMA_BLOCK):
+        block = values[start:start + _EMA_BLOCK]
+        n = len(block)
+        acc = np.cumsum(block * inverse[:n])
+        result = powers[1:n + 1] * previous + alpha * powers[:n] * acc
+        out[start:start + n] = result
+        previous = result[-1]
+    return out
+
+def _rolling(values: np.ndarray, window: int, reducer) -> np.ndarray:
+    """Reduce over a trailing window of up to ``window`` values (shorter at the start)"""
+    padded = np.concatenate([np.full(window - 1, values[0]), values])
+    view = np.lib.stride_tricks.sliding_window_view(padded, window)
+    return reducer(view, axis=1)
+
+def compute_batch(
+    prices: Sequence[float],
+    rsi_period: int = 14,
+    macd_fast: int = 12,
+    macd_slow: int = 26,
+    macd_signal: int = 9,
+    ma_period: int = 20,
+    fib_window: int = 100
+) -> Dict[str, np.ndarray]:
+    """Vectorized indicator series over a full price history (for backfills).
+
+    Produces the same values, tick for tick, as feeding the prices through
+    ``IndicatorState.update``; entries that are not yet defined are NaN.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    n = len(prices)
+    if not n:
+        return {}
+
+    ema_fast = np.empty(n)
+    ema_slow = np.empty(n)
+    ema_fast[0] = ema_slow[0] = prices[0]
+    ema_fast[1:] = _ema(prices[1:], 2.0 / (macd_fast + 1), prices[0])
+    ema_slow[1:] = _ema(prices[1:], 2.0 / (macd_slow + 1), prices[0])
+    macd = ema_fast - ema_slow
+    signal = np.zeros(n)
+    signal[1:] = _ema(macd[1:], 2.0 / (macd_signal + 1), 0.0)
+
+    changes = np.diff(prices)
+    gains = np.clip(changes, 0, None)
+    losses = np.clip(-changes, 0, None)
+    avg_gain = np.full(n, np.nan)
+    avg_loss = np.full(n, np.nan)
+    if n > rsi_period:
+        seed_gain = gains[:rsi_period].mean()
+        seed_loss = losses[:rsi_period].mean()
+        avg_gain[rsi_period] = seed_gain
+        avg_loss[rsi_period] = seed_loss
+        avg_gain[rsi_period + 1:] = _ema(gains[rsi_period:], 1.0 / rsi_period, seed_gain)
+        avg_loss[rsi_period + 1:] = _ema(losses[rsi_period:], 1.0 / rsi_period, seed_loss)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    rsi = np.where(avg_loss == 0, np.where(avg_gain > 0, 100.0, 50.0), rsi)
+    rsi[np.isnan(avg_gain)] = np.nan
+
+    cumulative = np.concatenate([[0.0], np.cumsum(prices)])
+    ma = np.full(n, np.nan)
+    if n >= ma_period:
+        ma[ma_period - 1:] = (cumulative[ma_period:] - cumulative[:-ma_period]) / ma_period
+
+    high = _rolling(prices, fib_window, np.max)
+    low = _rolling(prices, fib_window, np.min)
+
+    return {
+        "price": prices,
+        "ema_fast": ema_fast,
+        "ema_slow": ema_slow,
+        "macd": macd,
+        "signal": signal,
+        "avg_gain": avg_gain,
+        "avg_loss": avg_loss,
+        "rsi": rsi,
+        "ma": ma,
+        "high": high,
+        "low": low
+    }
+
+class IndicatorEngine:
+    """Per-symbol streaming indicators fed by price ticks"""
+
+    def __init__(self, **params):
+        self.params = params
+        self.states: Dict[str, IndicatorState] = {}
+
+    def _state(self, symbol: str) -> IndicatorState:
+        state = self.states.get(symbol)
+        if state is None:
+            state = self.states[symbol] = IndicatorState(**self.params)
+        return state
+
+    def update(self, symbol: str, price: float):
+        """Feed one price tick for a symbol"""
+        self._state(symbol).update(price)
+
+    def backfill(self, symbol: str, prices: Sequence[float]):
+        """Initialise a symbol from stored history using the vectorized batch path"""
+        prices = np.asarray(prices, dtype=np.float64)
+        state = IndicatorState(**self.params)
+        state.load(prices, compute_batch(prices, **self.params))
+        self.states[symbol] = state
+
+    def has_data(self, symbol: str) -> bool:
+        state = self.states.get(symbol)
+        return state is not None and state.count > 0
+
+    def snapshot(self, symbol: str) -> Optional[dict]:
+        """Technical and Fibonacci blocks for the analysis feed"""
+        state = self.states.get(symbol)
+        if state is None or not state.count:
+            return None
+        return {
+            "technical": {
+                "rsi": state.rsi,
+                "macd": state.macd,
+                "macd_signal": state.signal,
+                "ma": state.ma
+            },
+            "fibonacci": {
+                "levels": state.fibonacci_levels(),
+                "currentPrice": state.price
+            }
+        }
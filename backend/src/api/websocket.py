@@ -1,11 +1,18 @@
+from typing import Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from ..websocket.codec import negotiate
 from ..websocket.server import manager
 
 router = APIRouter()
 
 @router.websocket("/ws/analysis/{symbol}")
-async def websocket_endpoint(websocket: WebSocket, symbol: str):
-    await manager.connect(websocket, symbol)
+async def websocket_endpoint(websocket: WebSocket, symbol: str, encoding: Optional[str] = None):
+    try:
+        wire_encoding = negotiate(encoding)
+    except ValueError:
+        await websocket.close(code=1003)
+        return
+    await manager.connect(websocket, symbol, encoding=wire_encoding)
     try:
         while True:
             # Keep the connection alive and handle any client messages
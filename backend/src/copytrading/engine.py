@@ -0,0 +1,265 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+import numpy as np
+
+from ..utils.metrics import metrics
+from .followers import BUY, FollowerBook, FollowerOrders
+
+logger = logging.getLogger(__name__)
+
+FANOUT_SECONDS = metrics.histogram("copy_fanout_seconds", "Leader fill to last follower order submitted")
+ORDERS = metrics.counter("copy_orders_total", "Follower orders by outcome", labels=("outcome",))
+
+# (leader trade, orders) -> fill price per order, NaN where it did not fill
+SubmitBatch = Callable[[Dict, FollowerOrders], Awaitable[np.ndarray]]
+
+def paper_submit(market_price: float) -> SubmitBatch:
+    """Fills every order at ``market_price`` unless that is past the order's limit"""
+    async def submit(trade: Dict, orders: FollowerOrders) -> np.ndarray:
+        crossed = orders.limit_price < market_price if trade["type"] == BUY else orders.limit_price > market_price
+        return np.where(crossed, np.nan, market_price)
+    return submit
+
+class CopyTradingEngine:
+    """Replicates leader fills to their followers.
+
+    Per leader fill: every follower's order is scaled in one vectorized
+    pass over the leader's ``FollowerBook``; the orders go out in groups of
+    ``batch_size`` through ``submit_batch``, ``concurrency`` groups at a
+    time. Only then are the fills booked, the follower trades handed to the
+    write-behind writer in one bulk ``submit_trades`` call and one position
+    update per follower broadcast (coalesced per position by the manager),
+    so persistence and fan-out never delay submission. A leader's fills are
+    scaled, submitted and booked one at a time, so concurrent fills cannot
+    both spend the same exposure room or holdings.
+
+    Without ``submit_batch`` orders are filled on paper at the market price
+    (``price_source(token)``, default the leader's price).
+    """
+
+    def __init__(
+        self,
+        submit_batch: Optional[SubmitBatch] = None,
+        persistence=None,
+        manager=None,
+        price_source: Optional[Callable[[str], Optional[float]]] = None,
+        batch_size: int = 1000,
+        concurrency: int = 4,
+        min_order_value: float = 0.0
+    ):
+        self.books: Dict[str, FollowerBook] = {}
+        self.submit_batch = submit_batch
+        self.persistence = persistence
+        self.manager = manager
+        self.price_source = price_source
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.min_order_value = min_order_value
+        self._tasks = set()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.last_fanout: Dict = {}
+        self.stats = {"leader_fills": 0, "orders": 0, "filled": 0, "skipped": 0, "failed_batches": 0}
+
+    async def load(self):
+        """Load the active subscriptions and their copy positions from the database"""
+        from ..database import session_scope
+
+        async with session_scope() as db:
+            await self.load_from(db)
+
+    async def load_from(self, db):
+        """Load the active subscriptions, then rebuild their holdings, entry prices and
+        exposure by replaying the executed copy trades in order"""
+        from sqlalchemy import select
+
+        from ..models.trade import CopySubscription, Trade, TradeStatus
+
+        result = await db.execute(select(CopySubscription).where(CopySubscription.active.is_(True)))
+        subscriptions = result.scalars().all()
+        for subscription in subscriptions:
+            self.follow(
+                subscription.leader_id,
+                subscription.follower_id,
+                subscription.allocation,
+                max_trade_value=subscription.max_trade_value,
+                max_exposure=subscription.max_exposure,
+                max_slippage=subscription.max_slippage
+            )
+        result = await db.execute(
+            select(Trade.user_id, Trade.token_symbol, Trade.type, Trade.amount, Trade.price, Trade.meta)
+            .where(Trade.tx_hash.like("copy:%"), Trade.status == TradeStatus.EXECUTED)
+            .order_by(Trade.created_at, Trade.id)
+        )
+        fills = self._replay(result.all())
+        logger.info(f"Loaded {len(subscriptions)} copy subscriptions for {len(self.books)} leaders "
+                    f"and replayed {fills} copy fills")
+
+    def _replay(self, rows) -> int:
+        """Book persisted copy trades; the rows of one leader fill are booked together"""
+        def fanout(row):
+            meta = row.meta or {}
+            return meta.get("copied_from"), meta.get("leader_tx"), row.token_symbol, row.type
+
+        fills = 0
+        for (leader_id, _, token, side), group in itertools.groupby(rows, key=fanout):
+            book = self.books.get(leader_id)
+            if book is None:
+                continue
+            group = list(group)
+            fills += book.replay_fills(
+                side, token, [row.user_id for row in group],
+                [row.amount for row in group], [row.price for row in group]
+            )
+        return fills
+
+    def follow(self, leader_id: str, follower_id: str, allocation: float, **limits):
+        self.books.setdefault(leader_id, FollowerBook()).set(follower_id, allocation, **limits)
+
+    def unfollow(self, leader_id: str, follower_id: str):
+        book = self.books.get(leader_id)
+        if book is not None and follower_id in book:
+            book.remove(follower_id)
+
+    def on_bot_event(self, event: str, data: Dict):
+        """HFTBot listener: copies the bot's executed trades to the bot's followers. Live
+        trades are recorded once their receipt is in, so only mined trades are copied"""
+        if event == "trade" and data.get("status") == "executed":
+            task = asyncio.ensure_future(self.on_leader_fill(data["user_id"], data))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def on_leader_fill(self, leader_id: str, trade: Dict) -> Dict:
+        """Copy one leader fill (a ``Trade`` row as a dict) to the leader's followers"""
+        started = time.perf_counter()
+        book = self.books.get(leader_id)
+        if book is None or not len(book):
+            return {}
+        self.stats["leader_fills"] += 1
+        token = trade["token_symbol"]
+        price = float(trade["price"])
+        market_price = self.price_source(token) if self.price_source is not None else None
+        market_price = float(market_price) if market_price else price
+
+        # One fill per leader at a time: orders are scaled against every earlier fill's bookings
+        async with self._locks.setdefault(leader_id, asyncio.Lock()):
+            orders = book.orders(trade["type"], token, float(trade["amount"]), price,
+                                 market_price=market_price, min_value=self.min_order_value)
+            version = book.version
+            scaled = time.perf_counter()
+            fill_price = await self._submit(trade, orders, market_price)
+            submitted = time.perf_counter()
+            FANOUT_SECONDS.observe(submitted - started)
+            if book.version != version:
+                orders, fill_price = book.rebase(orders, fill_price)
+            filled = book.apply_fills(trade["type"], token, orders, fill_price)
+
+        filled_count = int(filled.sum())
+        self.stats["orders"] += len(orders)
+        self.stats["filled"] += filled_count
+        self.stats["skipped"] += len(book) - len(orders)
+        ORDERS.labels("filled").inc(filled_count)
+        ORDERS.labels("rejected").inc(len(orders) - filled_count)
+        ORDERS.labels("skipped").inc(len(book) - len(orders))
+
+        if filled_count:
+            await self._record(leader_id, trade, book, orders, filled, fill_price, market_price)
+        self.last_fanout = {
+            "leader_id": leader_id,
+            "followers": len(book),
+            "orders": len(orders),
+            "filled": filled_count,
+            "scale_ms": (scaled - started) * 1000,
+            "submit_ms": (submitted - scaled) * 1000,
+            "record_ms": (time.perf_counter() - submitted) * 1000,
+            "total_ms": (time.perf_counter() - started) * 1000
+        }
+        logger.debug(f"Copy fan-out: {self.last_fanout}")
+        return self.last_fanout
+
+    async def _submit(self, trade: Dict, orders: FollowerOrders, market_price: float) -> np.ndarray:
+        submit_batch = self.submit_batch or paper_submit(market_price)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def submit(start: int) -> np.ndarray:
+            batch = orders.slice(start, start + self.batch_size)
+            async with semaphore:
+                try:
+                    return np.asarray(await submit_batch(trade, batch), dtype=np.float64)
+                except Exception as e:
+                    self.stats["failed_batches"] += 1
+                    logger.error(f"Copy order batch of {len(batch)} failed: {e}")
+                    return np.full(len(batch), np.nan)
+
+        if not len(orders):
+            return np.empty(0)
+        results = await asyncio.gather(*(submit(start) for start in range(0, len(orders), self.batch_size)))
+        return np.concatenate(results)
+
+    async def _record(self, leader_id: str, trade: Dict, book: FollowerBook, orders: FollowerOrders,
+                      filled: np.ndarray, fill_price: np.ndarray, market_price: float):
+        """Bulk-queue the follower trades and send every follower its position, a group at
+        a time so the event loop is not held for the whole fan-out"""
+        token = trade["token_symbol"]
+        token_address = trade.get("token_address", token)
+        side = trade["type"]
+        leader_tx = trade.get("tx_hash")
+        # Positions as of these fills, read before yielding (rows may move afterwards)
+        held, entry = book.positions(token, orders.rows[filled])
+        follower_ids = [orders.follower_ids[i] for i in np.flatnonzero(filled)]
+        amounts = orders.amount[filled].tolist()
+        prices = fill_price[filled].tolist()
+        held, entry = held.tolist(), entry.tolist()
+
+        for start in range(0, len(follower_ids), self.batch_size):
+            stop = start + self.batch_size
+            group = follower_ids[start:stop]
+            if self.persistence is not None:
+                self.persistence.submit_trades([
+                    {
+                        "user_id": follower_id,
+                        "token_symbol": token,
+                        "token_address": token_address,
+                        "amount": amount,
+                        "price": price,
+                        "type": side,
+                        "status": "executed",
+                        # Deterministic per leader trade and follower, so a replayed batch is not written twice
+                        "tx_hash": f"copy:{leader_tx}:{follower_id}" if leader_tx else None,
+                        "meta": {"copied_from": leader_id, "leader_tx": leader_tx}
+                    }
+                    for follower_id, amount, price in zip(group, amounts[start:stop], prices[start:stop])
+                ])
+
+            if self.manager is not None:
+                for follower_id, amount, entry_price in zip(group, held[start:stop], entry[start:stop]):
+                    await self.manager.broadcast(
+                        {
+                            "type": "position_update",
+                            "data": {
+                                "id": f"{follower_id}:{token}",
+                                "token_symbol": token,
+                                "amount": amount,
+                                "entry_price": entry_price,
+                                "current_price": market_price,
+                                "pnl": (market_price - entry_price) * amount,
+                                "status": "open" if amount > 0 else "closed"
+                            }
+                        },
+                        channel=f"positions.{token}",
+                        client_id=follower_id,
+                        coalesce_key=f"position:{follower_id}:{token}"
+                    )
+            await asyncio.sleep(0)
+
+    def get_metrics(self) -> Dict:
+        return {
+            **self.stats,
+            "leaders": len(self.books),
+            "followers": sum(len(book) for book in self.books.values()),
+            "last_fanout": self.last_fanout,
+            "latency": FANOUT_SECONDS.as_dict()
+        }
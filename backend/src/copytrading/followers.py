@@ -0,0 +1,215 @@
+import logging
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BUY = "buy"
+SELL = "sell"
+
+_COLUMNS = ("allocation", "max_trade_value", "max_exposure", "max_slippage", "exposure")
+
+class FollowerOrders(NamedTuple):
+    """Scaled follower orders for one leader fill, column-wise"""
+    rows: np.ndarray  # FollowerBook rows
+    follower_ids: List[str]
+    amount: np.ndarray
+    limit_price: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.follower_ids)
+
+    def slice(self, start: int, stop: int) -> "FollowerOrders":
+        return FollowerOrders(
+            self.rows[start:stop], self.follower_ids[start:stop],
+            self.amount[start:stop], self.limit_price[start:stop]
+        )
+
+class FollowerBook:
+    """One leader's followers stored column-wise in NumPy arrays.
+
+    Mirrors ``models.trade.CopySubscription`` plus what copying has built
+    up: open cost basis (``exposure``) and, per token, each follower's
+    holding and average entry price. Rows are kept dense like
+    ``hft.positions.PositionBook``, so ``orders`` scales a leader fill for
+    every follower in one vectorized pass. Unset caps are stored as +inf.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._size = 0
+        self._capacity = capacity
+        self._columns: Dict[str, np.ndarray] = {name: np.zeros(capacity) for name in _COLUMNS}
+        self._holdings: Dict[str, np.ndarray] = {}
+        self._entry: Dict[str, np.ndarray] = {}
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        # Bumped whenever rows move, so in-flight orders can be re-resolved
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, follower_id) -> bool:
+        return follower_id in self._rows
+
+    def __iter__(self) -> Iterator[Dict]:
+        for row in range(self._size):
+            yield self._as_dict(row)
+
+    def _arrays(self) -> Iterator[np.ndarray]:
+        yield from self._columns.values()
+        yield from self._holdings.values()
+        yield from self._entry.values()
+
+    def _grow(self):
+        self._capacity *= 2
+        for table in (self._columns, self._holdings, self._entry):
+            for name, column in table.items():
+                grown = np.zeros(self._capacity)
+                grown[:self._size] = column[:self._size]
+                table[name] = grown
+
+    def _token(self, token: str):
+        if token not in self._holdings:
+            self._holdings[token] = np.zeros(self._capacity)
+            self._entry[token] = np.zeros(self._capacity)
+        return self._holdings[token], self._entry[token]
+
+    def set(
+        self,
+        follower_id: str,
+        allocation: float,
+        max_trade_value: Optional[float] = None,
+        max_exposure: Optional[float] = None,
+        max_slippage: float = 1.0
+    ):
+        """Add a follower, or update an existing follower's settings (holdings are kept)"""
+        row = self._rows.get(follower_id)
+        if row is None:
+            if self._size == self._capacity:
+                self._grow()
+            row = self._size
+            self._size += 1
+            self._ids.append(follower_id)
+            self._rows[follower_id] = row
+            for column in self._arrays():
+                column[row] = 0.0
+        columns = self._columns
+        columns["allocation"][row] = allocation
+        columns["max_trade_value"][row] = np.inf if max_trade_value is None else max_trade_value
+        columns["max_exposure"][row] = np.inf if max_exposure is None else max_exposure
+        columns["max_slippage"][row] = max_slippage
+
+    def remove(self, follower_id: str) -> Dict:
+        """Remove a follower; O(1). Returns the removed follower"""
+        row = self._rows.pop(follower_id)
+        removed = self._as_dict(row)
+        last = self._size - 1
+        if row != last:
+            for column in self._arrays():
+                column[row] = column[last]
+            self._ids[row] = self._ids[last]
+            self._rows[self._ids[row]] = row
+        self._ids.pop()
+        self._size = last
+        self.version += 1
+        return removed
+
+    def get(self, follower_id: str) -> Dict:
+        return self._as_dict(self._rows[follower_id])
+
+    def _as_dict(self, row: int) -> Dict:
+        follower = {name: float(column[row]) for name, column in self._columns.items()}
+        follower["id"] = self._ids[row]
+        follower["holdings"] = {
+            token: {"amount": float(held[row]), "entry_price": float(self._entry[token][row])}
+            for token, held in self._holdings.items()
+            if held[row] > 0
+        }
+        return follower
+
+    def orders(self, side: str, token: str, amount: float, price: float,
+               market_price: Optional[float] = None, min_value: float = 0.0) -> FollowerOrders:
+        """Scale a leader fill of ``amount`` at ``price`` to every follower.
+
+        A follower's order is ``allocation * amount``, cut down to its
+        per-trade value cap and, for buys, to the room left under its
+        exposure cap; sells never exceed what the follower holds. Followers
+        whose ``max_slippage`` (percent) is below the move from the leader's
+        price to ``market_price`` sit the trade out. The limit price of
+        each order is the leader's price moved by the follower's slippage.
+        """
+        n = self._size
+        columns = self._columns
+        market_price = price if market_price is None else market_price
+        slippage = columns["max_slippage"][:n]
+
+        quantity = columns["allocation"][:n] * amount
+        value_cap = columns["max_trade_value"][:n]
+        if side == BUY:
+            room = np.maximum(columns["max_exposure"][:n] - columns["exposure"][:n], 0.0)
+            value_cap = np.minimum(value_cap, room)
+        quantity = np.minimum(quantity, value_cap / market_price)
+        if side == SELL:
+            held = self._holdings.get(token)
+            quantity = np.minimum(quantity, held[:n]) if held is not None else np.zeros(n)
+
+        drift = abs(market_price - price) / price * 100 if price else 0.0
+        eligible = (slippage >= drift) & (quantity * market_price > max(min_value, 0.0))
+        rows = np.flatnonzero(eligible)
+        direction = 1.0 if side == BUY else -1.0
+        limit_price = price * (1 + direction * slippage[rows] / 100)
+        return FollowerOrders(rows, [self._ids[row] for row in rows], quantity[rows], limit_price)
+
+    def rebase(self, orders: FollowerOrders, fill_price: np.ndarray) -> Tuple[FollowerOrders, np.ndarray]:
+        """Re-resolve the rows of orders scaled before followers were removed; orders of
+        removed followers are dropped"""
+        rows = np.array([self._rows.get(follower_id, -1) for follower_id in orders.follower_ids], dtype=np.int64)
+        keep = rows >= 0
+        rebased = FollowerOrders(
+            rows[keep], [orders.follower_ids[i] for i in np.flatnonzero(keep)],
+            orders.amount[keep], orders.limit_price[keep]
+        )
+        return rebased, fill_price[keep]
+
+    def apply_fills(self, side: str, token: str, orders: FollowerOrders, fill_price: np.ndarray) -> np.ndarray:
+        """Book filled orders (``fill_price`` NaN where an order did not fill) into holdings,
+        entry prices and exposure. Returns the mask of filled orders"""
+        filled = ~np.isnan(fill_price)
+        rows = orders.rows[filled]
+        amount = orders.amount[filled]
+        price = fill_price[filled]
+        held, entry = self._token(token)
+        exposure = self._columns["exposure"]
+        if side == BUY:
+            total = held[rows] + amount
+            entry[rows] = (entry[rows] * held[rows] + price * amount) / total
+            held[rows] = total
+            exposure[rows] += price * amount
+        else:
+            # Exposure is cost basis: a sell releases what the sold amount cost
+            exposure[rows] = np.maximum(exposure[rows] - entry[rows] * amount, 0.0)
+            remaining = np.maximum(held[rows] - amount, 0.0)
+            held[rows] = remaining
+            entry[rows] = np.where(remaining > 0, entry[rows], 0.0)
+        return filled
+
+    def replay_fills(self, side: str, token: str, follower_ids: List[str], amount: List[float],
+                     price: List[float]) -> int:
+        """Book past fills (e.g. persisted copy trades) by follower id; followers no longer
+        in the book are skipped. Returns how many fills were booked"""
+        known = [i for i, follower_id in enumerate(follower_ids) if follower_id in self._rows]
+        orders = FollowerOrders(
+            np.array([self._rows[follower_ids[i]] for i in known], dtype=np.int64),
+            [follower_ids[i] for i in known],
+            np.asarray(amount, dtype=np.float64)[known],
+            np.full(len(known), np.nan)
+        )
+        self.apply_fills(side, token, orders, np.asarray(price, dtype=np.float64)[known])
+        return len(known)
+
+    def positions(self, token: str, rows: np.ndarray):
+        """(amount, entry price) of ``token`` for the given rows"""
+        held, entry = self._token(token)
+        return held[rows], entry[rows]
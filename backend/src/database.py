@@ -0,0 +1,117 @@
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from .config import settings
+from .models.base import Base
+from .utils.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite"
+}
+
+def async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its asyncio driver"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.drivername)
+    return str(parsed.set(drivername=driver)) if driver else url
+
+class PoolMetrics:
+    """Connection pool counters fed by pool events"""
+
+    def __init__(self):
+        self.checked_out = 0
+        self.checkouts = 0
+        self.connections_opened = 0
+        self.invalidated = 0
+        self.wait = Histogram()
+
+    def attach(self, engine: AsyncEngine):
+        sync_engine = engine.sync_engine
+        event.listen(sync_engine, "connect", self._on_connect)
+        event.listen(sync_engine, "checkout", self._on_checkout)
+        event.listen(sync_engine, "checkin", self._on_checkin)
+        event.listen(sync_engine, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connections_opened += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checked_out += 1
+        self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.checked_out -= 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidated += 1
+
+    def snapshot(self, engine: AsyncEngine) -> Dict:
+        pool = engine.sync_engine.pool
+        return {
+            "pool": type(pool).__name__,
+            "size": pool.size() if hasattr(pool, "size") else None,
+            "checked_out": self.checked_out,
+            "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+            "checkouts": self.checkouts,
+            "connections_opened": self.connections_opened,
+            "invalidated": self.invalidated,
+            "wait": self.wait.as_dict()
+        }
+
+def create_engine(url: str) -> AsyncEngine:
+    """Async engine with a pool sized for many short-lived sessions"""
+    url = async_database_url(url)
+    options = {"pool_pre_ping": True}
+    if not url.startswith("sqlite"):
+        options.update(
+            pool_size=getattr(settings, "DB_POOL_SIZE", 20),
+            max_overflow=getattr(settings, "DB_MAX_OVERFLOW", 10),
+            pool_timeout=getattr(settings, "DB_POOL_TIMEOUT", 5),
+            pool_recycle=getattr(settings, "DB_POOL_RECYCLE", 1800)
+        )
+    return create_async_engine(url, **options)
+
+engine = create_engine(settings.DATABASE_URL)
+pool_metrics = PoolMetrics()
+pool_metrics.attach(engine)
+SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+@asynccontextmanager
+async def session_scope() -> AsyncIterator[AsyncSession]:
+    """A short-lived session for one unit of work; commits on success, rolls back on error"""
+    async with SessionLocal() as session:
+        started = time.perf_counter()
+        await session.connection()
+        pool_metrics.wait.observe(time.perf_counter() - started)
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+async def get_db() -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency: one session per request, returned to the pool afterwards"""
+    async with session_scope() as session:
+        yield session
+
+async def init_db():
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+async def close_db():
+    await engine.dispose()
+
+def get_pool_metrics() -> Dict:
+    return pool_metrics.snapshot(engine)
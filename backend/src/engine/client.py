@@ -0,0 +1,189 @@
+import asyncio
+import itertools
+import logging
+from typing import Callable, Dict, List, Optional
+
+from ..websocket.bot_events import BotEventBroadcaster
+from .ipc import DEFAULT_SOCKET, encode_frame, read_frame
+
+logger = logging.getLogger(__name__)
+
+class _PerformanceView:
+    """``bot.performance`` as last reported by the engine"""
+
+    def __init__(self, client: "EngineClient"):
+        self._client = client
+
+    def snapshot(self) -> Dict:
+        return self._client.status.get("performance", {})
+
+    @property
+    def total_trades(self) -> int:
+        return self.snapshot().get("total_trades", 0)
+
+    @property
+    def success_rate(self) -> float:
+        return self.snapshot().get("success_rate", 0.0)
+
+class _StrategiesView:
+    """``bot.strategies`` as last reported by the engine"""
+
+    def __init__(self, client: "EngineClient"):
+        self._client = client
+
+    def get_metrics(self) -> Dict:
+        return self._client.status.get("strategies", {})
+
+class EngineClient:
+    """An API worker's handle on the bot running in the engine process.
+
+    Exposes the part of ``HFTBot`` the routes use. Reads (``is_running``,
+    ``performance``, ``active_positions`` ...) are served from the status
+    the engine pushes every few hundred milliseconds, so they never wait on
+    the engine; ``start``/``stop``/``update_settings`` are sent as commands.
+    Every event is passed to ``listeners``, as the bot does. With a
+    ``manager``, trade, position and stats events are delivered to this
+    worker's own WebSocket connections only: every attached worker receives
+    the events itself, so they must not go through the broadcast broker.
+    """
+
+    def __init__(self, path: str = DEFAULT_SOCKET, manager=None, timeout: float = 5.0,
+                 reconnect_delay: float = 1.0):
+        self.path = path
+        self.manager = manager
+        self.timeout = timeout
+        self.reconnect_delay = reconnect_delay
+        self.status: Dict = {}
+        self.active_positions: Dict[str, Dict] = {}
+        self.performance = _PerformanceView(self)
+        self.strategies = _StrategiesView(self)
+        self.listeners: List[Callable[[str, Dict], None]] = []
+        if manager is not None:
+            self.listeners.append(BotEventBroadcaster(manager, local=True).on_bot_event)
+        self.stats = {"connects": 0, "events": 0, "commands": 0, "errors": 0}
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._connected: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self.status.get("is_running"))
+
+    @property
+    def settings(self) -> Dict:
+        return self.status.get("settings", {})
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    async def connect(self):
+        """Attach to the engine, reconnecting in the background whenever the link drops.
+        Waits up to ``timeout`` for the first connection; the API still starts without one"""
+        if self._task is not None:
+            return
+        self._connected = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._connected.wait(), self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Trading engine not reachable at {self.path}; retrying in the background")
+
+    async def close(self):
+        """Detach from the engine; the engine (and the bot) keep running"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def start(self):
+        result = await self.call("start")
+        self.status["is_running"] = result["is_running"]
+        return result
+
+    async def stop(self):
+        result = await self.call("stop")
+        self.status["is_running"] = result["is_running"]
+        return result
+
+    def update_settings(self, new_settings: Dict):
+        """Apply locally right away and forward to the engine"""
+        self.settings.update(new_settings)
+        asyncio.ensure_future(self._call_logged("update_settings", settings=new_settings))
+
+    async def call(self, command: str, **args):
+        if self._writer is None:
+            raise ConnectionError(f"Trading engine not connected ({self.path})")
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self.stats["commands"] += 1
+        try:
+            self._writer.write(encode_frame({"id": request_id, "command": command, "args": args}))
+            reply = await asyncio.wait_for(future, self.timeout)
+        finally:
+            self._pending.pop(request_id, None)
+        if "error" in reply:
+            raise RuntimeError(reply["error"])
+        return reply["result"]
+
+    async def _call_logged(self, command: str, **args):
+        try:
+            await self.call(command, **args)
+        except Exception as e:
+            logger.error(f"Engine command {command} failed: {e}")
+
+    async def _run(self):
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path)
+            except OSError:
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+            self._writer = writer
+            self.stats["connects"] += 1
+            logger.info(f"Attached to trading engine at {self.path}")
+            try:
+                while True:
+                    message = await read_frame(reader)
+                    if message is None:
+                        break
+                    if "event" in message:
+                        self._on_event(message["event"], message["data"])
+                    else:
+                        future = self._pending.get(message.get("id"))
+                        if future is not None and not future.done():
+                            future.set_result(message)
+            except (ConnectionError, ValueError) as e:
+                logger.warning(f"Trading engine connection failed: {e}")
+            finally:
+                self._writer = None
+                writer.close()
+                for future in self._pending.values():
+                    if not future.done():
+                        future.set_exception(ConnectionError("Trading engine disconnected"))
+            logger.warning(f"Detached from trading engine; reconnecting in {self.reconnect_delay}s")
+            await asyncio.sleep(self.reconnect_delay)
+
+    def _on_event(self, event: str, data: Dict):
+        self.stats["events"] += 1
+        try:
+            if event == "status":
+                self.status = data
+                self.active_positions = {position["id"]: position for position in data.get("positions", [])}
+                self._connected.set()
+            elif event == "position":
+                if data.get("status") == "closed":
+                    self.active_positions.pop(data["id"], None)
+                else:
+                    self.active_positions[data["id"]] = data
+            for listener in self.listeners:
+                listener(event, data)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Error handling engine {event} event: {e}")
+
+    def get_metrics(self) -> Dict:
+        return {**self.stats, "connected": self.connected, "engine": self.status.get("engine")}
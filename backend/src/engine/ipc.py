@@ -0,0 +1,44 @@
+"""Framing for the engine <-> API worker Unix socket.
+
+Every frame is a 4-byte big-endian length followed by a msgpack map.
+API workers send commands ``{"id", "command", "args"}``; the engine answers
+each with ``{"id", "result"}`` or ``{"id", "error"}`` and, unprompted,
+streams events ``{"event", "data"}`` to every attached worker.
+"""
+import asyncio
+import struct
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Optional
+
+import msgpack
+import numpy as np
+
+HEADER = struct.Struct(">I")
+MAX_FRAME = 16 * 1024 * 1024
+DEFAULT_SOCKET = "/tmp/dexlink-engine.sock"
+
+def _default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+def encode_frame(message: Dict) -> bytes:
+    body = msgpack.packb(message, default=_default, use_bin_type=True)
+    return HEADER.pack(len(body)) + body
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[Dict]:
+    """Next frame, or None once the peer has closed the socket"""
+    try:
+        header = await reader.readexactly(HEADER.size)
+        (length,) = HEADER.unpack(header)
+        if length > MAX_FRAME:
+            raise ValueError(f"Frame of {length} bytes exceeds {MAX_FRAME}")
+        body = await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        return None
+    return msgpack.unpackb(body, raw=False)
@@ -0,0 +1,272 @@
+"""The trading engine as its own process.
+
+Runs the HFT bot on a dedicated, optionally CPU-pinned process so that
+WebSocket fan-out, JSON encoding and request handling in the API workers
+never share its event loop or GIL. API workers attach over a Unix socket
+(``engine.client.EngineClient``); any number can be attached at once.
+
+    python -m src.engine.server --socket /tmp/dexlink-engine.sock --cpus 3
+
+with ``ENGINE_MODE=process`` (and the same ``ENGINE_SOCKET``) set for the
+API workers. The bot's metrics live in this process's registry, which is
+served at ``/metrics`` on ``--metrics-port``.
+"""
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import signal
+import time
+from typing import Dict, List, Optional, Set
+
+from aiohttp import web
+from sqlalchemy import func, select
+
+from ..utils.metrics import LoopLagMonitor, metrics
+from .ipc import DEFAULT_SOCKET, encode_frame, read_frame
+
+logger = logging.getLogger(__name__)
+
+EVENTS = metrics.counter("engine_events_total", "Events streamed to attached API workers, by kind", labels=("event",))
+COMMAND_SECONDS = metrics.histogram("engine_command_seconds", "Engine command handling time", labels=("command",))
+
+async def seed_performance(bot):
+    """Seed the bot's running aggregates once from the trade table"""
+    from ..database import session_scope
+    from ..models.trade import BotTrade
+
+    async with session_scope() as db:
+        count = select(func.count()).select_from(BotTrade)
+        bot.performance.seed(
+            total_trades=await db.scalar(count),
+            successful_trades=await db.scalar(count.where(BotTrade.success.is_(True)))
+        )
+
+class EngineServer:
+    """Serves one HFTBot to the API workers attached to a Unix socket.
+
+    Bot events are encoded once and written to every attached worker
+    without waiting for them to drain; a worker whose unsent backlog grows
+    past ``max_buffer`` is disconnected (it reconnects and gets a fresh
+    status) rather than slowing the bot down. A ``status`` event carrying
+    what the REST endpoints serve is pushed every ``status_interval``.
+    """
+
+    def __init__(self, bot, path: str = DEFAULT_SOCKET, status_interval: float = 0.5,
+                 max_buffer: int = 8 * 1024 * 1024):
+        self.bot = bot
+        self.path = path
+        self.status_interval = status_interval
+        self.max_buffer = max_buffer
+        self.peers: Set[asyncio.StreamWriter] = set()
+        self.stats = {"attached": 0, "detached": 0, "dropped": 0, "commands": 0, "events": 0}
+        self.commands = {
+            "start": self._start,
+            "stop": self._stop,
+            "update_settings": self._update_settings,
+            "status": self.status
+        }
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._bot_task: Optional[asyncio.Task] = None
+        self._status_task: Optional[asyncio.Task] = None
+        bot.listeners.append(self._on_event)
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._serve, path=self.path)
+        self._status_task = asyncio.create_task(self._publish_status())
+        logger.info(f"Engine listening on {self.path}")
+
+    async def stop(self):
+        if self._status_task is not None:
+            self._status_task.cancel()
+            await asyncio.gather(self._status_task, return_exceptions=True)
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self.peers):
+                writer.close()
+            await self._server.wait_closed()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def status(self) -> Dict:
+        bot = self.bot
+        return {
+            "is_running": bot.is_running,
+            "settings": bot.settings,
+            "positions": list(bot.active_positions),
+            "performance": bot.performance.snapshot(),
+            "strategies": bot.strategies.get_metrics(),
+            "engine": {**self.stats, "pid": os.getpid(), "cpus": _cpus()}
+        }
+
+    async def _start(self) -> Dict:
+        if self._bot_task is None or self._bot_task.done():
+            self._bot_task = asyncio.create_task(self.bot.start())
+            # HFTBot.start marks itself running before its first await
+            await asyncio.sleep(0)
+        return {"is_running": self.bot.is_running}
+
+    async def _stop(self) -> Dict:
+        await self.bot.stop()
+        return {"is_running": self.bot.is_running}
+
+    def _update_settings(self, settings: Dict) -> Dict:
+        self.bot.update_settings(settings)
+        return self.bot.settings
+
+    def _on_event(self, event: str, data: Dict):
+        EVENTS.labels(event).inc()
+        self._publish({"event": event, "data": data})
+
+    def _publish(self, message: Dict):
+        if not self.peers:
+            return
+        frame = encode_frame(message)
+        self.stats["events"] += 1
+        for writer in list(self.peers):
+            if writer.transport.get_write_buffer_size() > self.max_buffer:
+                logger.warning("API worker is not reading engine events; disconnecting it")
+                self.stats["dropped"] += 1
+                self.peers.discard(writer)
+                writer.close()
+                continue
+            writer.write(frame)
+
+    async def _publish_status(self):
+        while True:
+            await asyncio.sleep(self.status_interval)
+            try:
+                self._publish({"event": "status", "data": self.status()})
+            except Exception as e:
+                logger.error(f"Error publishing engine status: {e}")
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.peers.add(writer)
+        self.stats["attached"] += 1
+        try:
+            writer.write(encode_frame({"event": "status", "data": self.status()}))
+            while True:
+                message = await read_frame(reader)
+                if message is None:
+                    break
+                reply = await self._handle(message)
+                if writer in self.peers:
+                    writer.write(encode_frame(reply))
+        except (ConnectionError, ValueError) as e:
+            logger.warning(f"API worker connection failed: {e}")
+        finally:
+            self.peers.discard(writer)
+            self.stats["detached"] += 1
+            writer.close()
+
+    async def _handle(self, message: Dict) -> Dict:
+        command = message.get("command")
+        self.stats["commands"] += 1
+        started = time.perf_counter()
+        try:
+            handler = self.commands.get(command)
+            if handler is None:
+                raise ValueError(f"Unknown engine command {command!r}")
+            result = handler(**(message.get("args") or {}))
+            if asyncio.iscoroutine(result):
+                result = await result
+            return {"id": message.get("id"), "result": result}
+        except Exception as e:
+            logger.error(f"Engine command {command} failed: {e}")
+            return {"id": message.get("id"), "error": str(e)}
+        finally:
+            if command in self.commands:
+                COMMAND_SECONDS.labels(command).observe(time.perf_counter() - started)
+
+async def serve_metrics(port: int, host: str = "0.0.0.0") -> web.AppRunner:
+    """Serve this process's metrics registry (hft_*, engine_*, copy_* ...) at /metrics"""
+    async def render(request: web.Request) -> web.Response:
+        return web.Response(
+            body=metrics.render().encode(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", render)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Engine metrics on http://{host}:{port}/metrics")
+    return runner
+
+def _cpus() -> Optional[List[int]]:
+    return sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else None
+
+def pin(cpus: List[int]):
+    """Restrict this process to ``cpus`` (Linux only; a no-op elsewhere)"""
+    if not cpus or not hasattr(os, "sched_setaffinity"):
+        return
+    os.sched_setaffinity(0, set(cpus))
+    logger.info(f"Engine pinned to CPUs {_cpus()}")
+
+async def serve(path: str, status_interval: float, autostart: bool, metrics_port: int = 0):
+    from ..copytrading.engine import CopyTradingEngine
+    from ..database import close_db, init_db
+    from ..hft.bot import bot_from_settings
+    from ..persistence.writer import writer
+    from ..websocket.manager import manager
+
+    await init_db()
+    await writer.start()
+    # Follower position updates are published to the broker from here
+    await manager.start()
+    bot = bot_from_settings(persistence=writer)
+    await seed_performance(bot)
+    # Follower position updates reach the API workers' clients through the broadcast broker
+    copier = CopyTradingEngine(persistence=writer, manager=manager, price_source=bot.amm.price)
+    bot.listeners.append(copier.on_bot_event)
+    await copier.load()
+    server = EngineServer(bot, path, status_interval=status_interval)
+    await server.start()
+    loop_lag = LoopLagMonitor(metrics)
+    loop_lag.start()
+    metrics_runner = await serve_metrics(metrics_port) if metrics_port else None
+
+    # Everything allocated so far lives for the whole run; keep the collector from rescanning it
+    gc.collect()
+    gc.freeze()
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+    if autostart:
+        await server.commands["start"]()
+    await stopping.wait()
+
+    await bot.stop()
+    await server.stop()
+    if metrics_runner is not None:
+        await metrics_runner.cleanup()
+    await loop_lag.stop()
+    await writer.stop()
+    await manager.stop()
+    await close_db()
+
+def main():
+    from ..config import settings
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--socket", default=getattr(settings, "ENGINE_SOCKET", DEFAULT_SOCKET))
+    parser.add_argument("--cpus", default=getattr(settings, "ENGINE_CPUS", ""),
+                        help="comma-separated CPUs to pin the engine to, e.g. 3")
+    parser.add_argument("--status-interval", type=float, default=getattr(settings, "ENGINE_STATUS_INTERVAL", 0.5))
+    parser.add_argument("--autostart", action="store_true", help="start trading without waiting for a start command")
+    parser.add_argument("--metrics-port", type=int, default=getattr(settings, "ENGINE_METRICS_PORT", 9101),
+                        help="port the engine's /metrics is served on (0: not served)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    pin([int(cpu) for cpu in str(args.cpus).split(",") if cpu.strip()])
+    asyncio.run(serve(args.socket, args.status_interval, args.autostart, args.metrics_port))
+
+if __name__ == "__main__":
+    main()
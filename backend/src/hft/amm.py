@@ -0,0 +1,340 @@
+import logging
+import math
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+import numpy as np
+from eth_utils import event_signature_to_log_topic, function_signature_to_4byte_selector
+
+from .decoder import WETH
+from .rpc import JsonRpcClient
+
+logger = logging.getLogger(__name__)
+
+SYNC_TOPIC = "0x" + event_signature_to_log_topic("Sync(uint112,uint112)").hex()
+SWAP_V3_TOPIC = "0x" + event_signature_to_log_topic(
+    "Swap(address,address,int256,int256,uint160,uint128,int24)"
+).hex()
+
+GET_RESERVES = "0x" + function_signature_to_4byte_selector("getReserves()").hex()
+SLOT0 = "0x" + function_signature_to_4byte_selector("slot0()").hex()
+LIQUIDITY = "0x" + function_signature_to_4byte_selector("liquidity()").hex()
+
+Q96 = 1 << 96
+FEE_DENOMINATOR = 1_000_000
+
+Amounts = Union[np.ndarray, List[float]]
+
+def _words(data) -> List[int]:
+    if isinstance(data, str):
+        data = bytes.fromhex(data[2:])
+    return [int.from_bytes(data[i:i + 32], "big") for i in range(0, len(data), 32)]
+
+def _signed(word: int) -> int:
+    return word - (1 << 256) if word >= 1 << 255 else word
+
+class V2Pool:
+    """Constant-product pool (Uniswap v2 and forks); ``fee`` in millionths (3000 = 0.3%)"""
+
+    kind = "v2"
+    # Fields loaded from chain and kept current from logs
+    STATE = ("reserve0", "reserve1")
+
+    def __init__(self, address: str, token0: str, token1: str, fee: int = 3000,
+                 reserve0: int = 0, reserve1: int = 0):
+        self.address = address.lower()
+        self.token0 = token0.lower()
+        self.token1 = token1.lower()
+        self.fee = fee
+        self.reserve0 = reserve0
+        self.reserve1 = reserve1
+        self.block_number: Optional[int] = None
+
+    def apply_log(self, topic: str, data, block_number: Optional[int] = None):
+        if topic == SYNC_TOPIC:
+            self.reserve0, self.reserve1 = _words(data)[:2]
+            self.block_number = block_number
+
+    @property
+    def depth(self) -> int:
+        """Virtual liquidity sqrt(x * y), comparable with a v3 pool's ``liquidity``"""
+        return math.isqrt(self.reserve0 * self.reserve1)
+
+    def mid_price(self) -> float:
+        """token1 per token0, raw units"""
+        return self.reserve1 / self.reserve0 if self.reserve0 else float("nan")
+
+    def quote(self, amount_in: int, zero_for_one: bool) -> int:
+        """Exact output for an input amount, as the pair contract computes it"""
+        reserve_in, reserve_out = (
+            (self.reserve0, self.reserve1) if zero_for_one else (self.reserve1, self.reserve0)
+        )
+        if amount_in <= 0 or not reserve_in or not reserve_out:
+            return 0
+        amount_in_with_fee = amount_in * (FEE_DENOMINATOR - self.fee)
+        return amount_in_with_fee * reserve_out // (reserve_in * FEE_DENOMINATOR + amount_in_with_fee)
+
+    def quote_many(self, amounts_in: Amounts, zero_for_one: bool) -> np.ndarray:
+        """Outputs for many input sizes at once (float64)"""
+        amounts = np.asarray(amounts_in, dtype=np.float64)
+        reserve_in, reserve_out = (
+            (float(self.reserve0), float(self.reserve1)) if zero_for_one
+            else (float(self.reserve1), float(self.reserve0))
+        )
+        if not reserve_in or not reserve_out:
+            return np.zeros_like(amounts)
+        with_fee = amounts * (1 - self.fee / FEE_DENOMINATOR)
+        return with_fee * reserve_out / (reserve_in + with_fee)
+
+class V3Pool:
+    """Concentrated-liquidity pool (Uniswap v3); ``fee`` in millionths.
+
+    The mirror tracks price, active liquidity and tick from Swap logs but
+    not the tick bitmap, so quotes assume the trade stays inside the
+    current tick range. That holds for sizes that are small next to the
+    active liquidity; larger quotes are optimistic. Mint/Burn inside the
+    current range show up in ``liquidity`` with the next Swap.
+    """
+
+    kind = "v3"
+    STATE = ("sqrt_price_x96", "liquidity", "tick")
+
+    def __init__(self, address: str, token0: str, token1: str, fee: int = 3000,
+                 sqrt_price_x96: int = 0, liquidity: int = 0, tick: int = 0):
+        self.address = address.lower()
+        self.token0 = token0.lower()
+        self.token1 = token1.lower()
+        self.fee = fee
+        self.sqrt_price_x96 = sqrt_price_x96
+        self.liquidity = liquidity
+        self.tick = tick
+        self.block_number: Optional[int] = None
+
+    def apply_log(self, topic: str, data, block_number: Optional[int] = None):
+        if topic == SWAP_V3_TOPIC:
+            words = _words(data)
+            self.sqrt_price_x96 = words[2]
+            self.liquidity = words[3]
+            self.tick = _signed(words[4])
+            self.block_number = block_number
+
+    @property
+    def depth(self) -> int:
+        return self.liquidity
+
+    def mid_price(self) -> float:
+        """token1 per token0, raw units"""
+        return (self.sqrt_price_x96 / Q96) ** 2 if self.sqrt_price_x96 else float("nan")
+
+    def quote(self, amount_in: int, zero_for_one: bool) -> int:
+        """Output for an input amount within the current tick range (integer math)"""
+        liquidity, sqrt_price = self.liquidity, self.sqrt_price_x96
+        if amount_in <= 0 or not liquidity or not sqrt_price:
+            return 0
+        amount = amount_in * (FEE_DENOMINATOR - self.fee) // FEE_DENOMINATOR
+        if zero_for_one:
+            # Price falls: sqrtP' = L * sqrtP / (L + amount * sqrtP / Q96)
+            numerator = liquidity * Q96
+            sqrt_next = numerator * sqrt_price // (numerator + amount * sqrt_price)
+            return liquidity * (sqrt_price - sqrt_next) // Q96
+        # Price rises: sqrtP' = sqrtP + amount * Q96 / L
+        sqrt_next = sqrt_price + amount * Q96 // liquidity
+        return liquidity * Q96 * (sqrt_next - sqrt_price) // sqrt_next // sqrt_price
+
+    def quote_many(self, amounts_in: Amounts, zero_for_one: bool) -> np.ndarray:
+        """Outputs for many input sizes at once (float64, same single-range model)"""
+        amounts = np.asarray(amounts_in, dtype=np.float64)
+        liquidity = float(self.liquidity)
+        sqrt_price = self.sqrt_price_x96 / Q96
+        if not liquidity or not sqrt_price:
+            return np.zeros_like(amounts)
+        amounts = amounts * (1 - self.fee / FEE_DENOMINATOR)
+        if zero_for_one:
+            sqrt_next = liquidity * sqrt_price / (liquidity + amounts * sqrt_price)
+            return liquidity * (sqrt_price - sqrt_next)
+        sqrt_next = sqrt_price + amounts / liquidity
+        return liquidity * (sqrt_next - sqrt_price) / (sqrt_next * sqrt_price)
+
+Pool = Union[V2Pool, V3Pool]
+
+POOL_KINDS = {"v2": V2Pool, "v3": V3Pool}
+
+def pool_from_spec(spec: Dict) -> Pool:
+    """A pool from its configuration: ``address``, ``kind`` (v2/v3), ``token0``,
+    ``token1`` and ``fee``, plus optionally its state fields (a snapshot)"""
+    cls = POOL_KINDS[spec.get("kind", "v2")]
+    state = {name: int(spec[name]) for name in cls.STATE if spec.get(name) is not None}
+    return cls(spec["address"], spec["token0"], spec["token1"], fee=int(spec.get("fee", 3000)), **state)
+
+class PoolMirror:
+    """In-memory state of the pools we trade, kept current from logs.
+
+    ``apply_logs`` folds a block's Sync (v2) and Swap (v3) logs into the
+    pools they belong to; quotes, mid prices and what-if size sweeps are
+    then computed locally without RPC. ``decimals`` converts raw-unit
+    prices into token prices; ``symbols`` names tokens for display.
+    """
+
+    def __init__(self, quote_token: str = WETH):
+        self.quote_token = quote_token.lower()
+        self.pools: Dict[str, Pool] = {}
+        self.decimals: Dict[str, int] = {}
+        self.symbols: Dict[str, str] = {}
+        self._pairs: Dict[Tuple[str, str], List[Pool]] = {}
+        self.block_number: Optional[int] = None
+        self.stats = {"logs": 0, "applied": 0}
+
+    def add_pool(self, pool: Pool, decimals0: int = 18, decimals1: int = 18):
+        self.pools[pool.address] = pool
+        self.decimals.setdefault(pool.token0, decimals0)
+        self.decimals.setdefault(pool.token1, decimals1)
+        self._pairs.setdefault((pool.token0, pool.token1), []).append(pool)
+        self._pairs.setdefault((pool.token1, pool.token0), []).append(pool)
+
+    def add_pools(self, specs: Iterable[Dict]):
+        """Register pools from configuration (see ``pool_from_spec``); ``decimals0`` /
+        ``decimals1`` default to 18, ``symbol0`` / ``symbol1`` are optional"""
+        for spec in specs:
+            pool = pool_from_spec(spec)
+            self.add_pool(pool, int(spec.get("decimals0", 18)), int(spec.get("decimals1", 18)))
+            for token, key in ((pool.token0, "symbol0"), (pool.token1, "symbol1")):
+                if spec.get(key):
+                    self.symbols[token] = spec[key]
+
+    def snapshot(self) -> List[Dict]:
+        """Every pool's configuration and current state; ``add_pools`` restores it"""
+        return [
+            {
+                "address": pool.address,
+                "kind": pool.kind,
+                "token0": pool.token0,
+                "token1": pool.token1,
+                "fee": pool.fee,
+                "decimals0": self.decimals[pool.token0],
+                "decimals1": self.decimals[pool.token1],
+                **{key: self.symbols[token] for token, key in ((pool.token0, "symbol0"), (pool.token1, "symbol1"))
+                   if token in self.symbols},
+                **{name: getattr(pool, name) for name in pool.STATE}
+            }
+            for pool in self.pools.values()
+        ]
+
+    @property
+    def addresses(self) -> List[str]:
+        return list(self.pools)
+
+    def apply_logs(self, logs: Iterable[Dict]) -> Set[str]:
+        """Apply logs in chain order; returns the tokens whose pools changed"""
+        touched: Set[str] = set()
+        for log in logs:
+            self.stats["logs"] += 1
+            pool = self.pools.get((log.get("address") or "").lower())
+            topics = log.get("topics") or ()
+            if pool is None or not topics:
+                continue
+            block_number = log.get("blockNumber")
+            if isinstance(block_number, str):
+                block_number = int(block_number, 16)
+            pool.apply_log(topics[0], log.get("data") or "0x", block_number)
+            self.stats["applied"] += 1
+            touched.add(pool.token0)
+            touched.add(pool.token1)
+        return touched
+
+    async def fetch_logs(self, rpc: JsonRpcClient, from_block: int, to_block: int) -> List[Dict]:
+        """The pools' Sync/Swap logs for a block range"""
+        if not self.pools:
+            return []
+        logs = await rpc.call("eth_getLogs", [{
+            "fromBlock": hex(from_block),
+            "toBlock": hex(to_block),
+            "address": self.addresses,
+            "topics": [[SYNC_TOPIC, SWAP_V3_TOPIC]]
+        }])
+        return logs or []
+
+    async def sync(self, rpc: JsonRpcClient, from_block: int, to_block: int) -> Set[str]:
+        """Fetch and apply the pools' logs for a block range"""
+        if not self.pools:
+            return set()
+        touched = self.apply_logs(await self.fetch_logs(rpc, from_block, to_block))
+        self.block_number = to_block
+        return touched
+
+    async def bootstrap(self, rpc: JsonRpcClient, block: str = "latest"):
+        """Load every pool's current state with one batched round-trip"""
+        calls = []
+        for pool in self.pools.values():
+            if pool.kind == "v2":
+                calls.append(("eth_call", [{"to": pool.address, "data": GET_RESERVES}, block]))
+            else:
+                calls.append(("eth_call", [{"to": pool.address, "data": SLOT0}, block]))
+                calls.append(("eth_call", [{"to": pool.address, "data": LIQUIDITY}, block]))
+        results = iter(await rpc.batch(calls, raise_errors=True))
+        for pool in self.pools.values():
+            if pool.kind == "v2":
+                pool.reserve0, pool.reserve1 = _words(next(results))[:2]
+            else:
+                slot0 = _words(next(results))
+                pool.sqrt_price_x96, pool.tick = slot0[0], _signed(slot0[1])
+                pool.liquidity = _words(next(results))[0]
+
+    def pools_for(self, token_in: str, token_out: str) -> List[Pool]:
+        return self._pairs.get((token_in.lower(), token_out.lower()), [])
+
+    def quote(self, token_in: str, token_out: str, amount_in: int) -> Tuple[int, Optional[Pool]]:
+        """Best output over the mirrored pools for a pair, and the pool giving it"""
+        token_in = token_in.lower()
+        best, best_pool = 0, None
+        for pool in self.pools_for(token_in, token_out):
+            amount_out = pool.quote(amount_in, token_in == pool.token0)
+            if amount_out > best:
+                best, best_pool = amount_out, pool
+        return best, best_pool
+
+    def quote_sizes(self, token_in: str, token_out: str, amounts_in: Amounts) -> Tuple[np.ndarray, np.ndarray]:
+        """What-if sweep: best output per input size and the index of the pool
+        (in ``pools_for`` order) giving it; outputs are 0 with no pool"""
+        token_in = token_in.lower()
+        pools = self.pools_for(token_in, token_out)
+        amounts = np.asarray(amounts_in, dtype=np.float64)
+        if not pools:
+            return np.zeros_like(amounts), np.full(amounts.shape, -1)
+        outputs = np.vstack([pool.quote_many(amounts, token_in == pool.token0) for pool in pools])
+        best = outputs.argmax(axis=0)
+        return outputs[best, np.arange(amounts.size)], best
+
+    def mid_price(self, token_in: str, token_out: str) -> Optional[float]:
+        """Units of ``token_out`` per ``token_in`` at the deepest pool's mid price"""
+        token_in, token_out = token_in.lower(), token_out.lower()
+        pools = self.pools_for(token_in, token_out)
+        if not pools:
+            return None
+        pool = max(pools, key=lambda p: p.depth)
+        raw = pool.mid_price()
+        if not raw or np.isnan(raw):
+            return None
+        if token_in != pool.token0:
+            raw = 1 / raw
+        return raw * 10 ** (self.decimals.get(token_in, 18) - self.decimals.get(token_out, 18))
+
+    def price(self, token: str) -> Optional[Decimal]:
+        """Price of a token in the quote token (WETH by default); None if no pool is mirrored"""
+        if token.lower() == self.quote_token:
+            return Decimal(1)
+        price = self.mid_price(token, self.quote_token)
+        return None if price is None else Decimal(repr(price))
+
+    def slippage(self, token_in: str, token_out: str, amount_in: int) -> Optional[float]:
+        """Price impact of a trade: the fraction of output lost versus the mid price,
+        net of the pool fee. None if no pool is mirrored for the pair"""
+        mid = self.mid_price(token_in, token_out)
+        amount_out, pool = self.quote(token_in, token_out, amount_in)
+        if pool is None or not mid or not amount_in:
+            return None
+        scale = 10 ** (self.decimals.get(token_out.lower(), 18) - self.decimals.get(token_in.lower(), 18))
+        expected = amount_in * mid * scale * (1 - pool.fee / FEE_DENOMINATOR)
+        return 1 - amount_out / expected
+
+    def get_metrics(self) -> Dict:
+        return {**self.stats, "pools": len(self.pools), "block_number": self.block_number}
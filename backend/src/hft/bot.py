@@ -1,16 +1,63 @@
 import asyncio
+import json
 import logging
-from typing import Dict, List, Optional
+import math
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 from web3 import Web3
 from decimal import Decimal
+from .rpc import JsonRpcClient
+from .mempool import MempoolIngestor
+from .decoder import SwapDecoder
+from .amm import PoolMirror
+from .execution import ExecutionPipeline, succeeded
+from .pricing import PriceService
+from .positions import LONG, PositionBook, close_reason, realized_pnl
+from .performance import BotPerformance
+from .strategies.base import Decision, Strategy
+from .strategies.engine import StrategyEngine
+from ..utils.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+TRADE_HISTORY_SIZE = 10_000
+
+ANALYZE_SECONDS = metrics.histogram("hft_analyze_seconds", "Pending transaction classification and strategy evaluation time")
+EXECUTE_SECONDS = metrics.histogram("hft_execute_seconds", "Trade execution time, decision to broadcast (or paper fill)")
+PRICE_FETCH_SECONDS = metrics.histogram("hft_price_fetch_seconds", "Price fetch time per PriceService batch")
+DECISIONS = metrics.counter("hft_decisions_total", "Strategy decisions to trade")
+
 class HFTBot:
-    def __init__(self, web3_provider: str, private_key: Optional[str] = None):
+    def __init__(
+        self,
+        web3_provider: str,
+        private_key: Optional[str] = None,
+        persistence=None,
+        strategies: Optional[List[Strategy]] = None,
+        strategy_processes: int = 2,
+        dry_run: bool = False,
+        chain_id: int = 1,
+        submit_urls: Optional[List[str]] = None
+    ):
         self.w3 = Web3(Web3.HTTPProvider(web3_provider))
+        self.rpc = JsonRpcClient(web3_provider)
+        self.mempool = MempoolIngestor(self.rpc, self._analyze_transaction)
+        self.decoder = SwapDecoder()
+        self.strategies = StrategyEngine(strategies or (), processes=strategy_processes)
+        # Local reserves/ticks of the pools we trade; prices and quotes come from here
+        self.amm = PoolMirror()
+        self.prices = PriceService(self._fetch_prices)
+        self.block_number: Optional[int] = None
+        self._new_block: Optional[asyncio.Event] = None
         self.private_key = private_key
+        self.chain_id = chain_id
+        # Endpoints signed transactions are broadcast to (all at once); defaults to web3_provider
+        self.submit_urls = submit_urls
+        self.execution: Optional[ExecutionPipeline] = None
+        # Dry run: decisions are filled on paper at the current price instead of sent on chain
+        self.dry_run = dry_run
         self.is_running = False
         self.settings = {
             'max_positions': 5,
@@ -18,8 +65,21 @@ class HFTBot:
             'min_spread': 0.05,
             'max_slippage': 0.1
         }
-        self.active_positions: List[Dict] = []
-        self.trade_history: List[Dict] = []
+        self.active_positions = PositionBook()
+        # Positions with a close in flight; not closed again until it settles
+        self._closing: set = set()
+        self.risk: Dict = {}
+        # Most recent trades only; totals live in self.performance
+        self.trade_history: deque = deque(maxlen=TRADE_HISTORY_SIZE)
+        self.performance = BotPerformance()
+        # Write-behind sink for Trade / BotTrade rows (persistence.writer.TradeWriter)
+        self.persistence = persistence
+        self.bot_id = "hft-bot"
+        # Called with (event, data) for every trade, position open/close, stats update and
+        # price change of a mirrored token; the engine process streams these to the API workers
+        self.listeners: List[Callable[[str, Dict], None]] = []
+        # Receipt waits and router approvals running in the background
+        self._tasks: set = set()
         
     async def start(self):
         """Start the HFT bot"""
@@ -27,11 +87,26 @@ class HFTBot:
             return
         
         self.is_running = True
+        self._new_block = asyncio.Event()
+        self.strategies.start()
+        if self.private_key and not self.dry_run and self.execution is None:
+            try:
+                self.execution = ExecutionPipeline(
+                    self.rpc, self.private_key, chain_id=self.chain_id, submit_urls=self.submit_urls
+                )
+            except Exception as e:
+                logger.error(f"Error setting up trade execution: {e}")
+        if self.amm.pools:
+            try:
+                await self.amm.bootstrap(self.rpc)
+            except Exception as e:
+                logger.error(f"Error loading pool state: {e}")
         logger.info("HFT bot started")
         
         try:
             await asyncio.gather(
                 self.monitor_mempool(),
+                self.monitor_blocks(),
                 self.monitor_positions(),
                 self.update_stats()
             )
@@ -42,90 +117,423 @@ class HFTBot:
     async def stop(self):
         """Stop the HFT bot"""
         self.is_running = False
+        await self.mempool.stop()
+        self.strategies.shutdown()
+        if self.execution is not None:
+            await self.execution.close()
+            self.execution = None
+        if self._tasks:
+            # Trades still waiting for a receipt are recorded as pending
+            await asyncio.gather(*self._tasks, return_exceptions=True)
         logger.info("HFT bot stopped")
         
     async def monitor_mempool(self):
         """Monitor mempool for trading opportunities"""
+        # Non-blocking ingestion: batched RPC, dedupe, bounded queue, analyzer workers
+        await self.mempool.run()
+
+    async def _analyze_transaction(self, tx: Dict):
+        """Analyze a pending transaction and trade on it if profitable"""
+        detected = time.perf_counter()
+        if self.persistence is not None and self.persistence.saturated:
+            # The database is falling behind; don't open more trades until it catches up
+            return
+        # Cheap router/selector filter first; only known swaps get decoded
+        swap = self.decoder.classify(tx)
+        if swap is None:
+            ANALYZE_SECONDS.observe(time.perf_counter() - detected)
+            return
+        # Only the strategies that declared interest in this router/function/pool see it
+        decisions = await self.strategies.evaluate(swap, {"block_number": self.block_number})
+        ANALYZE_SECONDS.observe(time.perf_counter() - detected)
+        if decisions:
+            DECISIONS.inc(len(decisions))
+            await asyncio.gather(*(self._execute_trade(tx, decision, detected) for decision in decisions))
+            
+    async def monitor_blocks(self, poll_interval: float = 0.25):
+        """Track the chain head and hand every new block to ``on_block``"""
         while self.is_running:
             try:
-                # Get pending transactions from mempool
-                pending_txs = self.w3.eth.get_block('pending', full_transactions=True)
-                
-                for tx in pending_txs.transactions:
-                    # Analyze transaction for opportunities
-                    if self._is_profitable_opportunity(tx):
-                        await self._execute_trade(tx)
-                        
+                block_number = int(await self.rpc.call("eth_blockNumber"), 16)
+                if block_number != self.block_number:
+                    await self.on_block(block_number)
             except Exception as e:
-                logger.error(f"Error monitoring mempool: {e}")
-                
-            await asyncio.sleep(0.1)  # Small delay to prevent overwhelming the node
-            
+                logger.error(f"Error monitoring blocks: {e}")
+
+            await asyncio.sleep(poll_interval)
+
+    async def on_block(self, block_number: int):
+        """Fold a new block into the pool mirror, invalidate the prices it moved and
+        publish them, settle the trades it mined and trigger a position check"""
+        touched = None
+        if self.amm.pools:
+            first = block_number if self.block_number is None else self.block_number + 1
+            touched = await self.amm.sync(self.rpc, first, block_number)
+        self.block_number = block_number
+        self.prices.on_new_block(block_number, touched)
+        for token in touched or ():
+            price = self.amm.price(token) if token != self.amm.quote_token else None
+            if price is not None:
+                self._emit("price", {
+                    "token": token,
+                    "symbol": self.amm.symbols.get(token, token),
+                    "price": float(price),
+                    "block_number": block_number
+                })
+        if self.execution is not None:
+            await self.execution.receipts.poll(block_number)
+        if self._new_block is not None:
+            self._new_block.set()
+
     async def monitor_positions(self):
         """Monitor and manage active positions"""
         while self.is_running:
             try:
-                for position in self.active_positions:
-                    # Check if take profit or stop loss hit
-                    current_price = await self._get_current_price(position['token'])
-                    
-                    if self._should_close_position(position, current_price):
-                        await self._close_position(position)
-                        
+                await self.check_positions()
             except Exception as e:
                 logger.error(f"Error monitoring positions: {e}")
-                
-            await asyncio.sleep(1)
-            
+
+            # Re-check on every new block, or at least once a second
+            try:
+                await asyncio.wait_for(self._new_block.wait(), timeout=1)
+            except asyncio.TimeoutError:
+                pass
+            self._new_block.clear()
+
+    async def check_positions(self):
+        """Check every open position against current prices and close the triggered ones"""
+        if not len(self.active_positions):
+            return
+        # One fetch per distinct token, all tokens concurrently
+        prices = await self.prices.get_prices(self.active_positions.active_tokens())
+
+        # Stop loss / take profit / liquidation and per-token PnL in one vectorized pass
+        self.risk = self.active_positions.evaluate(prices)
+        to_close = [self.active_positions.get(pid) for pid, _ in self.risk["close"] if pid not in self._closing]
+        if to_close:
+            await asyncio.gather(*(self._close_position(p) for p in to_close))
+
     async def update_stats(self):
         """Update bot statistics"""
         while self.is_running:
             try:
-                # Calculate and update performance metrics
-                total_trades = len(self.trade_history)
-                successful_trades = len([t for t in self.trade_history if t['pnl'] > 0])
-                success_rate = (successful_trades / total_trades * 100) if total_trades > 0 else 0
-                
+                # Aggregates are maintained per trade; this only reads them
                 stats = {
-                    'total_trades': total_trades,
-                    'success_rate': success_rate,
+                    'total_trades': self.performance.total_trades,
+                    'success_rate': self.performance.success_rate,
                     'active_positions': len(self.active_positions),
                     'timestamp': datetime.utcnow().isoformat()
                 }
                 
                 logger.info(f"Bot stats updated: {stats}")
+                self._emit("stats", stats)
                 
             except Exception as e:
                 logger.error(f"Error updating stats: {e}")
                 
             await asyncio.sleep(5)
             
-    def _is_profitable_opportunity(self, tx) -> bool:
-        """Analyze if a transaction presents a profitable opportunity"""
-        # Implement opportunity analysis logic
-        return False
-        
-    async def _execute_trade(self, tx):
-        """Execute a trade based on identified opportunity"""
-        # Implement trade execution logic
-        pass
+    def record_trade(self, trade: Dict):
+        """Record a completed trade in the history ring buffer and running aggregates"""
+        self.trade_history.append(trade)
+        self.performance.record_trade(trade)
+        self._emit("trade", trade)
+
+    def _emit(self, event: str, data: Dict):
+        for listener in self.listeners:
+            try:
+                listener(event, data)
+            except Exception as e:
+                logger.error(f"Error in {event} listener: {e}")
+
+    def _record_fill(self, trade: Dict, bot_trade: Dict, execution_time: float):
+        """Record a settled trade. ``execution_time`` (ms) is taken by the caller before
+        the rows are handed to the write-behind queue, so it never includes database I/O"""
+        bot_trade = {"bot_id": self.bot_id, **bot_trade, "execution_time": execution_time}
+        self.record_trade({**trade, **bot_trade})
+        if self.persistence is not None:
+            self.persistence.submit_trade(trade)
+            self.persistence.submit_bot_trade(bot_trade, trade_tx_hash=trade.get("tx_hash"))
+
+    async def _execute_trade(self, tx, decision: Decision, detected: Optional[float] = None):
+        """Execute a strategy's decision; the fill is recorded with
+        ``decision.as_bot_trade()`` so BotTrade.strategy names the strategy.
+        ``detected`` is when the triggering transaction arrived, so
+        execution_time covers the whole detect-to-broadcast path"""
+        executing = time.perf_counter()
+        started = detected if detected is not None else executing
+        if not self._within_slippage(decision):
+            return
+        settled = None
+        if decision.side == "buy":
+            settled = lambda trade: self._open_position(trade, decision)
+        if self.dry_run:
+            await self._paper_fill(tx, decision, started, settled)
+        else:
+            await self._submit(decision, started, {"trigger_tx": _hash_of(tx)}, settled)
+        EXECUTE_SECONDS.observe(time.perf_counter() - executing)
+
+    def _open_position(self, trade: Dict, decision: Decision):
+        """Open a position for a buy once it executed (on chain or on paper)"""
+        if trade["status"] != "executed" or math.isnan(trade["price"]):
+            # An unpriced fill could never be checked against its stop loss / take profit
+            return
+        self.active_positions.add(
+            trade["tx_hash"],
+            decision.token,
+            trade["price"],
+            decision.amount,
+            stop_loss=decision.stop_loss,
+            take_profit=decision.profit_target,
+            token_address=decision.token,
+            strategy=decision.strategy
+        )
+        self._emit("position", {**self.active_positions.get(trade["tx_hash"]), "status": "open"})
+        if self.execution is not None:
+            # Approve the router for the eventual close now rather than when it is due
+            self._spawn(self.execution.ensure_approved(decision.token, self.block_number))
+
+    def _spawn(self, coro) -> asyncio.Future:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _submit(
+        self,
+        decision: Decision,
+        started: float,
+        meta: Dict,
+        settled: Optional[Callable[[Dict], None]] = None,
+        closes: Optional[Dict] = None
+    ) -> Optional[str]:
+        """Send a decision through the execution pipeline. The trade is recorded once
+        it settles: when its receipt arrives, or straight away if it could not be
+        broadcast. ``settled(trade)`` is then called with the trade, whose status says
+        whether it executed. A trade that ``closes`` a position carries its realized
+        PnL. Returns the transaction hash, or None if it was not broadcast"""
+        if self.execution is None:
+            logger.warning(f"No execution pipeline (private key missing?); dropping {decision.strategy} {decision.side}")
+            return None
+        order = self._order(decision)
+        if order is None:
+            # Without a mirrored pool there is no quote to bound amountOutMin with
+            logger.warning(f"No mirrored pool for {decision.token}; not trading it")
+            return None
+        token_in, token_out, amount_in = order
+        amount_out, _ = self.amm.quote(token_in, token_out, amount_in)
+        amount_out_min = int(amount_out * (1 - self.settings['max_slippage'] / 100))
+        submitted = time.perf_counter()
+        result = await self.execution.execute(
+            decision.side,
+            self.block_number,
+            token=decision.token,
+            amount_in=amount_in,
+            amount_out_min=amount_out_min
+        )
+        price = self.amm.price(decision.token)
+        trade = {
+            "user_id": self.bot_id,
+            "token_symbol": decision.token,
+            "token_address": decision.token,
+            "amount": decision.amount,
+            "price": float(price) if price is not None else 0.0,
+            "type": decision.side,
+            "status": "pending" if result.tx_hash else "failed",
+            "tx_hash": result.tx_hash,
+            "gas_price": result.gas_price,
+            "error": result.error,
+            "meta": {
+                **meta,
+                "nonce": result.nonce,
+                "amount_in": str(amount_in),
+                "amount_out_min": str(amount_out_min),
+                # Per-stage latency (ms); their sum is BotTrade.execution_time
+                "timings": {"detect": (submitted - started) * 1000, **result.timings}
+            }
+        }
+        # execution_time covers detect-to-broadcast, not the wait for the block
+        execution_time = (time.perf_counter() - started) * 1000
+        bot_trade = {**decision.as_bot_trade(), "success": False, "error": result.error}
+        if result.tx_hash is None:
+            self._record_fill(trade, bot_trade, execution_time)
+            if settled is not None:
+                settled(trade)
+            return None
+        receipt = self.execution.receipts.track(result.tx_hash)
+        self._spawn(self._confirm(receipt, trade, bot_trade, execution_time, settled, closes))
+        return result.tx_hash
+
+    async def _confirm(
+        self,
+        receipt: asyncio.Future,
+        trade: Dict,
+        bot_trade: Dict,
+        execution_time: float,
+        settled: Optional[Callable[[Dict], None]] = None,
+        closes: Optional[Dict] = None
+    ):
+        """Wait for a broadcast trade's receipt and record it as executed or failed
+        (reverted, or never mined). If the bot stops first it is recorded as pending"""
+        try:
+            receipt = await receipt
+        except asyncio.CancelledError:
+            self._record_fill(trade, bot_trade, execution_time)
+            return
+        success = succeeded(receipt)
+        trade = {**trade, "status": "executed" if success else "failed", "meta": {**trade["meta"]}}
+        if receipt is not None:
+            trade["gas_used"] = int(receipt["gasUsed"], 16)
+            trade["meta"]["block_number"] = int(receipt["blockNumber"], 16)
+        if not success:
+            trade["error"] = "reverted" if receipt is not None else "not mined"
+        elif closes is not None:
+            self._realize(trade, closes)
+        self._record_fill(trade, {**bot_trade, "success": success, "error": trade["error"]}, execution_time)
+        if settled is not None:
+            settled(trade)
+
+    def _realize(self, trade: Dict, position: Dict):
+        """Set the PnL realized by ``trade`` closing ``position`` (signed by side), on the
+        trade and in its metadata where the rollups read it"""
+        pnl = realized_pnl(position, trade["price"])
+        trade["pnl"] = pnl
+        trade["meta"]["pnl"] = pnl
+
+    async def _paper_fill(
+        self,
+        tx,
+        decision: Decision,
+        started: float,
+        settled: Optional[Callable[[Dict], None]] = None,
+        closes: Optional[Dict] = None
+    ):
+        """Fill a decision at the current price without touching the chain; ``settled``
+        and ``closes`` are as for ``_submit``. Without a price (no mirrored pool) there
+        is nothing to fill at, and the trade is recorded as failed"""
+        price = float(await self.prices.get_price(decision.token))
+        tx_hash = _hash_of(tx)
+        priced = not math.isnan(price)
+        trade = {
+            "user_id": self.bot_id,
+            "token_symbol": decision.token,
+            "token_address": decision.token,
+            "amount": decision.amount,
+            "price": price,
+            "type": decision.side,
+            "status": "executed" if priced else "failed",
+            "tx_hash": f"dry-run:{decision.strategy}:{tx_hash}",
+            "error": None if priced else "unpriced",
+            "meta": {"dry_run": True, "trigger_tx": tx_hash}
+        }
+        if priced and closes is not None:
+            self._realize(trade, closes)
+        execution_time = (time.perf_counter() - started) * 1000
+        bot_trade = {**decision.as_bot_trade(), "success": priced, "error": trade["error"]}
+        self._record_fill(trade, bot_trade, execution_time)
+        if settled is not None:
+            settled(trade)
         
+    async def _fetch_prices(self, tokens: List[str]) -> Dict[str, Decimal]:
+        """Fetch prices for several distinct tokens concurrently (PriceService fetcher)"""
+        started = time.perf_counter()
+        prices = await asyncio.gather(*(self._get_current_price(token) for token in tokens))
+        PRICE_FETCH_SECONDS.observe(time.perf_counter() - started)
+        return dict(zip(tokens, prices))
+
     async def _get_current_price(self, token: str) -> Decimal:
-        """Get current price for a token"""
-        # Implement price fetching logic
-        return Decimal('0')
+        """Get current price for a token from the pool mirror (NaN if none of its pools is
+        mirrored, which position checks treat as unpriced)"""
+        price = self.amm.price(token)
+        return Decimal('NaN') if price is None else price
+
+    def _order(self, decision: Decision) -> Optional[Tuple[str, str, int]]:
+        """(token_in, token_out, raw amount in) for a decision traded against the quote
+        token; None if the token has no mirrored pool"""
+        token = decision.token.lower()
+        quote_token = self.amm.quote_token
+        price = self.amm.mid_price(token, quote_token)
+        if price is None:
+            return None
+        if decision.side == "sell":
+            return token, quote_token, int(decision.amount * 10 ** self.amm.decimals.get(token, 18))
+        return quote_token, token, int(decision.amount * price * 10 ** self.amm.decimals.get(quote_token, 18))
+
+    def _within_slippage(self, decision: Decision) -> bool:
+        """Quote the decision against the mirrored pools and reject it if its price impact
+        exceeds ``max_slippage`` (percent). Tokens without a mirrored pool can't be checked"""
+        order = self._order(decision)
+        if order is None:
+            return True
+        slippage = self.amm.slippage(*order)
+        if slippage is not None and slippage * 100 > self.settings['max_slippage']:
+            logger.info(f"Skipping {decision.strategy} {decision.side} {decision.token}: "
+                        f"slippage {slippage * 100:.3f}% over {self.settings['max_slippage']}%")
+            return False
+        return True
         
     def _should_close_position(self, position: Dict, current_price: Decimal) -> bool:
         """Determine if a position should be closed"""
-        # Implement position management logic
-        return False
+        return close_reason(position, float(current_price)) is not None
         
     async def _close_position(self, position: Dict):
-        """Close a trading position"""
-        # Implement position closing logic
-        pass
+        """Close a position by trading it back to the quote token. Closes skip the slippage
+        check. The position leaves the book once the close executed (on paper, at
+        once); while it is in flight the position is not closed again, and if it
+        fails the position stays"""
+        started = time.perf_counter()
+        decision = Decision(
+            position.get("strategy", "close"),
+            position["token"],
+            "sell" if position["side"] == LONG else "buy",
+            position["amount"],
+            trigger={"close_position": position["id"]}
+        )
+        self._closing.add(position["id"])
+        settled = lambda trade: self._position_closed(position, trade)
+        broadcast = False
+        try:
+            if self.dry_run:
+                await self._paper_fill({"hash": f"close:{position['id']}"}, decision, started, settled, closes=position)
+            else:
+                broadcast = await self._submit(decision, started, {"position_id": position["id"]},
+                                               settled, closes=position) is not None
+        finally:
+            # Only a broadcast close settles later; otherwise it has settled, or never will
+            # (no pipeline, no mirrored pool, an error), and the next check retries it
+            if not broadcast:
+                self._closing.discard(position["id"])
+
+    def _position_closed(self, position: Dict, trade: Dict):
+        self._closing.discard(position["id"])
+        if trade["status"] != "executed" or position["id"] not in self.active_positions:
+            return
+        self.active_positions.remove(position["id"])
+        self._emit("position", {**position, "status": "closed"})
         
     def update_settings(self, new_settings: Dict):
         """Update bot settings"""
         self.settings.update(new_settings)
-        logger.info(f"Bot settings updated: {self.settings}") 
\ No newline at end of file
+        logger.info(f"Bot settings updated: {self.settings}")
+
+def _hash_of(tx) -> Optional[str]:
+    tx_hash = tx.get("hash") if tx else None
+    if isinstance(tx_hash, bytes):
+        tx_hash = "0x" + tx_hash.hex()
+    return tx_hash
+
+def bot_from_settings(persistence=None) -> HFTBot:
+    """The bot as configured by the application settings"""
+    from ..config import settings
+    bot = HFTBot(
+        web3_provider=settings.WEB3_PROVIDER_URL,
+        private_key=settings.HFT_BOT_PRIVATE_KEY,
+        persistence=persistence,
+        strategy_processes=getattr(settings, "STRATEGY_PROCESSES", 2),
+        chain_id=getattr(settings, "CHAIN_ID", 1),
+        submit_urls=getattr(settings, "SUBMIT_RPC_URLS", None)
+    )
+    # The pools the bot trades and prices against; their state is loaded from chain at start
+    pools = getattr(settings, "AMM_POOLS", None) or []
+    bot.amm.add_pools(json.loads(pools) if isinstance(pools, str) else pools)
+    return bot
@@ -0,0 +1,261 @@
+import logging
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from eth_utils import function_signature_to_4byte_selector
+
+logger = logging.getLogger(__name__)
+
+WETH = "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"
+
+# Router address -> name
+KNOWN_ROUTERS: Dict[str, str] = {
+    "0x7a250d5630b4cf539739df2c5dacb4c659f2488d": "uniswap_v2",
+    "0xd9e1ce17f2641f24ae83637ab66a2cca9c378b9f": "sushiswap",
+    "0xe592427a0aece92de3edee1f18e0157c05861564": "uniswap_v3",
+    "0x68b3465833fb72a70ecdf485e0e4c7bd8665fc45": "uniswap_v3_router02"
+}
+
+# Swap functions we decode: signature -> argument names (struct field names for
+# the V3 functions that take a single params struct)
+SWAP_FUNCTIONS: Dict[str, Tuple[str, ...]] = {
+    "swapExactTokensForTokens(uint256,uint256,address[],address,uint256)":
+        ("amountIn", "amountOutMin", "path", "to", "deadline"),
+    "swapTokensForExactTokens(uint256,uint256,address[],address,uint256)":
+        ("amountOut", "amountInMax", "path", "to", "deadline"),
+    "swapExactETHForTokens(uint256,address[],address,uint256)":
+        ("amountOutMin", "path", "to", "deadline"),
+    "swapETHForExactTokens(uint256,address[],address,uint256)":
+        ("amountOut", "path", "to", "deadline"),
+    "swapExactTokensForETH(uint256,uint256,address[],address,uint256)":
+        ("amountIn", "amountOutMin", "path", "to", "deadline"),
+    "swapTokensForExactETH(uint256,uint256,address[],address,uint256)":
+        ("amountOut", "amountInMax", "path", "to", "deadline"),
+    "swapExactTokensForTokensSupportingFeeOnTransferTokens(uint256,uint256,address[],address,uint256)":
+        ("amountIn", "amountOutMin", "path", "to", "deadline"),
+    "swapExactETHForTokensSupportingFeeOnTransferTokens(uint256,address[],address,uint256)":
+        ("amountOutMin", "path", "to", "deadline"),
+    "swapExactTokensForETHSupportingFeeOnTransferTokens(uint256,uint256,address[],address,uint256)":
+        ("amountIn", "amountOutMin", "path", "to", "deadline"),
+    "exactInputSingle((address,address,uint24,address,uint256,uint256,uint256,uint160))":
+        ("tokenIn", "tokenOut", "fee", "recipient", "deadline", "amountIn", "amountOutMinimum",
+         "sqrtPriceLimitX96"),
+    "exactInputSingle((address,address,uint24,address,uint256,uint256,uint160))":
+        ("tokenIn", "tokenOut", "fee", "recipient", "amountIn", "amountOutMinimum", "sqrtPriceLimitX96"),
+    "exactInput((bytes,address,uint256,uint256,uint256))":
+        ("path", "recipient", "deadline", "amountIn", "amountOutMinimum"),
+    "exactInput((bytes,address,uint256,uint256))":
+        ("path", "recipient", "amountIn", "amountOutMinimum")
+}
+
+class DecodedSwap(NamedTuple):
+    tx_hash: Optional[str]
+    router: str
+    function: str
+    selector: str
+    token_in: Optional[str]
+    token_out: Optional[str]
+    amount_in: Optional[int]
+    amount_out: Optional[int]
+    exact_input: bool
+    path: Tuple[str, ...]
+    args: Dict
+
+# ---------------------------------------------------------------------------
+# ABI decoding, compiled once per type signature into closures over offsets
+
+Decoder = Callable[[bytes, int, int], object]
+
+def _split_types(types: str) -> List[str]:
+    """Split a comma separated type list at top level only"""
+    parts, depth, current = [], 0, []
+    for char in types:
+        if char == "," and depth == 0:
+            parts.append("".join(current))
+            current = []
+            continue
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        current.append(char)
+    if current:
+        parts.append("".join(current))
+    return parts
+
+def _word(data: bytes, position: int) -> int:
+    return int.from_bytes(data[position:position + 32], "big")
+
+def _compile(abi_type: str) -> Tuple[bool, int, Decoder]:
+    """(is_dynamic, head size, decode(data, base, head_position)) for an ABI type"""
+    if abi_type.endswith("[]"):
+        element_dynamic, element_size, element = _compile(abi_type[:-2])
+        if element_dynamic:
+            raise ValueError(f"Unsupported ABI type: {abi_type}")
+
+        def decode_array(data, base, position):
+            start = base + _word(data, position)
+            length = _word(data, start)
+            start += 32
+            return tuple(element(data, start, start + i * element_size) for i in range(length))
+        return True, 32, decode_array
+
+    if abi_type.startswith("("):
+        members = [_compile(t) for t in _split_types(abi_type[1:-1])]
+        dynamic = any(m[0] for m in members)
+        offsets, size = [], 0
+        for _, member_size, _ in members:
+            offsets.append(size)
+            size += member_size
+        decoders = [m[2] for m in members]
+
+        if dynamic:
+            def decode_dynamic_tuple(data, base, position):
+                start = base + _word(data, position)
+                return tuple(d(data, start, start + o) for d, o in zip(decoders, offsets))
+            return True, 32, decode_dynamic_tuple
+
+        def decode_static_tuple(data, base, position):
+            return tuple(d(data, base, position + o) for d, o in zip(decoders, offsets))
+        return False, size, decode_static_tuple
+
+    if abi_type == "address":
+        return False, 32, lambda data, base, position: "0x" + data[position + 12:position + 32].hex()
+    if abi_type.startswith("uint"):
+        return False, 32, lambda data, base, position: int.from_bytes(data[position:position + 32], "big")
+    if abi_type == "bool":
+        return False, 32, lambda data, base, position: data[position + 31] != 0
+    if abi_type == "bytes":
+        def decode_bytes(data, base, position):
+            start = base + _word(data, position)
+            return data[start + 32:start + 32 + _word(data, start)]
+        return True, 32, decode_bytes
+    if abi_type.startswith("bytes"):
+        length = int(abi_type[5:])
+        return False, 32, lambda data, base, position: data[position:position + length]
+    raise ValueError(f"Unsupported ABI type: {abi_type}")
+
+def compile_arguments(signature: str) -> Callable[[bytes], tuple]:
+    """Compile a decoder for the arguments of a function signature.
+
+    Arguments are laid out like a tuple whose head starts at offset 0, with
+    dynamic members' offsets relative to the start of the arguments.
+    """
+    members = [_compile(t) for t in _split_types(signature[signature.index("(") + 1:-1])]
+    offsets, size = [], 0
+    for _, member_size, _ in members:
+        offsets.append(size)
+        size += member_size
+    decoders = [m[2] for m in members]
+    return lambda data: tuple(d(data, 0, o) for d, o in zip(decoders, offsets))
+
+def _v3_path_tokens(path: bytes) -> Tuple[str, ...]:
+    """Token addresses from a packed V3 path (token, fee, token, ...)"""
+    return tuple("0x" + path[i:i + 20].hex() for i in range(0, len(path), 23))
+
+def _normalize(name: str, fields: Tuple[str, ...], values: tuple, tx_value: int):
+    """Map decoded arguments onto the DecodedSwap fields"""
+    if len(fields) > 1 and len(values) == 1 and isinstance(values[0], tuple):
+        values = values[0]  # single struct argument (V3 routers)
+    args = dict(zip(fields, values))
+
+    if "path" in args and isinstance(args["path"], bytes):
+        path = _v3_path_tokens(args["path"])
+    elif "path" in args:
+        path = args["path"]
+    else:
+        path = (args["tokenIn"], args["tokenOut"])
+
+    exact_input = "amountIn" in args or ("amountOutMin" in args and "amountOut" not in args)
+    if "amountIn" in args:
+        amount_in = args["amountIn"]
+    elif "ETHFor" in name or name.startswith("swapETH"):
+        amount_in = tx_value
+    else:
+        amount_in = args.get("amountInMax")
+    amount_out = args.get("amountOutMin", args.get("amountOutMinimum", args.get("amountOut")))
+    return path, exact_input, amount_in, amount_out, args
+
+class SwapDecoder:
+    """Classifies pending transactions as DEX swaps.
+
+    Rejection is two O(1) probes — ``tx.to`` against the router set and the
+    4-byte selector against the selector table — so only router swaps are
+    ever ABI decoded. Argument decoders are compiled once per selector.
+    """
+
+    def __init__(
+        self,
+        routers: Optional[Dict[str, str]] = None,
+        functions: Optional[Dict[str, Tuple[str, ...]]] = None
+    ):
+        self.routers: Dict[str, str] = {
+            address.lower(): name for address, name in (routers or KNOWN_ROUTERS).items()
+        }
+        self._selectors: Dict[str, Tuple[str, Tuple[str, ...], Callable[[bytes], tuple]]] = {}
+        for signature, fields in (functions or SWAP_FUNCTIONS).items():
+            self.add_function(signature, fields)
+        self.stats = {"seen": 0, "router_hits": 0, "decoded": 0, "errors": 0}
+
+    def add_router(self, address: str, name: str):
+        self.routers[address.lower()] = name
+
+    def add_function(self, signature: str, fields: Iterable[str]):
+        selector = function_signature_to_4byte_selector(signature).hex()
+        name = signature[:signature.index("(")]
+        self._selectors[selector] = (name, tuple(fields), compile_arguments(signature))
+
+    @property
+    def selectors(self) -> Iterable[str]:
+        return self._selectors.keys()
+
+    def classify(self, tx) -> Optional[DecodedSwap]:
+        """Decode a transaction if it is a known router swap, otherwise None"""
+        self.stats["seen"] += 1
+        to = tx.get("to")
+        if not to:
+            return None
+        router = self.routers.get(to.lower())
+        if router is None:
+            return None
+
+        data = tx.get("input") or tx.get("data") or b""
+        if isinstance(data, str):
+            selector = data[2:10]
+        else:
+            selector = bytes(data[:4]).hex()
+        entry = self._selectors.get(selector)
+        if entry is None:
+            return None
+        self.stats["router_hits"] += 1
+
+        name, fields, decode = entry
+        try:
+            payload = bytes.fromhex(data[10:]) if isinstance(data, str) else bytes(data[4:])
+            value = tx.get("value") or 0
+            if isinstance(value, str):
+                value = int(value, 16)
+            path, exact_input, amount_in, amount_out, args = _normalize(
+                name, fields, decode(payload), value
+            )
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.debug(f"Failed to decode {name} calldata: {e}")
+            return None
+
+        self.stats["decoded"] += 1
+        tx_hash = tx.get("hash")
+        if isinstance(tx_hash, bytes):
+            tx_hash = "0x" + tx_hash.hex()
+        return DecodedSwap(
+            tx_hash=tx_hash,
+            router=router,
+            function=name,
+            selector=selector,
+            token_in=path[0] if path else None,
+            token_out=path[-1] if path else None,
+            amount_in=amount_in,
+            amount_out=amount_out,
+            exact_input=exact_input,
+            path=tuple(path),
+            args=args
+        )
@@ -0,0 +1,414 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from eth_abi import encode
+from eth_account import Account
+from eth_utils import function_signature_to_4byte_selector, keccak, to_checksum_address
+
+from ..utils.metrics import Histogram
+from .decoder import WETH
+from .rpc import JsonRpcClient
+
+logger = logging.getLogger(__name__)
+
+UNISWAP_V2_ROUTER = "0x7a250d5630b4cf539739df2c5dacb4c659f2488d"
+STAGES = ("build", "sign", "submit")
+MAX_UINT256 = (1 << 256) - 1
+ALLOWANCE = function_signature_to_4byte_selector("allowance(address,address)")
+
+class Field(NamedTuple):
+    """A template argument filled in at fire time"""
+    name: str
+    kind: str = "uint256"  # uint256 or address
+
+def _word(value, kind: str) -> bytes:
+    if kind == "address":
+        return bytes.fromhex(value[2:]).rjust(32, b"\0")
+    return int(value).to_bytes(32, "big")
+
+class SwapTemplate:
+    """Calldata for one swap shape, ABI-encoded once.
+
+    Arguments given as ``Field`` are encoded with unique sentinel values and
+    their word offsets remembered, so ``calldata`` only copies the encoded
+    bytes and overwrites those words. Fields may sit anywhere in the
+    encoding, including inside a fixed-length dynamic array such as a swap
+    path, because the layout does not depend on the values.
+
+    A template without ``to`` is sent to the address given as ``to`` on each
+    call (e.g. a token's ``approve``). ``approves`` names the field holding a
+    token the router spends; the pipeline makes sure the router is approved
+    for it before the swap is sent.
+    """
+
+    def __init__(self, name: str, to: Optional[str], signature: str, args: Sequence, gas: int,
+                 value_field: Optional[str] = None, approves: Optional[str] = None):
+        self.name = name
+        self.to = to_checksum_address(to) if to is not None else None
+        self.gas = gas
+        self.value_field = value_field
+        self.approves = approves
+        self.fields: Dict[str, Field] = {}
+        sentinels: Dict[bytes, str] = {}
+
+        def substitute(arg):
+            if isinstance(arg, Field):
+                index = len(self.fields) + 1
+                self.fields[arg.name] = arg
+                sentinel = 0xD1C0FFEE << 32 | index
+                if arg.kind == "address":
+                    sentinel = f"0x{sentinel:040x}"
+                sentinels[_word(sentinel, arg.kind)] = arg.name
+                return sentinel
+            if isinstance(arg, (list, tuple)):
+                return type(arg)(substitute(a) for a in arg)
+            return arg
+
+        values = [substitute(arg) for arg in args]
+        types = signature[signature.index("(") + 1:-1].split(",")
+        # Top-level types only; nested tuples are not used by the templates here
+        selector = function_signature_to_4byte_selector(signature)
+        self._calldata = selector + encode(types, values)
+        self.offsets: Dict[str, int] = {}
+        for offset in range(4, len(self._calldata), 32):
+            field = sentinels.get(self._calldata[offset:offset + 32])
+            if field is not None:
+                self.offsets[field] = offset
+        missing = set(self.fields) - set(self.offsets)
+        if missing:
+            raise ValueError(f"Template {name}: could not locate {sorted(missing)}")
+
+    def calldata(self, **values) -> bytes:
+        data = bytearray(self._calldata)
+        for name, offset in self.offsets.items():
+            data[offset:offset + 32] = _word(values[name], self.fields[name].kind)
+        return bytes(data)
+
+def uniswap_v2_templates(wallet: str, router: str = UNISWAP_V2_ROUTER) -> Dict[str, SwapTemplate]:
+    """ETH -> token (``buy``) and token -> ETH (``sell``) through a v2 router, and the
+    token ``approve`` that lets the router take the token in a sell"""
+    return {
+        "buy": SwapTemplate(
+            "buy", router, "swapExactETHForTokens(uint256,address[],address,uint256)",
+            [Field("amount_out_min"), [WETH, Field("token", "address")], wallet, Field("deadline")],
+            gas=250_000, value_field="amount_in"
+        ),
+        "sell": SwapTemplate(
+            "sell", router, "swapExactTokensForETH(uint256,uint256,address[],address,uint256)",
+            [Field("amount_in"), Field("amount_out_min"), [Field("token", "address"), WETH], wallet, Field("deadline")],
+            gas=250_000, approves="token"
+        ),
+        "approve": SwapTemplate(
+            "approve", None, "approve(address,uint256)", [router, MAX_UINT256], gas=60_000
+        )
+    }
+
+class NonceManager:
+    """Hands out nonces locally; the node is asked only on first use and after a
+    nonce error"""
+
+    def __init__(self, rpc: JsonRpcClient, address: str):
+        self.rpc = rpc
+        self.address = address
+        self._next: Optional[int] = None
+        self._lock = asyncio.Lock()
+
+    async def sync(self):
+        self._next = int(await self.rpc.call("eth_getTransactionCount", [self.address, "pending"]), 16)
+
+    async def reserve(self) -> int:
+        if self._next is None:
+            async with self._lock:
+                if self._next is None:
+                    await self.sync()
+        nonce = self._next
+        self._next += 1
+        return nonce
+
+    def release(self, nonce: int):
+        """Give back a nonce that was never broadcast; a gap forces a resync"""
+        if self._next is not None and nonce == self._next - 1:
+            self._next = nonce
+        else:
+            self.reset()
+
+    def reset(self):
+        self._next = None
+
+class GasOracle:
+    """Gas price, fetched at most once per block (concurrent callers share the fetch)"""
+
+    def __init__(self, rpc: JsonRpcClient, multiplier: float = 1.1):
+        self.rpc = rpc
+        self.multiplier = multiplier
+        self._block: Optional[int] = None
+        self._price: Optional[int] = None
+        self._inflight: Optional[asyncio.Future] = None
+
+    async def get(self, block_number: Optional[int]) -> int:
+        if self._price is not None and block_number is not None and block_number == self._block:
+            return self._price
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._fetch(block_number))
+        future = self._inflight
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if self._inflight is future and future.done():
+                self._inflight = None
+
+    async def _fetch(self, block_number: Optional[int]) -> int:
+        price = int(int(await self.rpc.call("eth_gasPrice"), 16) * self.multiplier)
+        self._price, self._block = price, block_number
+        return price
+
+class Submitter:
+    """Broadcasts raw transactions to every endpoint at once over their pooled sessions;
+    the first endpoint to accept wins, the rest finish in the background"""
+
+    def __init__(self, urls: Sequence[str], pool_size: int = 8):
+        self.clients = [JsonRpcClient(url, pool_size=pool_size) for url in urls]
+        self._background = set()
+        self.stats = {url: {"accepted": 0, "failed": 0} for url in urls}
+
+    async def _send(self, client: JsonRpcClient, raw: bytes) -> str:
+        try:
+            result = await client.call("eth_sendRawTransaction", ["0x" + raw.hex()])
+        except Exception:
+            self.stats[client.url]["failed"] += 1
+            raise
+        self.stats[client.url]["accepted"] += 1
+        return result
+
+    async def submit(self, raw: bytes) -> str:
+        pending = {asyncio.ensure_future(self._send(client, raw)) for client in self.clients}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for other in pending:
+                        self._background.add(other)
+                        other.add_done_callback(self._reap)
+                    return task.result()
+                error = task.exception()
+        raise error
+
+    def _reap(self, task: asyncio.Future):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Secondary submission failed: {task.exception()}")
+
+    async def close(self):
+        await asyncio.gather(*(client.close() for client in self.clients))
+
+class ReceiptTracker:
+    """Waits for broadcast transactions to be mined.
+
+    ``poll`` fetches the receipts of every transaction still waiting in one
+    batched call and is meant to run once per block. A transaction with no
+    receipt ``max_blocks`` blocks after it was first polled is given up on
+    (resolved with None): dropped or replaced.
+    """
+
+    def __init__(self, rpc: JsonRpcClient, max_blocks: int = 25):
+        self.rpc = rpc
+        self.max_blocks = max_blocks
+        self._pending: Dict[str, Tuple[asyncio.Future, Optional[int]]] = {}
+        self.stats = {"mined": 0, "reverted": 0, "dropped": 0}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def track(self, tx_hash: str) -> asyncio.Future:
+        """Future resolved with the transaction's receipt, or None if it was dropped"""
+        if tx_hash not in self._pending:
+            self._pending[tx_hash] = (asyncio.get_running_loop().create_future(), None)
+        return self._pending[tx_hash][0]
+
+    async def poll(self, block_number: int):
+        if not self._pending:
+            return
+        hashes = list(self._pending)
+        receipts = await self.rpc.batch([("eth_getTransactionReceipt", [tx_hash]) for tx_hash in hashes])
+        for tx_hash, receipt in zip(hashes, receipts):
+            future, first_block = self._pending[tx_hash]
+            if receipt is None:
+                if first_block is None:
+                    self._pending[tx_hash] = (future, block_number)
+                    continue
+                if block_number - first_block < self.max_blocks:
+                    continue
+                self.stats["dropped"] += 1
+            else:
+                self.stats["mined" if succeeded(receipt) else "reverted"] += 1
+            del self._pending[tx_hash]
+            if not future.done():
+                future.set_result(receipt)
+
+    def close(self):
+        for future, _ in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+
+def succeeded(receipt: Optional[Dict]) -> bool:
+    """Whether a receipt is of a transaction that executed without reverting"""
+    return receipt is not None and int(receipt.get("status") or "0x0", 16) == 1
+
+class ExecutionResult(NamedTuple):
+    tx_hash: Optional[str]
+    nonce: Optional[int]
+    gas_price: Optional[int]
+    timings: Dict[str, float]  # stage -> ms
+    error: Optional[str] = None
+
+class ExecutionPipeline:
+    """Build, sign and submit swaps from templates.
+
+    Building needs no RPC round-trip in the steady state: the nonce comes
+    from ``NonceManager``, the gas price from the per-block ``GasOracle``
+    and the calldata from a ``SwapTemplate``. Signing runs on a dedicated
+    thread so the event loop keeps ingesting while a key operation runs.
+
+    Before the first swap that spends a token (``approves``), the router's
+    allowance is checked once and, if short, an ``approve`` is sent ahead of
+    it; its lower nonce puts it on chain first. Broadcast transactions are
+    confirmed through ``receipts``.
+    """
+
+    def __init__(
+        self,
+        rpc: JsonRpcClient,
+        private_key: str,
+        chain_id: int = 1,
+        submit_urls: Optional[Sequence[str]] = None,
+        templates: Optional[Dict[str, SwapTemplate]] = None,
+        deadline: int = 120,
+        router: str = UNISWAP_V2_ROUTER
+    ):
+        self.rpc = rpc
+        self.account = Account.from_key(private_key)
+        self.address = self.account.address
+        self.chain_id = chain_id
+        self.deadline = deadline
+        self.router = router
+        self.nonces = NonceManager(rpc, self.address)
+        self.gas = GasOracle(rpc)
+        self.submitter = Submitter(submit_urls or [rpc.url])
+        self.receipts = ReceiptTracker(rpc)
+        self.templates = templates or uniswap_v2_templates(self.address, router)
+        # Token -> approval in flight or done (True if the router may spend it)
+        self._approvals: Dict[str, asyncio.Future] = {}
+        self._signer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tx-signer")
+        self.latency = {stage: Histogram() for stage in STAGES}
+        self.stats = {"submitted": 0, "failed": 0}
+
+    def _sign(self, tx: Dict) -> bytes:
+        signed = self.account.sign_transaction(tx)
+        return bytes(getattr(signed, "raw_transaction", None) or signed.rawTransaction)
+
+    async def execute(self, template: str, block_number: Optional[int] = None, **values) -> ExecutionResult:
+        """Fire a template with its fields filled in; never raises, failures are in ``error``"""
+        timings: Dict[str, float] = {}
+        nonce = gas_price = None
+        stage_started = time.perf_counter()
+        stage = "build"
+        try:
+            swap = self.templates[template]
+            if swap.approves is not None and not await self.ensure_approved(values[swap.approves], block_number):
+                raise RuntimeError(f"Router not approved for {values[swap.approves]}")
+            stage_started = time.perf_counter()
+            values.setdefault("deadline", int(time.time()) + self.deadline)
+            nonce = await self.nonces.reserve()
+            gas_price = await self.gas.get(block_number)
+            tx = {
+                "to": swap.to or to_checksum_address(values["to"]),
+                "data": swap.calldata(**values),
+                "value": int(values[swap.value_field]) if swap.value_field else 0,
+                "gas": swap.gas,
+                "gasPrice": gas_price,
+                "nonce": nonce,
+                "chainId": self.chain_id
+            }
+            stage_started = self._finish(stage, stage_started, timings)
+
+            stage = "sign"
+            raw = await asyncio.get_running_loop().run_in_executor(self._signer, self._sign, tx)
+            stage_started = self._finish(stage, stage_started, timings)
+
+            stage = "submit"
+            tx_hash = await self.submitter.submit(raw)
+            self._finish(stage, stage_started, timings)
+        except Exception as e:
+            self._finish(stage, stage_started, timings)
+            self.stats["failed"] += 1
+            if nonce is not None:
+                if stage == "submit":
+                    # Unknown whether some endpoint took it (or the nonce was stale); ask the node next time
+                    self.nonces.reset()
+                else:
+                    self.nonces.release(nonce)
+            logger.error(f"Execution of {template} failed at {stage}: {e}")
+            return ExecutionResult(None, nonce, gas_price, timings, str(e))
+        self.stats["submitted"] += 1
+        return ExecutionResult(tx_hash or "0x" + keccak(raw).hex(), nonce, gas_price, timings)
+
+    async def ensure_approved(self, token: str, block_number: Optional[int] = None) -> bool:
+        """Make sure the router may spend ``token``: checked once per token, approved
+        (unlimited) if the allowance is short. Concurrent callers share one check; a
+        failed attempt is retried on the next call"""
+        token = token.lower()
+        approval = self._approvals.get(token)
+        if approval is None or (approval.done() and (approval.cancelled() or approval.exception() or not approval.result())):
+            approval = self._approvals[token] = asyncio.ensure_future(self._approve(token, block_number))
+        try:
+            return await asyncio.shield(approval)
+        except Exception as e:
+            logger.error(f"Approving the router for {token} failed: {e}")
+            return False
+
+    async def _approve(self, token: str, block_number: Optional[int]) -> bool:
+        data = ALLOWANCE + encode(["address", "address"], [self.address, to_checksum_address(self.router)])
+        allowance = await self.rpc.call("eth_call", [{"to": to_checksum_address(token), "data": "0x" + data.hex()}, "latest"])
+        if int(allowance or "0x0", 16) >= MAX_UINT256 // 2:
+            return True
+        result = await self.execute("approve", block_number, to=token)
+        if result.tx_hash is None:
+            return False
+        logger.info(f"Approving the router for {token} ({result.tx_hash})")
+        # Swaps sent meanwhile carry later nonces so they land after it; if it does
+        # not make it on chain, check again before the next one
+        self.receipts.track(result.tx_hash).add_done_callback(
+            lambda receipt: self._approval_settled(token, receipt)
+        )
+        return True
+
+    def _approval_settled(self, token: str, receipt: asyncio.Future):
+        if receipt.cancelled() or not succeeded(receipt.result()):
+            logger.warning(f"Approval of the router for {token} did not go through")
+            self._approvals.pop(token, None)
+
+    def _finish(self, stage: str, started: float, timings: Dict[str, float]) -> float:
+        now = time.perf_counter()
+        timings[stage] = (now - started) * 1000
+        self.latency[stage].observe(now - started)
+        return now
+
+    async def close(self):
+        self.receipts.close()
+        await self.submitter.close()
+        self._signer.shutdown(wait=False)
+
+    def get_metrics(self) -> Dict:
+        return {
+            **self.stats,
+            "receipts": {**self.receipts.stats, "pending": len(self.receipts)},
+            "approved": sorted(token for token, approval in self._approvals.items()
+                               if approval.done() and not approval.cancelled()
+                               and not approval.exception() and approval.result()),
+            "latency": {stage: histogram.as_dict() for stage, histogram in self.latency.items()},
+            "endpoints": self.submitter.stats
+        }
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .rpc import JsonRpcClient, RPCError
+from ..utils.metrics import Histogram, metrics
+
+logger = logging.getLogger(__name__)
+
+_fetch_seconds = metrics.histogram(
+    "hft_mempool_fetch_seconds", "Pending transaction hash poll and body fetch time", labels=("stage",)
+)
+POLL_SECONDS = _fetch_seconds.labels("poll")
+FETCH_SECONDS = _fetch_seconds.labels("fetch")
+
+class SeenSet:
+    """Bounded set of recently seen keys; oldest entries expire by count or age"""
+
+    def __init__(self, capacity: int = 100_000, ttl: float = 600.0):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def add(self, key: str, now: Optional[float] = None) -> bool:
+        """Record a key; returns False if it was already present"""
+        if key in self._entries:
+            return False
+        now = time.monotonic() if now is None else now
+        entries = self._entries
+        entries[key] = now
+        while len(entries) > self.capacity:
+            entries.popitem(last=False)
+        cutoff = now - self.ttl
+        while entries:
+            seen_at = next(iter(entries.values()))
+            if seen_at >= cutoff:
+                break
+            entries.popitem(last=False)
+        return True
+
+class MempoolIngestor:
+    """Pending-transaction pipeline: poll -> dedupe -> batch fetch -> queue -> workers.
+
+    New transaction hashes come from a pending-transaction filter
+    (``eth_newPendingTransactionFilter``/``eth_getFilterChanges``); nodes that
+    do not support filters fall back to polling the pending block. Bodies are
+    fetched with batched ``eth_getTransactionByHash`` calls and handed to a
+    pool of analyzer workers through a bounded queue. When the queue is full
+    new transactions are dropped (and counted) rather than stalling the poller;
+    a stale pending transaction is worthless anyway.
+    """
+
+    def __init__(
+        self,
+        rpc: JsonRpcClient,
+        analyzer: Callable[[Dict], Awaitable[None]],
+        workers: int = 4,
+        queue_size: int = 10_000,
+        batch_size: int = 100,
+        poll_interval: float = 0.05,
+        seen_capacity: int = 100_000,
+        seen_ttl: float = 600.0
+    ):
+        self.rpc = rpc
+        self.analyzer = analyzer
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.queue: Optional[asyncio.Queue] = None
+        self.seen = SeenSet(seen_capacity, seen_ttl)
+        self.is_running = False
+        self._filter_id: Optional[str] = None
+        self._use_filter = True
+        self._tasks: List[asyncio.Task] = []
+        # Poll and fetch report the exported series; the worker stages are per monitor
+        self.latency: Dict[str, Histogram] = {
+            "poll": POLL_SECONDS,
+            "fetch": FETCH_SECONDS,
+            "queue_wait": Histogram(),
+            "analyze": Histogram()
+        }
+        self.counters = {
+            "hashes_seen": 0,
+            "duplicates": 0,
+            "enqueued": 0,
+            "dropped": 0,
+            "analyzed": 0,
+            "errors": 0
+        }
+
+    async def run(self):
+        """Run the poller and workers until stop() is called"""
+        if self.is_running:
+            return
+        self.is_running = True
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        try:
+            while self.is_running:
+                try:
+                    await self._poll_once()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.counters["errors"] += 1
+                    logger.error(f"Error monitoring mempool: {e}")
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            await self._shutdown()
+
+    async def stop(self):
+        self.is_running = False
+
+    async def _shutdown(self):
+        self.is_running = False
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._filter_id is not None:
+            try:
+                await self.rpc.call("eth_uninstallFilter", [self._filter_id])
+            except Exception:
+                pass
+            self._filter_id = None
+
+    async def _poll_once(self):
+        started = time.perf_counter()
+        hashes, bodies = await self._fetch_new()
+        polled = time.perf_counter()
+        POLL_SECONDS.observe(polled - started)
+
+        new_hashes = []
+        for tx_hash in hashes:
+            self.counters["hashes_seen"] += 1
+            if self.seen.add(tx_hash):
+                new_hashes.append(tx_hash)
+            else:
+                self.counters["duplicates"] += 1
+
+        if bodies is None:
+            bodies = await self._fetch_transactions(new_hashes)
+            fetched = time.perf_counter()
+            FETCH_SECONDS.observe(fetched - polled)
+        else:
+            wanted = set(new_hashes)
+            bodies = [tx for tx in bodies if tx.get("hash") in wanted]
+
+        now = time.perf_counter()
+        for tx in bodies:
+            if tx is None:
+                continue
+            try:
+                self.queue.put_nowait((now, tx))
+                self.counters["enqueued"] += 1
+            except asyncio.QueueFull:
+                self.counters["dropped"] += 1
+
+    async def _fetch_new(self) -> Tuple[List[str], Optional[List[Dict]]]:
+        """New pending hashes, plus bodies when they came with the poll"""
+        if self._use_filter:
+            try:
+                if self._filter_id is None:
+                    self._filter_id = await self.rpc.call("eth_newPendingTransactionFilter")
+                return await self.rpc.call("eth_getFilterChanges", [self._filter_id]) or [], None
+            except RPCError as e:
+                if self._filter_id is not None:
+                    # Filters expire on the node when not polled; reinstall next time
+                    self._filter_id = None
+                    raise
+                logger.warning(f"Pending transaction filter unavailable, polling pending block: {e}")
+                self._use_filter = False
+
+        block = await self.rpc.call("eth_getBlockByNumber", ["pending", True])
+        transactions = (block or {}).get("transactions", [])
+        return [tx["hash"] for tx in transactions], transactions
+
+    async def _fetch_transactions(self, hashes: List[str]) -> List[Dict]:
+        """Transaction bodies by hash, batch_size per JSON-RPC batch, batches in parallel"""
+        if not hashes:
+            return []
+        chunks = [hashes[i:i + self.batch_size] for i in range(0, len(hashes), self.batch_size)]
+        results = await asyncio.gather(
+            *(self.rpc.batch([("eth_getTransactionByHash", [h]) for h in chunk]) for chunk in chunks),
+            return_exceptions=True
+        )
+        transactions = []
+        for result in results:
+            if isinstance(result, Exception):
+                self.counters["errors"] += 1
+                logger.error(f"Error fetching pending transactions: {result}")
+                continue
+            transactions.extend(tx for tx in result if tx is not None)
+        return transactions
+
+    async def _worker(self):
+        while True:
+            enqueued_at, tx = await self.queue.get()
+            started = time.perf_counter()
+            self.latency["queue_wait"].observe(started - enqueued_at)
+            try:
+                await self.analyzer(tx)
+                self.counters["analyzed"] += 1
+            except Exception as e:
+                self.counters["errors"] += 1
+                logger.error(f"Error analyzing transaction {tx.get('hash')}: {e}")
+            finally:
+                self.latency["analyze"].observe(time.perf_counter() - started)
+                self.queue.task_done()
+
+    def get_metrics(self) -> Dict:
+        """Per-stage latency, counters and queue depth"""
+        return {
+            "latency": {stage: histogram.as_dict() for stage, histogram in self.latency.items()},
+            "counters": dict(self.counters),
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "seen": len(self.seen)
+        }
@@ -0,0 +1,110 @@
+import time
+from typing import Dict, List, Optional
+
+class RollingWindow:
+    """Count / sum / max of values over a sliding time window.
+
+    The window is split into a ring of fixed-width buckets; a bucket is
+    reset lazily when its slot comes round again. Recording is O(1) and a
+    query touches a constant number of buckets, independent of how many
+    values were recorded.
+    """
+
+    __slots__ = ("window", "bucket_width", "_epochs", "_counts", "_sums", "_maxes")
+
+    def __init__(self, window: float, buckets: int = 60):
+        self.window = window
+        self.bucket_width = window / buckets
+        self._epochs: List[int] = [-1] * buckets
+        self._counts: List[int] = [0] * buckets
+        self._sums: List[float] = [0.0] * buckets
+        self._maxes: List[float] = [float("-inf")] * buckets
+
+    def record(self, value: float, now: Optional[float] = None):
+        epoch = int((time.time() if now is None else now) // self.bucket_width)
+        slot = epoch % len(self._epochs)
+        if self._epochs[slot] != epoch:
+            self._epochs[slot] = epoch
+            self._counts[slot] = 0
+            self._sums[slot] = 0.0
+            self._maxes[slot] = float("-inf")
+        self._counts[slot] += 1
+        self._sums[slot] += value
+        if value > self._maxes[slot]:
+            self._maxes[slot] = value
+
+    def summary(self, now: Optional[float] = None) -> Dict:
+        current = int((time.time() if now is None else now) // self.bucket_width)
+        oldest = current - len(self._epochs) + 1
+        count, total, maximum = 0, 0.0, float("-inf")
+        for slot, epoch in enumerate(self._epochs):
+            if oldest <= epoch <= current:
+                count += self._counts[slot]
+                total += self._sums[slot]
+                maximum = max(maximum, self._maxes[slot])
+        return {
+            "count": count,
+            "sum": total,
+            "mean": total / count if count else 0.0,
+            "max": maximum if count else 0.0
+        }
+
+WINDOWS = {
+    "1m": (60, 60),
+    "1h": (3600, 60),
+    "24h": (86400, 96)
+}
+
+class BotPerformance:
+    """Running trade aggregates, updated in O(1) per trade"""
+
+    def __init__(self):
+        self.total_trades = 0
+        self.successful_trades = 0
+        self.total_pnl = 0.0
+        self.latency = {name: RollingWindow(*spec) for name, spec in WINDOWS.items()}
+        self.pnl = {name: RollingWindow(*spec) for name, spec in WINDOWS.items()}
+        self.last_trade_at: Optional[float] = None
+
+    def seed(self, total_trades: int, successful_trades: int, total_pnl: float = 0.0):
+        """Start from historical totals (e.g. counted once from the database at startup)"""
+        self.total_trades = total_trades
+        self.successful_trades = successful_trades
+        self.total_pnl = total_pnl
+
+    def record_trade(self, trade: Dict, now: Optional[float] = None):
+        """Fold one completed trade into the aggregates"""
+        now = time.time() if now is None else now
+        pnl = float(trade.get("pnl") or 0.0)
+        success = trade.get("success")
+        if success is None:
+            success = pnl > 0
+
+        self.total_trades += 1
+        if success:
+            self.successful_trades += 1
+        self.total_pnl += pnl
+        self.last_trade_at = now
+
+        for window in self.pnl.values():
+            window.record(pnl, now)
+        execution_time = trade.get("execution_time")
+        if execution_time is not None:
+            for window in self.latency.values():
+                window.record(float(execution_time), now)
+
+    @property
+    def success_rate(self) -> float:
+        return (self.successful_trades / self.total_trades * 100) if self.total_trades > 0 else 0
+
+    def snapshot(self, now: Optional[float] = None) -> Dict:
+        now = time.time() if now is None else now
+        return {
+            "total_trades": self.total_trades,
+            "successful_trades": self.successful_trades,
+            "success_rate": self.success_rate,
+            "total_pnl": self.total_pnl,
+            "pnl": {name: window.summary(now) for name, window in self.pnl.items()},
+            "latency_ms": {name: window.summary(now) for name, window in self.latency.items()},
+            "last_trade_at": self.last_trade_at
+        }
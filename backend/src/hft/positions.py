@@ -0,0 +1,221 @@
+import logging
+from typing import Dict, Iterator, List, Mapping, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LONG = 1
+SHORT = -1
+
+# Close reasons, in priority order when several trigger at once
+LIQUIDATION = "liquidation"
+STOP_LOSS = "stop_loss"
+TAKE_PROFIT = "take_profit"
+
+_COLUMNS = ("entry_price", "amount", "leverage", "stop_loss", "take_profit", "liquidation_price")
+
+class PositionBook:
+    """Open positions stored column-wise in NumPy arrays.
+
+    Mirrors the numeric fields of ``models.trade.Position``. Rows are kept
+    dense: ``remove`` moves the last row into the freed slot, so add and
+    remove are O(1) and ``evaluate`` checks every position against a price
+    vector in one vectorized pass. Unset stop loss / take profit /
+    liquidation prices are stored as NaN and never trigger.
+
+    ``amount`` is the position size in tokens before leverage; exposure and
+    PnL are computed on ``amount * leverage``.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._size = 0
+        self._capacity = capacity
+        self._columns: Dict[str, np.ndarray] = {
+            name: np.full(capacity, np.nan) for name in _COLUMNS
+        }
+        self._side = np.zeros(capacity, dtype=np.int8)
+        self._token = np.zeros(capacity, dtype=np.int32)
+        self._ids: List = []
+        self._rows: Dict = {}
+        self._meta: List[Dict] = []
+        self.tokens: List[str] = []
+        self._token_index: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, position_id) -> bool:
+        return position_id in self._rows
+
+    def __iter__(self) -> Iterator[Dict]:
+        for row in range(self._size):
+            yield self._as_dict(row)
+
+    def _grow(self):
+        self._capacity *= 2
+        for name, column in self._columns.items():
+            grown = np.full(self._capacity, np.nan)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+        self._side = np.resize(self._side, self._capacity)
+        self._token = np.resize(self._token, self._capacity)
+
+    def _token_id(self, token: str) -> int:
+        index = self._token_index.get(token)
+        if index is None:
+            index = self._token_index[token] = len(self.tokens)
+            self.tokens.append(token)
+        return index
+
+    def add(
+        self,
+        position_id,
+        token: str,
+        entry_price: float,
+        amount: float,
+        leverage: float = 1.0,
+        stop_loss: Optional[float] = None,
+        take_profit: Optional[float] = None,
+        liquidation_price: Optional[float] = None,
+        side: int = LONG,
+        **metadata
+    ):
+        """Add a position; O(1) amortized"""
+        if position_id in self._rows:
+            raise ValueError(f"Position {position_id} already in book")
+        if self._size == self._capacity:
+            self._grow()
+
+        row = self._size
+        values = (entry_price, amount, leverage, stop_loss, take_profit, liquidation_price)
+        for name, value in zip(_COLUMNS, values):
+            self._columns[name][row] = np.nan if value is None else float(value)
+        self._side[row] = side
+        self._token[row] = self._token_id(token)
+        self._ids.append(position_id)
+        self._meta.append(metadata)
+        self._rows[position_id] = row
+        self._size += 1
+
+    def add_model(self, position):
+        """Add a ``models.trade.Position`` row"""
+        self.add(
+            position.id,
+            position.token_symbol,
+            position.entry_price,
+            position.amount,
+            leverage=position.leverage or 1.0,
+            stop_loss=position.stop_loss,
+            take_profit=position.take_profit,
+            liquidation_price=position.liquidation_price,
+            user_id=position.user_id,
+            token_address=position.token_address
+        )
+
+    def remove(self, position_id) -> Dict:
+        """Remove a position by id; O(1). Returns the removed position"""
+        row = self._rows.pop(position_id)
+        removed = self._as_dict(row)
+        last = self._size - 1
+        if row != last:
+            for column in self._columns.values():
+                column[row] = column[last]
+            self._side[row] = self._side[last]
+            self._token[row] = self._token[last]
+            self._ids[row] = self._ids[last]
+            self._meta[row] = self._meta[last]
+            self._rows[self._ids[row]] = row
+        self._ids.pop()
+        self._meta.pop()
+        for column in self._columns.values():
+            column[last] = np.nan
+        self._size = last
+        return removed
+
+    def get(self, position_id) -> Dict:
+        return self._as_dict(self._rows[position_id])
+
+    def _as_dict(self, row: int) -> Dict:
+        position = {name: float(column[row]) for name, column in self._columns.items()}
+        position.update(self._meta[row])
+        position["id"] = self._ids[row]
+        position["token"] = self.tokens[self._token[row]]
+        position["side"] = int(self._side[row])
+        return position
+
+    def active_tokens(self) -> List[str]:
+        """Distinct tokens that currently have open positions"""
+        return [self.tokens[i] for i in np.unique(self._token[:self._size])]
+
+    def price_vector(self, prices: Mapping[str, float]) -> np.ndarray:
+        """Prices aligned with ``self.tokens``; NaN where unknown"""
+        return np.array([float(prices.get(token, np.nan)) for token in self.tokens], dtype=np.float64)
+
+    def evaluate(self, prices: Union[Mapping[str, float], np.ndarray]) -> Dict:
+        """Check every position against current prices in one pass.
+
+        ``prices`` is a token -> price mapping or an array aligned with
+        ``self.tokens``. Returns the positions to close (with reason) and PnL
+        and exposure aggregated per token.
+        """
+        if not isinstance(prices, np.ndarray):
+            prices = self.price_vector(prices)
+        n = self._size
+        cols = {name: column[:n] for name, column in self._columns.items()}
+        side = self._side[:n]
+        token = self._token[:n]
+        price = prices[token]
+
+        size = cols["amount"] * cols["leverage"]
+        pnl = side * (price - cols["entry_price"]) * size
+        exposure = price * size
+
+        # For longs a trigger below the price fires when the price falls to it; shorts mirror that
+        signed = side * price
+        liquidated = signed <= side * cols["liquidation_price"]
+        stopped = signed <= side * cols["stop_loss"]
+        took_profit = signed >= side * cols["take_profit"]
+
+        reasons = np.full(n, None, dtype=object)
+        reasons[took_profit] = TAKE_PROFIT
+        reasons[stopped] = STOP_LOSS
+        reasons[liquidated] = LIQUIDATION
+        triggered = np.flatnonzero(liquidated | stopped | took_profit)
+
+        priced = ~np.isnan(price)
+        n_tokens = len(self.tokens)
+        pnl_by_token = np.bincount(token[priced], weights=pnl[priced], minlength=n_tokens)
+        exposure_by_token = np.bincount(token[priced], weights=exposure[priced], minlength=n_tokens)
+        count_by_token = np.bincount(token, minlength=n_tokens)
+
+        return {
+            "close": [(self._ids[row], reasons[row]) for row in triggered],
+            "pnl": {
+                self.tokens[i]: float(pnl_by_token[i]) for i in range(n_tokens) if count_by_token[i]
+            },
+            "exposure": {
+                self.tokens[i]: float(exposure_by_token[i]) for i in range(n_tokens) if count_by_token[i]
+            },
+            "total_pnl": float(pnl_by_token.sum()),
+            "total_exposure": float(exposure_by_token.sum())
+        }
+
+def close_reason(position: Dict, price: float) -> Optional[str]:
+    """The reason a single position should close at ``price``, if any"""
+    side = position.get("side", LONG)
+    signed = side * price
+    for reason, key, crossed in (
+        (LIQUIDATION, "liquidation_price", lambda level: signed <= side * level),
+        (STOP_LOSS, "stop_loss", lambda level: signed <= side * level),
+        (TAKE_PROFIT, "take_profit", lambda level: signed >= side * level)
+    ):
+        level = position.get(key)
+        if level is not None and not np.isnan(level) and crossed(level):
+            return reason
+    return None
+
+def realized_pnl(position: Dict, exit_price: float) -> float:
+    """PnL of closing ``position`` at ``exit_price``, on ``amount * leverage`` like ``evaluate``"""
+    size = position["amount"] * position.get("leverage", 1.0)
+    return position.get("side", LONG) * (exit_price - position["entry_price"]) * size
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import time
+from decimal import Decimal
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from ..utils.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+PriceFetcher = Callable[[List[str]], Awaitable[Dict[str, Decimal]]]
+
+class PriceService:
+    """Token prices with a short TTL cache and single-flight fetching.
+
+    ``get_prices`` returns cached prices that are still fresh, joins fetches
+    already in flight for the same token instead of issuing another, and
+    fetches everything else with a single call to ``fetcher`` (split into
+    ``max_batch`` sized chunks that run concurrently). A fetcher backed by a
+    multicall contract turns each chunk into one RPC round-trip.
+
+    A token whose fetch fails (or that the fetcher has no price for) is
+    returned as NaN and not cached, so the next call tries it again.
+
+    Cached prices are dropped when a new block arrives, either all of them or
+    only the tokens the block touched.
+    """
+
+    def __init__(self, fetcher: PriceFetcher, ttl: float = 1.0, max_batch: int = 100):
+        self.fetcher = fetcher
+        self.ttl = ttl
+        self.max_batch = max_batch
+        self._cache: Dict[str, Tuple[Decimal, float]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.block_number: Optional[int] = None
+        self.fetch_latency = Histogram()
+        self.stats = {"hits": 0, "joined": 0, "fetched": 0, "fetch_calls": 0}
+
+    async def get_price(self, token: str) -> Decimal:
+        return (await self.get_prices([token]))[token]
+
+    async def get_prices(self, tokens: Iterable[str]) -> Dict[str, Decimal]:
+        """Prices for the distinct tokens requested; NaN for those that could not be fetched"""
+        now = time.monotonic()
+        prices: Dict[str, Decimal] = {}
+        waiting: Dict[str, asyncio.Future] = {}
+        missing: List[str] = []
+
+        for token in set(tokens):
+            cached = self._cache.get(token)
+            if cached is not None and now - cached[1] < self.ttl:
+                prices[token] = cached[0]
+                self.stats["hits"] += 1
+            elif token in self._inflight:
+                waiting[token] = self._inflight[token]
+                self.stats["joined"] += 1
+            else:
+                missing.append(token)
+
+        if missing:
+            loop = asyncio.get_running_loop()
+            for token in missing:
+                waiting[token] = self._inflight[token] = loop.create_future()
+            chunks = [missing[i:i + self.max_batch] for i in range(0, len(missing), self.max_batch)]
+            await asyncio.gather(*(self._fetch(chunk) for chunk in chunks))
+
+        if waiting:
+            results = await asyncio.gather(*waiting.values(), return_exceptions=True)
+            for token, result in zip(waiting, results):
+                if isinstance(result, BaseException):
+                    # One unpriceable token must not fail the others; NaN reads as unpriced
+                    logger.error(f"Failed to price {token}: {result!r}")
+                    result = Decimal("NaN")
+                prices[token] = result
+        return prices
+
+    async def _fetch(self, tokens: List[str]):
+        """Fetch one chunk and resolve its futures"""
+        started = time.perf_counter()
+        self.stats["fetch_calls"] += 1
+        try:
+            result = await self.fetcher(tokens)
+        except asyncio.CancelledError:
+            # Don't leave joiners waiting on a fetch that will never finish
+            for token in tokens:
+                future = self._inflight.pop(token, None)
+                if future is not None and not future.done():
+                    future.cancel()
+            raise
+        except Exception as e:
+            for token in tokens:
+                future = self._inflight.pop(token, None)
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.fetch_latency.observe(time.perf_counter() - started)
+
+        fetched_at = time.monotonic()
+        for token in tokens:
+            future = self._inflight.pop(token, None)
+            price = result.get(token)
+            if price is None:
+                if future is not None and not future.done():
+                    future.set_exception(KeyError(f"No price for {token}"))
+                continue
+            self._cache[token] = (price, fetched_at)
+            self.stats["fetched"] += 1
+            if future is not None and not future.done():
+                future.set_result(price)
+
+    def invalidate(self, tokens: Optional[Iterable[str]] = None):
+        """Drop cached prices for some tokens, or all of them"""
+        if tokens is None:
+            self._cache.clear()
+            return
+        for token in tokens:
+            self._cache.pop(token, None)
+
+    def on_new_block(self, block_number: int, touched_tokens: Optional[Iterable[str]] = None):
+        """A new block may have moved prices: invalidate what it touched (everything if unknown)"""
+        self.block_number = block_number
+        self.invalidate(touched_tokens)
+
+    def get_metrics(self) -> Dict:
+        return {
+            **self.stats,
+            "cached": len(self._cache),
+            "inflight": len(self._inflight),
+            "block_number": self.block_number,
+            "fetch_latency": self.fetch_latency.as_dict()
+        }
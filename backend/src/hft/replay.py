@@ -0,0 +1,429 @@
+"""Record pending transactions and blocks, and replay them through HFTBot.
+
+A replay file is a short header followed by records of
+``<kind:u8><timestamp:f64><length:u32>`` plus a MessagePack payload. Hex
+fields are stored as raw bytes and quantities as integers, so records are
+compact and decode without hex parsing. Files are read through ``mmap``.
+
+Besides pending transactions and blocks, a file can carry a snapshot of the
+mirrored pools and, before each block, the pools' Sync/Swap logs in it, so
+a replay prices and quotes exactly as the bot did live.
+
+    python -m src.hft.replay record --url http://localhost:8545 --out session.dxr --seconds 600 --pools pools.json
+    python -m src.hft.replay import-corpus corpus.jsonl session.dxr --pools pools.json
+    python -m src.hft.replay run session.dxr --strategy my_module:MyStrategy
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import math
+import mmap
+import struct
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import msgpack
+
+from ..utils.metrics import Histogram
+from .amm import PoolMirror
+from .mempool import MempoolIngestor
+from .rpc import JsonRpcClient
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"DXRP"
+VERSION = 1
+FILE_HEADER = struct.Struct("<4sH")
+RECORD_HEADER = struct.Struct("<BdI")
+
+TX = 1
+BLOCK = 2
+POOLS = 3
+LOGS = 4
+
+_ADDRESS_FIELDS = ("from", "to")
+_BYTES_FIELDS = ("hash", "input", "blockHash")
+_INT_FIELDS = (
+    "value", "gas", "gasPrice", "maxFeePerGas", "maxPriorityFeePerGas",
+    "nonce", "type", "chainId", "blockNumber", "transactionIndex", "v"
+)
+
+def _to_bytes(value) -> bytes:
+    return bytes.fromhex(value[2:]) if isinstance(value, str) else bytes(value)
+
+def _to_int(value) -> int:
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+def _pack_int(value):
+    """Quantities above MessagePack's 64-bit range (e.g. wei values) are stored as big-endian bytes"""
+    value = _to_int(value)
+    return value if value < 1 << 64 else value.to_bytes((value.bit_length() + 7) // 8, "big")
+
+def pack_transaction(tx: Dict) -> Dict:
+    """RPC transaction -> compact record payload"""
+    packed = {}
+    for key, value in tx.items():
+        if value is None:
+            continue
+        if key in _ADDRESS_FIELDS or key in _BYTES_FIELDS:
+            packed[key] = _to_bytes(value)
+        elif key in _INT_FIELDS:
+            packed[key] = _pack_int(value)
+        elif key in ("r", "s", "accessList", "yParity"):
+            # Signature and access list are irrelevant to analysis
+            continue
+        else:
+            packed[key] = value
+    return packed
+
+def unpack_transaction(packed: Dict) -> Dict:
+    """Compact payload -> transaction in the shape the analyzer accepts (calldata stays bytes)"""
+    tx = dict(packed)
+    for key in _ADDRESS_FIELDS:
+        if key in tx:
+            tx[key] = "0x" + tx[key].hex()
+    if "hash" in tx:
+        tx["hash"] = "0x" + tx["hash"].hex()
+    for key in _INT_FIELDS:
+        if isinstance(tx.get(key), bytes):
+            tx[key] = int.from_bytes(tx[key], "big")
+    return tx
+
+def _unpack_int(value) -> int:
+    return int.from_bytes(value, "big") if isinstance(value, bytes) else value
+
+def pack_pools(snapshot: List[Dict]) -> List[Dict]:
+    """``PoolMirror.snapshot()`` -> record payload (reserves and sqrt prices exceed 64 bits)"""
+    return [
+        {key: _pack_int(value) if isinstance(value, int) and key != "tick" else value for key, value in spec.items()}
+        for spec in snapshot
+    ]
+
+def unpack_pools(packed: List[Dict]) -> List[Dict]:
+    return [{key: _unpack_int(value) for key, value in spec.items()} for spec in packed]
+
+def pack_logs(logs: List[Dict]) -> List[Dict]:
+    return [
+        {
+            "address": _to_bytes(log["address"]),
+            "topics": [_to_bytes(topic) for topic in log.get("topics") or ()],
+            "data": _to_bytes(log.get("data") or "0x"),
+            "blockNumber": _to_int(log["blockNumber"]) if log.get("blockNumber") is not None else None
+        }
+        for log in logs
+    ]
+
+def unpack_logs(packed: List[Dict]) -> List[Dict]:
+    """Logs in the shape ``PoolMirror.apply_logs`` accepts (data stays bytes)"""
+    return [
+        {**log, "address": "0x" + log["address"].hex(), "topics": ["0x" + topic.hex() for topic in log["topics"]]}
+        for log in packed
+    ]
+
+class ReplayWriter:
+    """Appends records to a replay file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "wb")
+        self._file.write(FILE_HEADER.pack(MAGIC, VERSION))
+        self.records = 0
+
+    def _write(self, kind: int, timestamp: float, payload: Dict):
+        data = msgpack.packb(payload, use_bin_type=True)
+        self._file.write(RECORD_HEADER.pack(kind, timestamp, len(data)))
+        self._file.write(data)
+        self.records += 1
+
+    def write_transaction(self, tx: Dict, timestamp: float):
+        self._write(TX, timestamp, pack_transaction(tx))
+
+    def write_block(self, number: int, timestamp: float):
+        self._write(BLOCK, timestamp, {"number": number})
+
+    def write_pools(self, snapshot: List[Dict], timestamp: float):
+        self._write(POOLS, timestamp, {"pools": pack_pools(snapshot)})
+
+    def write_logs(self, number: int, logs: List[Dict], timestamp: float):
+        """The pools' logs in block ``number``; written before that block's record"""
+        self._write(LOGS, timestamp, {"number": number, "logs": pack_logs(logs)})
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class ReplayReader:
+    """Sequential reader over a memory-mapped replay file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(self._map, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            self._map.madvise(mmap.MADV_SEQUENTIAL)
+        magic, version = FILE_HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {VERSION} replay file")
+
+    def __iter__(self) -> Iterator[Tuple[int, float, Dict]]:
+        view = memoryview(self._map)
+        offset = FILE_HEADER.size
+        end = len(self._map)
+        try:
+            while offset + RECORD_HEADER.size <= end:
+                kind, timestamp, length = RECORD_HEADER.unpack_from(self._map, offset)
+                offset += RECORD_HEADER.size
+                if offset + length > end:
+                    logger.warning(f"Truncated record at the end of {self.path}")
+                    break
+                yield kind, timestamp, msgpack.unpackb(view[offset:offset + length], raw=False)
+                offset += length
+        finally:
+            view.release()
+
+    def close(self):
+        self._map.close()
+
+class SimulatedClock:
+    """Replay time: jumps to each record's timestamp instead of waiting for it"""
+
+    def __init__(self):
+        self.now: Optional[float] = None
+
+    def advance(self, timestamp: float):
+        self.now = timestamp
+
+    def utcnow(self) -> datetime:
+        return datetime.utcfromtimestamp(self.now)
+
+class ReplaySink:
+    """Stands in for the write-behind writer: collects what the bot would persist,
+    stamped with simulated time"""
+
+    saturated = False
+
+    def __init__(self, clock: SimulatedClock):
+        self.clock = clock
+        self.trades: List[Dict] = []
+        self.bot_trades: List[Dict] = []
+
+    def submit_trade(self, trade: Dict) -> bool:
+        self.trades.append({"created_at": self.clock.utcnow(), **trade})
+        return True
+
+    def submit_bot_trade(self, bot_trade: Dict, trade_tx_hash: Optional[str] = None) -> bool:
+        self.bot_trades.append({"created_at": self.clock.utcnow(), **bot_trade, "trade_tx_hash": trade_tx_hash})
+        return True
+
+class ReplayEngine:
+    """Feeds a replay file through a bot's analyzer and executor paths.
+
+    Transactions are analyzed one at a time, in file order, so a replay is
+    deterministic; a pool snapshot is loaded into the bot's mirror, logs are
+    applied to it and each block advances the bot's head, invalidates the
+    prices its logs moved and re-checks open positions as
+    ``monitor_positions`` would. The bot should be built with
+    a ``ReplaySink`` as its persistence and ``dry_run=True`` so nothing is
+    sent anywhere.
+    """
+
+    def __init__(self, bot, clock: SimulatedClock):
+        self.bot = bot
+        self.clock = clock
+        self.latency = Histogram()
+
+    async def run(self, path: str) -> Dict:
+        reader = ReplayReader(path)
+        transactions = blocks = logs = 0
+        touched = set()
+        first = last = None
+        started = time.perf_counter()
+        try:
+            for kind, timestamp, payload in reader:
+                self.clock.advance(timestamp)
+                first = timestamp if first is None else first
+                last = timestamp
+                if kind == TX:
+                    tx = unpack_transaction(payload)
+                    analyze_started = time.perf_counter()
+                    await self.bot._analyze_transaction(tx)
+                    self.latency.observe(time.perf_counter() - analyze_started)
+                    transactions += 1
+                elif kind == BLOCK:
+                    self.bot.block_number = payload["number"]
+                    # Without mirrored pools nothing says what moved: drop every cached price
+                    self.bot.prices.on_new_block(payload["number"], touched if self.bot.amm.pools else None)
+                    touched = set()
+                    await self.bot.check_positions()
+                    blocks += 1
+                elif kind == POOLS:
+                    self.bot.amm.add_pools(unpack_pools(payload["pools"]))
+                elif kind == LOGS:
+                    touched |= self.bot.amm.apply_logs(unpack_logs(payload["logs"]))
+                    logs += len(payload["logs"])
+        finally:
+            reader.close()
+        wall = time.perf_counter() - started
+        simulated = (last - first) if first is not None else 0.0
+        return {
+            "transactions": transactions,
+            "blocks": blocks,
+            "logs": logs,
+            "pools": len(self.bot.amm.pools),
+            "wall_seconds": wall,
+            "simulated_seconds": simulated,
+            "speedup": simulated / wall if wall else 0.0,
+            "tx_per_second": transactions / wall if wall else 0.0,
+            "analyze_latency": self.latency.as_dict(),
+            "decoder": dict(self.bot.decoder.stats),
+            "strategies": self.bot.strategies.get_metrics(),
+            "bot_trades": len(self.bot.persistence.bot_trades)
+        }
+
+def import_corpus(corpus_path: str, out_path: str, block_time: float = 12.0, start: float = 0.0,
+                  pools: Optional[List[Dict]] = None) -> int:
+    """Convert a JSON-lines pending-block corpus (benchmarks/corpus.py) to a replay file;
+    each block's transactions are spread evenly over the block time. ``pools`` is a
+    pool snapshot (``PoolMirror.snapshot()``) written first; a block's ``logs``, if
+    present, are written ahead of it"""
+    with ReplayWriter(out_path) as writer, open(corpus_path) as f:
+        if pools:
+            writer.write_pools(pools, start)
+        for index, line in enumerate(f):
+            if not line.strip():
+                continue
+            block = json.loads(line)
+            block_start = start + index * block_time
+            transactions = block.get("transactions") or []
+            for position, tx in enumerate(transactions):
+                if isinstance(tx, dict):
+                    writer.write_transaction(tx, block_start + block_time * position / max(len(transactions), 1))
+            number = _to_int(block.get("number") or index)
+            if block.get("logs"):
+                writer.write_logs(number, block["logs"], block_start + block_time)
+            writer.write_block(number, block_start + block_time)
+        return writer.records
+
+async def record(url: str, out_path: str, seconds: float, block_poll: float = 0.25,
+                 pools: Optional[List[Dict]] = None) -> int:
+    """Record a live node's pending transactions and new blocks. With ``pools`` (pool
+    configuration, as in ``AMM_POOLS``) their state is recorded once at the start and
+    their logs with every block"""
+    rpc = JsonRpcClient(url)
+    mirror = PoolMirror()
+    mirror.add_pools(pools or [])
+    with ReplayWriter(out_path) as writer:
+        if mirror.pools:
+            await mirror.bootstrap(rpc)
+            writer.write_pools(mirror.snapshot(), time.time())
+
+        async def on_transaction(tx: Dict):
+            writer.write_transaction(tx, time.time())
+
+        async def poll_blocks():
+            current = None
+            while True:
+                try:
+                    number = int(await rpc.call("eth_blockNumber"), 16)
+                    if number != current:
+                        if mirror.pools:
+                            logs = await mirror.fetch_logs(rpc, number if current is None else current + 1, number)
+                            writer.write_logs(number, logs, time.time())
+                        current = number
+                        writer.write_block(number, time.time())
+                except Exception as e:
+                    logger.error(f"Error polling blocks: {e}")
+                await asyncio.sleep(block_poll)
+
+        ingestor = MempoolIngestor(rpc, on_transaction, workers=1)
+        tasks = [asyncio.create_task(ingestor.run()), asyncio.create_task(poll_blocks())]
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            await ingestor.stop()
+            tasks[1].cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await rpc.close()
+        return writer.records
+
+def _load_strategy(spec: str):
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name)()
+
+async def replay(path: str, strategies: List[str]) -> Tuple[Dict, ReplaySink]:
+    """Replay a file through a dry-run HFTBot; returns the report and the recorded rows"""
+    from .bot import HFTBot
+
+    clock = SimulatedClock()
+    sink = ReplaySink(clock)
+    bot = HFTBot(
+        "http://replay.invalid",
+        persistence=sink,
+        strategies=[_load_strategy(spec) for spec in strategies],
+        dry_run=True
+    )
+    bot.strategies.start()
+    try:
+        return await ReplayEngine(bot, clock).run(path), sink
+    finally:
+        bot.strategies.shutdown()
+
+def _finite(value):
+    """``value`` with NaN and infinities replaced by None, so it dumps as valid JSON"""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    recorder = commands.add_parser("record", help="record a live node")
+    recorder.add_argument("--url", required=True)
+    recorder.add_argument("--out", required=True)
+    recorder.add_argument("--seconds", type=float, default=60)
+    recorder.add_argument("--pools", help="JSON file of pools to record (AMM_POOLS format)")
+    importer = commands.add_parser("import-corpus", help="convert a pending-block corpus")
+    importer.add_argument("corpus")
+    importer.add_argument("out")
+    importer.add_argument("--block-time", type=float, default=12.0)
+    importer.add_argument("--pools", help="JSON file with a pool snapshot (AMM_POOLS format plus state)")
+    runner = commands.add_parser("run", help="replay a file through HFTBot")
+    runner.add_argument("path")
+    runner.add_argument("--strategy", action="append", default=[], help="module:Class, repeatable")
+    runner.add_argument("--trades", help="write the resulting trades (with their bot trade fields) here as JSON lines")
+    args = parser.parse_args()
+
+    pools = None
+    if getattr(args, "pools", None):
+        with open(args.pools) as f:
+            pools = json.load(f)
+    if args.command == "record":
+        print(json.dumps({"records": asyncio.run(record(args.url, args.out, args.seconds, pools=pools))}))
+    elif args.command == "import-corpus":
+        print(json.dumps({"records": import_corpus(args.corpus, args.out, args.block_time, pools=pools)}))
+    else:
+        report, sink = asyncio.run(replay(args.path, args.strategy))
+        if args.trades:
+            trades = {trade["tx_hash"]: trade for trade in sink.trades}
+            with open(args.trades, "w") as f:
+                for bot_trade in sink.bot_trades:
+                    row = {**trades.get(bot_trade["trade_tx_hash"], {}), **bot_trade}
+                    f.write(json.dumps(_finite(row), default=str, allow_nan=False) + "\n")
+        print(json.dumps(_finite(report), indent=2, default=str, allow_nan=False))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,50 @@
+from typing import Dict, FrozenSet, NamedTuple, Optional
+
+from ..decoder import DecodedSwap
+
+class Decision(NamedTuple):
+    """A strategy's decision to trade on a pending swap"""
+    strategy: str
+    token: str
+    side: str  # buy/sell
+    amount: float
+    profit_target: Optional[float] = None
+    stop_loss: Optional[float] = None
+    trigger: Optional[Dict] = None
+
+    def as_bot_trade(self) -> Dict:
+        """The ``BotTrade`` fields this decision determines"""
+        return {
+            "strategy": self.strategy,
+            "trigger_condition": self.trigger,
+            "profit_target": self.profit_target,
+            "stop_loss": self.stop_loss
+        }
+
+class Strategy:
+    """A trading strategy evaluated against decoded pending swaps.
+
+    Subclasses declare what they care about and the engine only routes
+    matching swaps to them:
+
+    - ``routers``: router names from ``decoder.KNOWN_ROUTERS`` (None: any)
+    - ``functions``: swap function names, e.g. ``exactInputSingle`` (None: any)
+    - ``tokens``: token addresses; the swap path must touch one (None: any)
+
+    ``evaluate`` returns a ``Decision`` or None. Strategies with
+    ``cpu_bound = True`` run in the engine's process pool; they get a copy
+    of the strategy in every worker process, so they must be picklable and
+    must not rely on state mutated in the main process.
+    """
+
+    name = "strategy"
+    routers: Optional[FrozenSet[str]] = None
+    functions: Optional[FrozenSet[str]] = None
+    tokens: Optional[FrozenSet[str]] = None
+    cpu_bound = False
+
+    def evaluate(self, swap: DecodedSwap, context: Dict) -> Optional[Decision]:
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.name}>"
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ...utils.metrics import Histogram
+from ..decoder import DecodedSwap
+from .base import Decision, Strategy
+
+logger = logging.getLogger(__name__)
+
+IndexKey = Tuple[Optional[str], Optional[str]]
+
+# Strategies registered in a pool worker process, by name
+_worker_strategies: Dict[str, Strategy] = {}
+
+def _init_worker(strategies: List[Strategy]):
+    _worker_strategies.update((strategy.name, strategy) for strategy in strategies)
+
+def _evaluate_in_worker(name: str, swap: DecodedSwap, context: Dict) -> Optional[Decision]:
+    return _worker_strategies[name].evaluate(swap, context)
+
+class StrategyMetrics:
+    __slots__ = ("latency", "evaluated", "decisions", "errors")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.evaluated = 0
+        self.decisions = 0
+        self.errors = 0
+
+    def as_dict(self) -> Dict:
+        return {
+            "evaluated": self.evaluated,
+            "decisions": self.decisions,
+            "errors": self.errors,
+            "latency": self.latency.as_dict()
+        }
+
+class StrategyEngine:
+    """Routes decoded swaps to the strategies interested in them.
+
+    Strategies are indexed by (router, function) with ``None`` as a
+    wildcard, so routing a swap is four dict lookups plus the token filter,
+    however many strategies are registered. Cheap strategies are evaluated
+    inline on the event loop; ``cpu_bound`` ones are sent to a process pool
+    and awaited concurrently.
+    """
+
+    def __init__(self, strategies: Iterable[Strategy] = (), processes: int = 2):
+        self.processes = processes
+        self.strategies: Dict[str, Strategy] = {}
+        self._index: Dict[IndexKey, List[Strategy]] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.metrics: Dict[str, StrategyMetrics] = {}
+        self.stats = {"routed": 0, "unrouted": 0}
+        for strategy in strategies:
+            self.register(strategy)
+
+    def register(self, strategy: Strategy):
+        if strategy.name in self.strategies:
+            raise ValueError(f"Strategy '{strategy.name}' already registered")
+        if strategy.cpu_bound and self._pool is not None:
+            raise RuntimeError("CPU-bound strategies must be registered before the pool starts")
+        if strategy.tokens is not None:
+            # Swap paths are matched lowercased; checksummed declarations must match too
+            strategy.tokens = frozenset(token.lower() for token in strategy.tokens)
+        self.strategies[strategy.name] = strategy
+        self.metrics[strategy.name] = StrategyMetrics()
+        for router in strategy.routers or (None,):
+            for function in strategy.functions or (None,):
+                self._index.setdefault((router, function), []).append(strategy)
+
+    def route(self, swap: DecodedSwap) -> List[Strategy]:
+        """Strategies interested in a swap, in registration order"""
+        candidates: List[Strategy] = []
+        for key in (
+            (swap.router, swap.function),
+            (swap.router, None),
+            (None, swap.function),
+            (None, None)
+        ):
+            candidates.extend(self._index.get(key, ()))
+        if len(candidates) > 1:
+            candidates = list(dict.fromkeys(candidates))
+        path = None
+        routed = []
+        for strategy in candidates:
+            if strategy.tokens is not None:
+                if path is None:
+                    path = {token.lower() for token in swap.path}
+                if strategy.tokens.isdisjoint(path):
+                    continue
+            routed.append(strategy)
+        return routed
+
+    def start(self):
+        """Spawn the process pool up front so the first CPU-bound evaluation doesn't pay for it"""
+        if any(strategy.cpu_bound for strategy in self.strategies.values()):
+            self._get_pool()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            cpu_bound = [strategy for strategy in self.strategies.values() if strategy.cpu_bound]
+            # Spawned, not forked: the parent runs an event loop and helper threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(cpu_bound,)
+            )
+        return self._pool
+
+    async def evaluate(self, swap: DecodedSwap, context: Optional[Dict] = None) -> List[Decision]:
+        """Evaluate a swap with every interested strategy; returns their decisions"""
+        strategies = self.route(swap)
+        if not strategies:
+            self.stats["unrouted"] += 1
+            return []
+        self.stats["routed"] += 1
+        context = context or {}
+
+        decisions: List[Decision] = []
+        offloaded = []
+        for strategy in strategies:
+            if strategy.cpu_bound:
+                offloaded.append(strategy)
+                continue
+            started = time.perf_counter()
+            try:
+                decision = strategy.evaluate(swap, context)
+            except Exception as e:
+                decision = e
+            self._record(strategy, decision, started, decisions)
+
+        if offloaded:
+            loop = asyncio.get_running_loop()
+            pool = self._get_pool()
+            started = time.perf_counter()
+            results = await asyncio.gather(
+                *(loop.run_in_executor(pool, _evaluate_in_worker, s.name, swap, context) for s in offloaded),
+                return_exceptions=True
+            )
+            for strategy, result in zip(offloaded, results):
+                self._record(strategy, result, started, decisions)
+        return decisions
+
+    def _record(self, strategy: Strategy, result, started: float, decisions: List[Decision]):
+        metrics = self.metrics[strategy.name]
+        metrics.latency.observe(time.perf_counter() - started)
+        metrics.evaluated += 1
+        if isinstance(result, Exception):
+            metrics.errors += 1
+            logger.error(f"Strategy {strategy.name} failed: {result}")
+        elif result is not None:
+            metrics.decisions += 1
+            # Decisions are tagged with the strategy that made them, whatever it put in
+            decisions.append(result._replace(strategy=strategy.name))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def get_metrics(self) -> Dict:
+        return {
+            **self.stats,
+            "strategies": {name: metrics.as_dict() for name, metrics in self.metrics.items()}
+        }
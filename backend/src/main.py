@@ -1,16 +1,20 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends
+from fastapi import FastAPI, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from typing import List, Dict, Optional
 import logging
 import json
 import asyncio
 from datetime import datetime
-from sqlalchemy.orm import Session
 
-from .routes import hft
+from .routes import hft, analytics
 from .websocket.manager import manager
-from .database import init_db, get_db
+from .websocket.codec import negotiate
+from .database import init_db, close_db, get_pool_metrics
+from .engine.server import seed_performance
+from .persistence.writer import writer
 from .config import settings
+from .utils.metrics import LoopLagMonitor, metrics
 from .api import websocket
 
 # Configure logging
@@ -20,6 +24,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+loop_lag = LoopLagMonitor(metrics)
+
 app = FastAPI(
     title="Dexlink Trading Backend",
     description="Backend API for Dexlink Social Trading Platform",
@@ -41,6 +47,7 @@ app.add_middleware(
 
 # Include routers
 app.include_router(hft.router)
+app.include_router(analytics.router)
 app.include_router(websocket.router)
 
 # WebSocket endpoint for real-time updates
@@ -48,16 +55,22 @@ app.include_router(websocket.router)
 async def websocket_endpoint(
     websocket: WebSocket,
     client_id: str,
-    channels: Optional[List[str]] = None,
-    db: Session = Depends(get_db)
+    channels: Optional[List[str]] = Query(None),
+    encoding: Optional[str] = None
 ):
-    connection_id = await manager.connect(websocket, client_id, channels)
+    # Outbound wire encoding (?encoding=json|msgpack); client messages are always JSON text
+    try:
+        wire_encoding = negotiate(encoding)
+    except ValueError:
+        await websocket.close(code=1003)
+        return
+    connection_id = await manager.connect(websocket, client_id, channels, encoding=wire_encoding)
     try:
         while True:
             data = await websocket.receive_text()
             try:
                 message = json.loads(data)
-                await process_message(message, client_id, db)
+                await process_message(message, client_id, connection_id)
             except json.JSONDecodeError:
                 logger.error(f"Invalid JSON received from client {client_id}")
     except WebSocketDisconnect:
@@ -66,7 +79,7 @@ async def websocket_endpoint(
         logger.error(f"WebSocket error for client {client_id}: {e}")
         await manager.disconnect(client_id, connection_id)
 
-async def process_message(message: dict, client_id: str, db: Session):
+async def process_message(message: dict, client_id: str, connection_id: Optional[str] = None):
     """Process incoming WebSocket messages"""
     try:
         message_type = message.get("type")
@@ -77,6 +90,9 @@ async def process_message(message: dict, client_id: str, db: Session):
         elif message_type == "unsubscribe":
             channels = message.get("channels", [])
             await manager.unsubscribe(client_id, channels)
+
+        elif message_type == "set_encoding" and connection_id:
+            manager.set_encoding(client_id, connection_id, negotiate(message.get("encoding")))
             
         elif message_type == "trade":
             # Process trade request
@@ -107,15 +123,42 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
-        "version": app.version
+        "version": app.version,
+        "db_pool": get_pool_metrics(),
+        "persistence": writer.get_metrics(),
+        "ws_broker": manager.broker.get_metrics(),
+        "ws_coalescing": manager.get_coalescing_stats(),
+        "engine": hft.bot.get_metrics() if hft.ENGINE_MODE == "process" else None
     }
 
+# Prometheus scrape endpoint
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
     # Initialize database
-    init_db()
+    await init_db()
     logger.info("Database initialized")
+
+    # Event-loop lag sampling for /metrics
+    loop_lag.start()
+
+    # Attach to the broadcast broker before any client connects
+    await manager.start()
+
+    if hft.ENGINE_MODE == "process":
+        # The engine process owns the bot, its trade writer and its aggregates
+        await hft.bot.connect()
+    else:
+        # Replay journaled trades the last run did not get to write, then start flushing
+        await writer.start()
+
+        # Seed the bot's running aggregates once; the status endpoint never counts rows again
+        await seed_performance(hft.bot)
+        await hft.copier.load()
     
     # Additional startup tasks
     if settings.ENVIRONMENT == "production":
@@ -126,8 +169,16 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     # Cleanup tasks
-    await hft.bot.stop()
-    logger.info("HFT bot stopped")
+    if hft.ENGINE_MODE == "process":
+        # Detach only; the engine keeps trading for the other workers
+        await hft.bot.close()
+    else:
+        await hft.bot.stop()
+        logger.info("HFT bot stopped")
+        await writer.stop()
+    await manager.stop()
+    await loop_lag.stop()
+    await close_db()
 
 if __name__ == "__main__":
     import uvicorn
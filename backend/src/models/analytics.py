@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
+from .base import Base
+
+class TradeRollup(Base):
+    """Trade aggregates per time bucket, one row per (dimension, key, resolution, bucket)"""
+    __tablename__ = "trade_rollups"
+    __table_args__ = (
+        # Ranking keys of one dimension over a time range
+        Index("ix_trade_rollups_dimension_bucket", "dimension", "resolution", "bucket_start"),
+    )
+
+    dimension = Column(String, primary_key=True)  # user/token/bot
+    key = Column(String, primary_key=True)
+    resolution = Column(String, primary_key=True)  # minute/hour/day
+    bucket_start = Column(DateTime, primary_key=True)
+    trade_count = Column(Integer, nullable=False, default=0)
+    success_count = Column(Integer, nullable=False, default=0)
+    volume = Column(Float, nullable=False, default=0.0)
+    pnl = Column(Float, nullable=False, default=0.0)
+    fees = Column(Float, nullable=False, default=0.0)
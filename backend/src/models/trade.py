@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Enum, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, Enum, ForeignKey, JSON, Boolean, Index
 from .base import Base, TimestampMixin
 import enum
 
@@ -15,6 +15,10 @@ class PositionStatus(enum.Enum):
 
 class Trade(Base, TimestampMixin):
     __tablename__ = "trades"
+    __table_args__ = (
+        # A user's trade history per token, newest first
+        Index("ix_trades_user_token_created", "user_id", "token_symbol", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(String, nullable=False, index=True)
@@ -28,10 +32,15 @@ class Trade(Base, TimestampMixin):
     gas_price = Column(Float)
     gas_used = Column(Integer)
     error = Column(String)
-    metadata = Column(JSON)
+    # 'metadata' is reserved on declarative classes; the column keeps its name
+    meta = Column("metadata", JSON)
 
 class Position(Base, TimestampMixin):
     __tablename__ = "positions"
+    __table_args__ = (
+        # A user's open (or closed) positions
+        Index("ix_positions_user_status", "user_id", "status"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(String, nullable=False, index=True)
@@ -46,10 +55,17 @@ class Position(Base, TimestampMixin):
     stop_loss = Column(Float)
     take_profit = Column(Float)
     liquidation_price = Column(Float)
-    metadata = Column(JSON)
+    # 'metadata' is reserved on declarative classes; the column keeps its name
+    meta = Column("metadata", JSON)
 
 class BotTrade(Base, TimestampMixin):
     __tablename__ = "bot_trades"
+    __table_args__ = (
+        # Keyset pagination on (created_at, id), unfiltered and per bot / strategy
+        Index("ix_bot_trades_created_id", "created_at", "id"),
+        Index("ix_bot_trades_bot_created_id", "bot_id", "created_at", "id"),
+        Index("ix_bot_trades_strategy_created_id", "strategy", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True)
     bot_id = Column(String, nullable=False, index=True)
@@ -59,6 +75,25 @@ class BotTrade(Base, TimestampMixin):
     profit_target = Column(Float)
     stop_loss = Column(Float)
     execution_time = Column(Float)  # in milliseconds
-    success = Column(bool, default=False)
+    success = Column(Boolean, default=False)
     error = Column(String)
-    metadata = Column(JSON) 
\ No newline at end of file
+    # 'metadata' is reserved on declarative classes; the column keeps its name
+    meta = Column("metadata", JSON)
+
+
+class CopySubscription(Base, TimestampMixin):
+    __tablename__ = "copy_subscriptions"
+    __table_args__ = (
+        # One subscription per follower and leader; a leader's active followers
+        Index("ix_copy_subscriptions_leader_follower", "leader_id", "follower_id", unique=True),
+        Index("ix_copy_subscriptions_leader_active", "leader_id", "active"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    follower_id = Column(String, nullable=False, index=True)
+    leader_id = Column(String, nullable=False)
+    allocation = Column(Float, nullable=False)  # follower amount per unit of leader amount
+    max_trade_value = Column(Float)  # per copied trade, in quote currency
+    max_exposure = Column(Float)  # open cost basis across tokens, in quote currency
+    max_slippage = Column(Float, nullable=False, default=1.0)  # percent
+    active = Column(Boolean, nullable=False, default=True)
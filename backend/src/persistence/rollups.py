@@ -0,0 +1,270 @@
+"""Per-minute / hour / day trade aggregates by user, token and bot.
+
+Rollups are additive: every batch of new trades is folded into per-bucket
+deltas and upserted with ``col = col + excluded.col``, in the same
+transaction that inserts the raw rows (databases without an upsert update,
+then insert, one bucket at a time). ``backfill`` rebuilds them from the
+raw tables:
+
+    python -m src.persistence.rollups backfill [--since 2024-01-01]
+"""
+import argparse
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import delete, desc, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.analytics import TradeRollup
+from ..models.trade import BotTrade, Trade, TradeStatus
+
+logger = logging.getLogger(__name__)
+
+USER = "user"
+TOKEN = "token"
+BOT = "bot"
+DIMENSIONS = (USER, TOKEN, BOT)
+
+RESOLUTIONS = {
+    "minute": lambda ts: ts.replace(second=0, microsecond=0),
+    "hour": lambda ts: ts.replace(minute=0, second=0, microsecond=0),
+    "day": lambda ts: ts.replace(hour=0, minute=0, second=0, microsecond=0)
+}
+
+METRICS = ("trade_count", "success_count", "volume", "pnl", "fees")
+
+# Upsert rows per statement; keeps sqlite under its bound-parameter limit
+UPSERT_CHUNK = 500
+
+RollupKey = Tuple[str, str, str, datetime]
+
+def _field(row, name: str):
+    return row.get(name) if isinstance(row, Mapping) else getattr(row, name, None)
+
+def _pnl(row) -> float:
+    meta = _field(row, "meta") or {}
+    return float(meta.get("pnl") or 0.0)
+
+def _volume(trade) -> float:
+    return float(_field(trade, "amount") or 0.0) * float(_field(trade, "price") or 0.0)
+
+def _fees(trade) -> float:
+    return float(_field(trade, "gas_price") or 0.0) * float(_field(trade, "gas_used") or 0)
+
+def _executed(trade) -> bool:
+    return _field(trade, "status") in (TradeStatus.EXECUTED, TradeStatus.EXECUTED.value)
+
+class RollupDelta:
+    """Accumulates per-bucket increments for a batch of trades"""
+
+    def __init__(self):
+        self.buckets: Dict[RollupKey, List[float]] = defaultdict(lambda: [0, 0, 0.0, 0.0, 0.0])
+
+    def __len__(self) -> int:
+        return len(self.buckets)
+
+    def _add(self, dimension: str, key, created_at: datetime, values: Tuple):
+        if key is None or created_at is None:
+            return
+        for resolution, truncate in RESOLUTIONS.items():
+            bucket = self.buckets[(dimension, str(key), resolution, truncate(created_at))]
+            for i, value in enumerate(values):
+                bucket[i] += value
+
+    def add_trade(self, trade):
+        """A ``Trade`` row (model or insert parameters) counts towards its user and token"""
+        values = (1, int(_executed(trade)), _volume(trade), _pnl(trade), _fees(trade))
+        created_at = _field(trade, "created_at")
+        self._add(USER, _field(trade, "user_id"), created_at, values)
+        self._add(TOKEN, _field(trade, "token_symbol"), created_at, values)
+
+    def add_bot_trade(self, bot_trade, trade=None):
+        """A ``BotTrade`` counts towards its bot; volume and fees come from its linked trade"""
+        pnl = _pnl(bot_trade) or (_pnl(trade) if trade is not None else 0.0)
+        values = (
+            1,
+            int(bool(_field(bot_trade, "success"))),
+            _volume(trade) if trade is not None else 0.0,
+            pnl,
+            _fees(trade) if trade is not None else 0.0
+        )
+        self._add(BOT, _field(bot_trade, "bot_id"), _field(bot_trade, "created_at"), values)
+
+    def rows(self) -> List[Dict]:
+        return [
+            {
+                "dimension": dimension,
+                "key": key,
+                "resolution": resolution,
+                "bucket_start": bucket_start,
+                **dict(zip(METRICS, values))
+            }
+            for (dimension, key, resolution, bucket_start), values in self.buckets.items()
+        ]
+
+UPSERT_DIALECTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+def _upsert(dialect: str):
+    table = TradeRollup.__table__
+    statement = UPSERT_DIALECTS[dialect](table)
+    return statement.on_conflict_do_update(
+        index_elements=[column.name for column in table.primary_key],
+        set_={name: table.c[name] + statement.excluded[name] for name in METRICS}
+    )
+
+async def _apply_each(db: AsyncSession, rows: List[Dict]):
+    """Add increments one bucket at a time, for dialects without an upsert: update the
+    bucket, and insert it if the update found no row"""
+    table = TradeRollup.__table__
+    for row in rows:
+        statement = (
+            update(table)
+            .where(*(column == row[column.name] for column in table.primary_key))
+            .values({name: table.c[name] + row[name] for name in METRICS})
+        )
+        result = await db.execute(statement)
+        if not result.rowcount:
+            await db.execute(insert(table).values(row))
+
+async def apply(db: AsyncSession, delta: RollupDelta):
+    """Add a batch's increments to the rollups, inside the caller's transaction"""
+    rows = delta.rows()
+    if not rows:
+        return
+    dialect = db.bind.dialect.name
+    if dialect not in UPSERT_DIALECTS:
+        await _apply_each(db, rows)
+        return
+    for i in range(0, len(rows), UPSERT_CHUNK):
+        await db.execute(_upsert(dialect).values(rows[i:i + UPSERT_CHUNK]))
+
+async def backfill(db: AsyncSession, since: Optional[datetime] = None, chunk_size: int = 5000) -> int:
+    """Rebuild rollups from the raw tables, all of history or from the day of ``since``.
+    Returns the number of raw rows read"""
+    if since is not None:
+        since = RESOLUTIONS["day"](since)
+        await db.execute(delete(TradeRollup).where(TradeRollup.bucket_start >= since))
+    else:
+        await db.execute(delete(TradeRollup))
+
+    rows = 0
+    trades = select(Trade).execution_options(yield_per=chunk_size)
+    bot_trades = (
+        select(BotTrade, Trade)
+        .outerjoin(Trade, BotTrade.trade_id == Trade.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    if since is not None:
+        trades = trades.where(Trade.created_at >= since)
+        bot_trades = bot_trades.where(BotTrade.created_at >= since)
+
+    result = await db.stream(trades)
+    async for partition in result.scalars().partitions():
+        delta = RollupDelta()
+        for trade in partition:
+            delta.add_trade(trade)
+        await apply(db, delta)
+        rows += len(partition)
+
+    result = await db.stream(bot_trades)
+    async for partition in result.partitions():
+        delta = RollupDelta()
+        for bot_trade, trade in partition:
+            delta.add_bot_trade(bot_trade, trade)
+        await apply(db, delta)
+        rows += len(partition)
+
+    return rows
+
+def _summarize(row) -> Dict:
+    summary = {name: getattr(row, name) or 0 for name in METRICS}
+    summary["success_rate"] = (
+        summary["success_count"] / summary["trade_count"] * 100 if summary["trade_count"] else 0.0
+    )
+    return summary
+
+async def series(
+    db: AsyncSession,
+    dimension: str,
+    key: str,
+    resolution: str,
+    start: datetime,
+    end: datetime
+) -> List[Dict]:
+    """Buckets for one key between ``start`` and ``end``"""
+    result = await db.execute(
+        select(TradeRollup)
+        .where(
+            TradeRollup.dimension == dimension,
+            TradeRollup.key == key,
+            TradeRollup.resolution == resolution,
+            TradeRollup.bucket_start >= RESOLUTIONS[resolution](start),
+            TradeRollup.bucket_start < end
+        )
+        .order_by(TradeRollup.bucket_start)
+    )
+    return [
+        {"bucket_start": row.bucket_start, **_summarize(row)}
+        for row in result.scalars()
+    ]
+
+async def ranking(
+    db: AsyncSession,
+    dimension: str,
+    resolution: str,
+    start: datetime,
+    end: datetime,
+    order_by: str = "volume",
+    limit: int = 20
+) -> List[Dict]:
+    """Keys of one dimension ranked by a metric summed over ``start`` .. ``end``"""
+    totals = [func.sum(getattr(TradeRollup, name)).label(name) for name in METRICS]
+    result = await db.execute(
+        select(TradeRollup.key, *totals)
+        .where(
+            TradeRollup.dimension == dimension,
+            TradeRollup.resolution == resolution,
+            TradeRollup.bucket_start >= RESOLUTIONS[resolution](start),
+            TradeRollup.bucket_start < end
+        )
+        .group_by(TradeRollup.key)
+        .order_by(desc(order_by))
+        .limit(limit)
+    )
+    return [{"key": row.key, **_summarize(row)} for row in result]
+
+def totals(buckets: Iterable[Dict]) -> Dict:
+    summary = {name: 0 for name in METRICS}
+    for bucket in buckets:
+        for name in METRICS:
+            summary[name] += bucket[name]
+    summary["success_rate"] = (
+        summary["success_count"] / summary["trade_count"] * 100 if summary["trade_count"] else 0.0
+    )
+    return summary
+
+async def _main():
+    from ..database import close_db, init_db, session_scope
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser("backfill", help="rebuild rollups from the raw trade tables")
+    rebuild.add_argument("--since", type=datetime.fromisoformat, help="only rebuild from this day on")
+    args = parser.parse_args()
+
+    await init_db()
+    try:
+        async with session_scope() as db:
+            rows = await backfill(db, since=args.since)
+        logger.info(f"Rebuilt rollups from {rows} rows")
+    finally:
+        await close_db()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
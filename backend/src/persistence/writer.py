@@ -0,0 +1,299 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import DBAPIError, DisconnectionError, InterfaceError, OperationalError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from ..config import settings
+from ..database import session_scope
+from ..models.trade import BotTrade, Trade, TradeStatus
+from ..utils.metrics import Histogram
+from . import rollups
+from .journal import Journal
+
+logger = logging.getLogger(__name__)
+
+TRADE = "trade"
+BOT_TRADE = "bot_trade"
+
+_DATETIME_FIELDS = ("created_at", "updated_at")
+
+def _row(data: Dict) -> Dict:
+    """A journaled record as insert parameters"""
+    row = dict(data)
+    for field in _DATETIME_FIELDS:
+        if isinstance(row.get(field), str):
+            row[field] = datetime.fromisoformat(row[field])
+    if isinstance(row.get("status"), str):
+        row["status"] = TradeStatus(row["status"])
+    return row
+
+def _transient(error: Exception) -> bool:
+    """Whether a failed write may succeed if retried as is (database unreachable, journal
+    not synced), as opposed to the database rejecting a row"""
+    if isinstance(error, DBAPIError) and error.connection_invalidated:
+        return True
+    return isinstance(error, (OperationalError, InterfaceError, DisconnectionError, OSError, asyncio.TimeoutError))
+
+class TradeWriter:
+    """Write-behind persistence for ``Trade`` and ``BotTrade`` rows.
+
+    ``submit_trade`` / ``submit_bot_trade`` append the row to a local
+    journal and an in-memory queue and return immediately; nothing on the
+    calling path waits for the database. A background task flushes the
+    queue in bulk inserts once ``batch_size`` rows are pending or
+    ``flush_interval`` seconds have passed, then checkpoints the journal.
+    Rows still in the journal at startup are replayed before new ones.
+
+    A bot trade can reference its trade by ``trade_tx_hash``; ``trade_id``
+    is resolved at flush time, after the trades in the same batch are
+    inserted. Trades are deduplicated on ``tx_hash``, so replaying a batch
+    that was committed just before a crash does not duplicate them; bot
+    trades from such a batch can be written twice. Each batch also updates
+    the trade rollups (``persistence.rollups``) in the same transaction.
+
+    A batch the database rejects is retried one row per transaction and the
+    rows that still fail are dead-lettered (``Journal.dead_letter``), so a
+    bad row never holds back the ones behind it. Connection errors are
+    retried as they are.
+
+    Past ``high_water`` pending rows the writer reports itself
+    ``saturated`` so producers can shed load before memory grows unbounded.
+    """
+
+    def __init__(
+        self,
+        journal_path: str,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        high_water: int = 50_000,
+        compact_bytes: int = 64 * 1024 * 1024,
+        retry_delay: float = 1.0
+    ):
+        self.journal = Journal(journal_path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.high_water = high_water
+        self.compact_bytes = compact_bytes
+        self.retry_delay = retry_delay
+        self._pending: Deque[Dict] = deque()
+        self._enqueued_at: Deque[float] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+        self.flush_latency = Histogram()
+        self.stats = {
+            "submitted": 0,
+            "replayed": 0,
+            "written": 0,
+            "batches": 0,
+            "failures": 0,
+            "dead_lettered": 0,
+            "saturated": 0,
+            "max_depth": 0
+        }
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    @property
+    def saturated(self) -> bool:
+        return len(self._pending) >= self.high_water
+
+    async def start(self):
+        """Replay the journal and start flushing"""
+        if self._running:
+            return
+        for record in self.journal.replay():
+            self._pending.append(record)
+            self._enqueued_at.append(time.monotonic())
+            self.stats["replayed"] += 1
+        if self.stats["replayed"]:
+            logger.info(f"Replaying {self.stats['replayed']} journaled rows")
+        self.journal.open()
+        self._wakeup = asyncio.Event()
+        self._running = True
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Flush whatever is pending and stop"""
+        if not self._running:
+            return
+        self._running = False
+        self._wakeup.set()
+        await self._task
+        self.journal.close()
+
+    def submit_trade(self, trade: Dict) -> bool:
+        """Queue a trade row; returns False when the writer is saturated"""
+        return self._submit(TRADE, trade)
+
+    def submit_trades(self, trades: List[Dict]) -> bool:
+        """Queue many trade rows with one journal write; returns False when the
+        writer is saturated"""
+        now = datetime.utcnow()
+        records = self.journal.append_many(TRADE, [{"created_at": now, "updated_at": now, **trade} for trade in trades])
+        self._pending.extend(records)
+        self._enqueued_at.extend([time.monotonic()] * len(records))
+        self.stats["submitted"] += len(records)
+        return self._queued()
+
+    def submit_bot_trade(self, bot_trade: Dict, trade_tx_hash: Optional[str] = None) -> bool:
+        """Queue a bot trade row, optionally linked to a queued trade by its tx hash"""
+        if trade_tx_hash is not None:
+            bot_trade = {**bot_trade, "trade_tx_hash": trade_tx_hash}
+        return self._submit(BOT_TRADE, bot_trade)
+
+    def _submit(self, kind: str, data: Dict) -> bool:
+        now = datetime.utcnow()
+        data = {"created_at": now, "updated_at": now, **data}
+        self._pending.append(self.journal.append(kind, data))
+        self._enqueued_at.append(time.monotonic())
+        self.stats["submitted"] += 1
+        return self._queued()
+
+    def _queued(self) -> bool:
+        depth = len(self._pending)
+        if depth > self.stats["max_depth"]:
+            self.stats["max_depth"] = depth
+        if depth >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+        if depth >= self.high_water:
+            self.stats["saturated"] += 1
+            return False
+        return True
+
+    async def _flush_loop(self):
+        loop = asyncio.get_running_loop()
+        while self._running or self._pending:
+            if self._running and len(self._pending) < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+            if not self._pending:
+                continue
+
+            batch = [self._pending[i] for i in range(min(self.batch_size, len(self._pending)))]
+            dead = 0
+            try:
+                await loop.run_in_executor(None, self.journal.sync)
+                started = time.perf_counter()
+                await self._write(batch)
+                self.flush_latency.observe(time.perf_counter() - started)
+                done = len(batch)
+            except Exception as e:
+                self.stats["failures"] += 1
+                if _transient(e):
+                    logger.error(f"Failed to flush {len(batch)} rows, retrying: {e}")
+                    done = 0
+                else:
+                    # Some row was rejected; one bad row must not hold back every later write
+                    logger.error(f"Failed to flush {len(batch)} rows, writing them one at a time: {e}")
+                    done, dead = await self._write_each(batch)
+
+            if done:
+                for _ in range(done):
+                    self._pending.popleft()
+                    self._enqueued_at.popleft()
+                await loop.run_in_executor(None, self.journal.commit, batch[done - 1]["seq"])
+                self.stats["written"] += done - dead
+                self.stats["batches"] += 1
+                # Compaction swaps the file appends go to, so it stays on the loop; at
+                # compact_bytes it runs rarely, and rewrites only what is still pending
+                if self.journal.size >= self.compact_bytes:
+                    self.journal.compact(list(self._pending))
+
+            if done < len(batch):
+                if not self._running:
+                    # Shutting down: leave the rest in the journal for the next start
+                    return
+                await asyncio.sleep(self.retry_delay)
+
+    async def _write_each(self, batch: List[Dict]) -> Tuple[int, int]:
+        """Write a failed batch one record per transaction; records the database rejects
+        are dead-lettered. Stops at the first transient error. Returns how many leading
+        records were dealt with and how many of them were dead-lettered"""
+        dead = 0
+        for index, record in enumerate(batch):
+            try:
+                await self._write([record])
+            except Exception as e:
+                if _transient(e):
+                    logger.error(f"Failed to write journal record {record['seq']}, retrying: {e}")
+                    return index, dead
+                logger.error(f"Dead-lettering journal record {record['seq']} ({record['kind']}): {e}")
+                self.journal.dead_letter(record, str(e))
+                self.stats["dead_lettered"] += 1
+                dead += 1
+        return len(batch), dead
+
+    async def _write(self, batch: List[Dict]):
+        """Insert one batch in a single transaction"""
+        trades = [_row(record["data"]) for record in batch if record["kind"] == TRADE]
+        bot_trades = [_row(record["data"]) for record in batch if record["kind"] == BOT_TRADE]
+
+        async with session_scope() as db:
+            if trades:
+                # Rows replayed after a crash may already be in the table
+                hashes = [row["tx_hash"] for row in trades if row.get("tx_hash")]
+                if hashes:
+                    result = await db.execute(select(Trade.tx_hash).where(Trade.tx_hash.in_(hashes)))
+                    written = set(result.scalars())
+                    trades = [row for row in trades if row.get("tx_hash") not in written]
+            if trades:
+                await db.execute(self._insert_trades(db.bind.dialect.name), trades)
+
+            links = {row["trade_tx_hash"] for row in bot_trades if row.get("trade_tx_hash")}
+            linked: Dict[str, Trade] = {}
+            if links:
+                result = await db.execute(select(Trade).where(Trade.tx_hash.in_(links)))
+                linked = {trade.tx_hash: trade for trade in result.scalars()}
+
+            delta = rollups.RollupDelta()
+            for row in trades:
+                delta.add_trade(row)
+            for row in bot_trades:
+                trade = linked.get(row.pop("trade_tx_hash", None))
+                if trade is not None:
+                    row["trade_id"] = trade.id
+                delta.add_bot_trade(row, trade)
+
+            if bot_trades:
+                await db.execute(insert(BotTrade), bot_trades)
+            # Aggregates commit together with the raw rows they summarize
+            await rollups.apply(db, delta)
+
+    @staticmethod
+    def _insert_trades(dialect: str):
+        """Bulk trade insert that skips tx hashes already written"""
+        if dialect == "postgresql":
+            return pg_insert(Trade).on_conflict_do_nothing(index_elements=["tx_hash"])
+        if dialect == "sqlite":
+            return sqlite_insert(Trade).on_conflict_do_nothing(index_elements=["tx_hash"])
+        return insert(Trade)
+
+    def get_metrics(self) -> Dict:
+        oldest = self._enqueued_at[0] if self._enqueued_at else None
+        return {
+            **self.stats,
+            "depth": len(self._pending),
+            "saturated_now": self.saturated,
+            "oldest_pending_ms": (time.monotonic() - oldest) * 1000 if oldest is not None else 0.0,
+            "journal_bytes": self.journal.size,
+            "flush_latency": self.flush_latency.as_dict()
+        }
+
+writer = TradeWriter(
+    getattr(settings, "TRADE_JOURNAL_PATH", "data/trade_journal.jsonl"),
+    batch_size=getattr(settings, "TRADE_WRITE_BATCH_SIZE", 500),
+    flush_interval=getattr(settings, "TRADE_WRITE_FLUSH_INTERVAL", 0.5)
+)
@@ -0,0 +1,98 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import List, Optional
+from pydantic import BaseModel
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_db
+from ..persistence import rollups
+import logging
+
+router = APIRouter(prefix="/api/v1/analytics", tags=["Analytics"])
+logger = logging.getLogger(__name__)
+
+# Widest range each resolution may be queried over, so a response stays a few thousand buckets
+MAX_RANGE = {
+    "minute": timedelta(days=2),
+    "hour": timedelta(days=90),
+    "day": timedelta(days=3650)
+}
+
+class RollupMetrics(BaseModel):
+    trade_count: int
+    success_count: int
+    success_rate: float
+    volume: float
+    pnl: float
+    fees: float
+
+class RollupBucket(RollupMetrics):
+    bucket_start: datetime
+
+class RollupSeries(BaseModel):
+    dimension: str
+    key: str
+    resolution: str
+    start: datetime
+    end: datetime
+    totals: RollupMetrics
+    buckets: List[RollupBucket]
+
+class RankedKey(RollupMetrics):
+    key: str
+
+def _validate(dimension: str, resolution: str, start: Optional[datetime], end: Optional[datetime]):
+    if dimension not in rollups.DIMENSIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown dimension '{dimension}'")
+    if resolution not in rollups.RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown resolution '{resolution}'")
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=1)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if end - start > MAX_RANGE[resolution]:
+        raise HTTPException(status_code=400, detail=f"Range too wide for {resolution} resolution")
+    return start, end
+
+@router.get("/{dimension}", response_model=List[RankedKey])
+async def get_ranking(
+    dimension: str,
+    resolution: str = "hour",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    order_by: str = Query("volume", pattern="^(trade_count|success_count|volume|pnl|fees)$"),
+    limit: int = Query(20, ge=1, le=200),
+    db: AsyncSession = Depends(get_db)
+):
+    """Users, tokens or bots ranked by a metric over a time range"""
+    start, end = _validate(dimension, resolution, start, end)
+    try:
+        return await rollups.ranking(db, dimension, resolution, start, end, order_by=order_by, limit=limit)
+    except Exception as e:
+        logger.error(f"Failed to rank {dimension}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{dimension}/{key}", response_model=RollupSeries)
+async def get_series(
+    dimension: str,
+    key: str,
+    resolution: str = "hour",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Volume, count, PnL, fees and success rate of one user, token or bot over time"""
+    start, end = _validate(dimension, resolution, start, end)
+    try:
+        buckets = await rollups.series(db, dimension, key, resolution, start, end)
+    except Exception as e:
+        logger.error(f"Failed to get {dimension} rollups for {key}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "dimension": dimension,
+        "key": key,
+        "resolution": resolution,
+        "start": start,
+        "end": end,
+        "totals": rollups.totals(buckets),
+        "buckets": buckets
+    }
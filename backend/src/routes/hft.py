@@ -1,16 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends, WebSocket
+from fastapi import APIRouter, HTTPException, Depends, Query, WebSocket
 from typing import List, Dict, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
-from ..hft.bot import HFTBot
+from ..hft.bot import bot_from_settings
+from ..copytrading.engine import CopyTradingEngine
+from ..engine.client import EngineClient
+from ..engine.ipc import DEFAULT_SOCKET
+from ..websocket.manager import manager
+from ..websocket.server import manager as analysis_manager
+from ..websocket.bot_events import BotEventBroadcaster
 from ..models.trade import BotTrade, Trade
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..database import get_db
+from ..utils.metrics import metrics
+from ..utils.pagination import keyset_page, page_of
 import logging
 
 router = APIRouter(prefix="/api/v1/hft", tags=["HFT Bot"])
 logger = logging.getLogger(__name__)
 
+DB_QUERY_SECONDS = metrics.histogram("http_db_query_seconds", "Database query time per route", labels=("route",))
+
 class BotSettings(BaseModel):
     max_positions: int = 5
     risk_per_trade: float = 1.5
@@ -24,8 +35,28 @@ class BotStatus(BaseModel):
     active_positions: int
     last_update: datetime
 
+class BotTradeOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    bot_id: str
+    trade_id: Optional[int] = None
+    strategy: str
+    trigger_condition: Optional[Dict] = None
+    profit_target: Optional[float] = None
+    stop_loss: Optional[float] = None
+    execution_time: Optional[float] = None
+    success: Optional[bool] = None
+    error: Optional[str] = None
+    meta: Optional[Dict] = None
+    created_at: datetime
+
+class BotTradePage(BaseModel):
+    items: List[BotTradeOut]
+    next_cursor: Optional[str] = None
+
 @router.post("/start")
-async def start_bot(settings: Optional[BotSettings] = None, db: Session = Depends(get_db)):
+async def start_bot(settings: Optional[BotSettings] = None):
     try:
         if settings:
             bot.update_settings(settings.dict())
@@ -45,16 +76,13 @@ async def stop_bot():
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/status", response_model=BotStatus)
-async def get_bot_status(db: Session = Depends(get_db)):
+async def get_bot_status():
     try:
-        total_trades = db.query(BotTrade).count()
-        successful_trades = db.query(BotTrade).filter(BotTrade.success == True).count()
-        success_rate = (successful_trades / total_trades * 100) if total_trades > 0 else 0
-        
+        # Served from the bot's running aggregates; no database round-trip
         return {
             "is_running": bot.is_running,
-            "total_trades": total_trades,
-            "success_rate": success_rate,
+            "total_trades": bot.performance.total_trades,
+            "success_rate": bot.performance.success_rate,
             "active_positions": len(bot.active_positions),
             "last_update": datetime.utcnow()
         }
@@ -62,20 +90,49 @@ async def get_bot_status(db: Session = Depends(get_db)):
         logger.error(f"Failed to get bot status: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/trades")
+@router.get("/stats")
+async def get_bot_stats():
+    return bot.performance.snapshot()
+
+@router.get("/strategies")
+async def get_strategies():
+    """Registered strategies with per-strategy evaluation latency and decision counts"""
+    return bot.strategies.get_metrics()
+
+@router.get("/trades", response_model=BotTradePage)
 async def get_bot_trades(
-    limit: int = 10,
-    offset: int = 0,
-    db: Session = Depends(get_db)
+    limit: int = Query(10, ge=1, le=200),
+    cursor: Optional[str] = None,
+    bot_id: Optional[str] = None,
+    strategy: Optional[str] = None,
+    success: Optional[bool] = None,
+    db: AsyncSession = Depends(get_db)
 ):
+    """Bot trades, newest first. Pass the returned ``next_cursor`` to get the next page;
+    every page is an index range scan on (created_at, id), whatever its depth."""
+    query = select(BotTrade)
+    if bot_id is not None:
+        query = query.where(BotTrade.bot_id == bot_id)
+    if strategy is not None:
+        query = query.where(BotTrade.strategy == strategy)
+    if success is not None:
+        query = query.where(BotTrade.success.is_(success))
+    try:
+        query = keyset_page(query, BotTrade, cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
     try:
-        trades = db.query(BotTrade).order_by(BotTrade.created_at.desc())\
-            .offset(offset).limit(limit).all()
-        return trades
+        with DB_QUERY_SECONDS.labels("/api/v1/hft/trades").time():
+            result = await db.execute(query)
+            trades = result.scalars().all()
     except Exception as e:
         logger.error(f"Failed to get bot trades: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    trades, next_cursor = page_of(trades, limit)
+    return {"items": trades, "next_cursor": next_cursor}
+
 @router.get("/settings")
 async def get_bot_settings():
     return bot.settings
@@ -89,9 +146,19 @@ async def update_bot_settings(settings: BotSettings):
         logger.error(f"Failed to update settings: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-# Initialize bot instance
+# Initialize bot instance. ENGINE_MODE=process: the bot runs in its own process
+# (python -m src.engine.server) and this worker attaches to it over ENGINE_SOCKET
 from ..config import settings
-bot = HFTBot(
-    web3_provider=settings.WEB3_PROVIDER_URL,
-    private_key=settings.HFT_BOT_PRIVATE_KEY
-) 
\ No newline at end of file
+from ..persistence.writer import writer
+ENGINE_MODE = getattr(settings, "ENGINE_MODE", "inprocess")
+if ENGINE_MODE == "process":
+    bot = EngineClient(getattr(settings, "ENGINE_SOCKET", DEFAULT_SOCKET), manager=manager)
+else:
+    bot = bot_from_settings(persistence=writer)
+    # Followers of the bot get its executed trades copied (subscriptions loaded at startup)
+    copier = CopyTradingEngine(persistence=writer, manager=manager, price_source=bot.amm.price)
+    bot.listeners.append(copier.on_bot_event)
+    # Trades, positions and stats reach WebSocket clients as they do from the engine process
+    bot.listeners.append(BotEventBroadcaster(manager).on_bot_event)
+# Mirrored pool prices feed the indicators of the analysis WebSocket
+bot.listeners.append(analysis_manager.on_bot_event) 
\ No newline at end of file
@@ -0,0 +1,288 @@
+import asyncio
+import bisect
+import logging
+import math
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Histogram resolution: 2**SUB_BUCKET_BITS linear sub-buckets per power of two
+# (<= 6.25% relative error), covering ~1ns to ~256s
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+MIN_EXPONENT = -30
+MAX_EXPONENT = 9
+BUCKET_COUNT = (MAX_EXPONENT - MIN_EXPONENT) * SUB_BUCKETS
+# Buffered samples folded into the buckets at a time
+FOLD_EVERY = 4096
+
+# Bucket bounds (seconds) written to /metrics; the fine buckets are folded into these
+EXPORT_BOUNDS = (
+    0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+def _upper_bound(index: int) -> float:
+    exponent, sub_bucket = divmod(index, SUB_BUCKETS)
+    return math.ldexp(0.5 + (sub_bucket + 1) / (2 * SUB_BUCKETS), exponent + MIN_EXPONENT)
+
+_UPPER_BOUNDS = [_upper_bound(index) for index in range(BUCKET_COUNT)]
+
+class Histogram:
+    """HDR-style latency histogram in seconds.
+
+    Buckets are log-linear: each power of two is split into SUB_BUCKETS
+    equal parts, so a sample's bucket comes straight from its float
+    exponent and mantissa. ``observe`` only appends to a buffer; samples
+    are folded into the buckets with numpy every FOLD_EVERY samples and
+    before any read, which keeps the per-sample cost to a list append.
+    Unregistered instances serve per-component latency reports (strategies,
+    execution and mempool stages, price fetches, pool waits, journal
+    flushes, replay), so every latency percentile in the service comes
+    from the same bucket math.
+    """
+
+    __slots__ = ("counts", "_sum", "_count", "_max", "_pending")
+
+    def __init__(self):
+        self.counts = np.zeros(BUCKET_COUNT, dtype=np.int64)
+        self._sum = 0.0
+        self._count = 0
+        self._max = 0.0
+        self._pending: List[float] = []
+
+    def observe(self, seconds: float):
+        pending = self._pending
+        pending.append(seconds)
+        if len(pending) >= FOLD_EVERY:
+            self._fold()
+
+    def _fold(self):
+        if not self._pending:
+            return
+        samples = np.array(self._pending, dtype=np.float64)
+        self._pending.clear()
+        mantissa, exponent = np.frexp(samples)
+        index = (exponent - MIN_EXPONENT) * SUB_BUCKETS + ((mantissa * 2 - 1) * SUB_BUCKETS).astype(np.int64)
+        index[samples <= 0] = 0
+        np.clip(index, 0, BUCKET_COUNT - 1, out=index)
+        self.counts += np.bincount(index, minlength=BUCKET_COUNT)
+        self._sum += float(samples.sum())
+        self._count += samples.size
+        self._max = max(self._max, float(samples.max()))
+
+    def merge(self, other: "Histogram"):
+        """Add another histogram's samples (e.g. one reported by a worker process)"""
+        self._fold()
+        other._fold()
+        self.counts += other.counts
+        self._sum += other._sum
+        self._count += other._count
+        self._max = max(self._max, other._max)
+
+    @property
+    def count(self) -> int:
+        self._fold()
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        self._fold()
+        return self._sum
+
+    @property
+    def max(self) -> float:
+        self._fold()
+        return self._max
+
+    def time(self) -> "Timer":
+        """``with histogram.time(): ...`` observes the block's duration"""
+        return Timer(self)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile (capped at the max seen)"""
+        self._fold()
+        if not self._count:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self.counts), q / 100 * self._count))
+        return min(_UPPER_BOUNDS[min(index, BUCKET_COUNT - 1)], self._max)
+
+    def cumulative(self, bounds: Iterable[float] = EXPORT_BOUNDS) -> List[Tuple[float, int]]:
+        """(bound, samples <= bound) pairs; a fine bucket counts under the first bound
+        at or above its upper edge"""
+        self._fold()
+        totals = np.cumsum(self.counts)
+        result = []
+        for bound in bounds:
+            index = bisect.bisect_right(_UPPER_BOUNDS, bound)
+            result.append((bound, int(totals[index - 1]) if index else 0))
+        return result
+
+    def as_dict(self) -> Dict:
+        count = self.count
+        return {
+            "count": count,
+            "mean_ms": self._sum / count * 1000 if count else 0.0,
+            "max_ms": self._max * 1000,
+            "p50_ms": self.percentile(50) * 1000,
+            "p90_ms": self.percentile(90) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "p999_ms": self.percentile(99.9) * 1000
+        }
+
+class Timer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+
+class Counter:
+    """Monotonic count; Prometheus derives rates from it"""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+class Gauge:
+    """Current value, set directly or read from ``fn`` at scrape time"""
+
+    __slots__ = ("value", "fn")
+
+    def __init__(self, fn: Optional[Callable[[], float]] = None):
+        self.value = 0.0
+        self.fn = fn
+
+    def set(self, value: float):
+        self.value = value
+
+    def get(self) -> float:
+        return self.fn() if self.fn is not None else self.value
+
+Metric = Union[Histogram, Counter, Gauge]
+
+class MetricFamily:
+    """A metric with labels; ``labels(...)`` returns (and caches) one series. Hot paths
+    should look their series up once and keep it"""
+
+    def __init__(self, kind: str, name: str, description: str, labelnames: Tuple[str, ...], factory: Callable[[], Metric]):
+        self.kind = kind
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self._factory = factory
+        self.series: Dict[Tuple[str, ...], Metric] = {}
+
+    def labels(self, *values: str) -> Metric:
+        series = self.series.get(values)
+        if series is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}")
+            series = self.series[values] = self._factory()
+        return series
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class MetricsRegistry:
+    """Named metrics rendered in the Prometheus text format.
+
+    ``histogram``/``counter``/``gauge`` return the existing metric when the
+    name is already registered, so modules can declare their metrics at
+    import time. Without ``labels`` they return the series itself,
+    otherwise a ``MetricFamily``.
+    """
+
+    def __init__(self):
+        self.families: Dict[str, MetricFamily] = {}
+
+    def _register(self, kind: str, name: str, description: str, labels: Iterable[str], factory):
+        family = self.families.get(name)
+        if family is None:
+            family = self.families[name] = MetricFamily(kind, name, description, tuple(labels), factory)
+        elif family.kind != kind:
+            raise ValueError(f"Metric {name} already registered as a {family.kind}")
+        return family if family.labelnames else family.labels()
+
+    def histogram(self, name: str, description: str, labels: Iterable[str] = ()):
+        return self._register("histogram", name, description, labels, Histogram)
+
+    def counter(self, name: str, description: str, labels: Iterable[str] = ()):
+        return self._register("counter", name, description, labels, Counter)
+
+    def gauge(self, name: str, description: str, labels: Iterable[str] = (), fn: Optional[Callable[[], float]] = None):
+        return self._register("gauge", name, description, labels, lambda: Gauge(fn))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in self.families.values():
+            lines.append(f"# HELP {family.name} {family.description}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for values, series in family.series.items():
+                if family.kind == "histogram":
+                    for bound, count in series.cumulative():
+                        le = _labels(family.labelnames, values, f'le="{bound}"')
+                        lines.append(f"{family.name}_bucket{le} {count}")
+                    le = _labels(family.labelnames, values, 'le="+Inf"')
+                    lines.append(f"{family.name}_bucket{le} {series.count}")
+                    lines.append(f"{family.name}_sum{_labels(family.labelnames, values)} {_number(series.sum)}")
+                    lines.append(f"{family.name}_count{_labels(family.labelnames, values)} {series.count}")
+                else:
+                    value = series.value if family.kind == "counter" else series.get()
+                    lines.append(f"{family.name}{_labels(family.labelnames, values)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+class LoopLagMonitor:
+    """Measures event-loop lag: how late a sleep of ``interval`` wakes up"""
+
+    def __init__(self, metrics: MetricsRegistry, interval: float = 0.25):
+        self.interval = interval
+        self.histogram = metrics.histogram("event_loop_lag_seconds", "Event loop scheduling delay")
+        self.last = metrics.gauge("event_loop_lag_last_seconds", "Most recent event loop delay")
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - started - self.interval, 0.0)
+            self.histogram.observe(lag)
+            self.last.set(lag)
+
+# Process-wide registry served at /metrics
+metrics = MetricsRegistry()
@@ -0,0 +1,53 @@
+import asyncio
+import logging
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+class BotEventBroadcaster:
+    """Bot listener that sends the bot's trade, position and stats events to
+    WebSocket clients as ``trade_update``, ``position_update`` and
+    ``bot_status`` messages, the same whether the bot runs in this process
+    or in the engine.
+
+    ``local`` delivers to this worker's connections only, for events every
+    worker receives itself (``EngineClient``); otherwise they go through the
+    broadcast broker. Broadcasts are scheduled, not awaited, and kept
+    referenced until they finish.
+    """
+
+    def __init__(self, manager, local: bool = False):
+        self.manager = manager
+        self.local = local
+        self._tasks = set()
+
+    def on_bot_event(self, event: str, data: Dict):
+        if event == "trade":
+            message = {
+                "type": "trade_update",
+                "data": {
+                    "id": data.get("tx_hash"),
+                    "token_symbol": data["token_symbol"],
+                    "amount": data["amount"],
+                    "price": data["price"],
+                    "type": data["type"],
+                    "status": data["status"]
+                }
+            }
+            self._broadcast(message, channel=f"trades.{data['token_symbol']}")
+        elif event == "position":
+            message = {"type": "position_update", "data": data}
+            self._broadcast(message, channel=f"positions.{data['token']}", coalesce_key=f"position:{data['id']}")
+        elif event == "stats":
+            message = {"type": "bot_status", "data": data}
+            self._broadcast(message, channel="bot_status", coalesce_key="bot_status")
+
+    def _broadcast(self, message: Dict, **options):
+        task = asyncio.ensure_future(self.manager.broadcast(message, local=self.local, **options))
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Future):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Error broadcasting bot event: {task.exception()}")
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import logging
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# A published broadcast: {"message", "channel", "client_id", "coalesce_key"}
+Envelope = Dict
+Deliver = Callable[[Envelope], None]
+
+class Broker:
+    """Carries broadcasts to every worker's ``WebSocketManager``.
+
+    ``publish`` never awaits: envelopes published in the same event-loop
+    tick are collected and sent as one batch when the loop next gets to
+    run callbacks. Every worker, the publisher included, receives each
+    batch and hands the envelopes to ``deliver``, which fans them out to
+    that worker's own connections.
+    """
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+        self._batch: List[Envelope] = []
+        self._scheduled = False
+        self.stats = {"published": 0, "batches": 0, "delivered": 0, "errors": 0}
+
+    def bind(self, deliver: Deliver):
+        self._deliver = deliver
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def publish(self, envelope: Envelope):
+        self._batch.append(envelope)
+        self.stats["published"] += 1
+        if not self._scheduled:
+            self._scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush)
+
+    def _flush(self):
+        batch, self._batch = self._batch, []
+        self._scheduled = False
+        self.stats["batches"] += 1
+        self._send(batch)
+
+    def _send(self, batch: List[Envelope]):
+        raise NotImplementedError
+
+    def _deliver_batch(self, batch: List[Envelope]):
+        for envelope in batch:
+            try:
+                self._deliver(envelope)
+                self.stats["delivered"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Error delivering broadcast: {e}")
+
+    def get_metrics(self) -> Dict:
+        return {"backend": type(self).__name__, **self.stats, "pending": len(self._batch)}
+
+class InProcessBroker(Broker):
+    """Single-process broker: a batch is delivered straight back to the local manager"""
+
+    def _send(self, batch: List[Envelope]):
+        self._deliver_batch(batch)
+
+class RedisBroker(Broker):
+    """Redis pub/sub broker: one PUBLISH per batch, every worker subscribed to the same channel"""
+
+    def __init__(self, url: str, channel: str = "dexlink:ws"):
+        super().__init__()
+        self.url = url
+        self.channel = channel
+        self._redis = None
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._publishes: set = set()
+
+    async def start(self):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(self.url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self.channel)
+        self._listener = asyncio.create_task(self._listen())
+        logger.info(f"WebSocket broker subscribed to {self.channel} on {self.url}")
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+        if self._publishes:
+            await asyncio.gather(*self._publishes, return_exceptions=True)
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(self.channel)
+            await self._pubsub.close()
+        if self._redis is not None:
+            await self._redis.close()
+
+    def _send(self, batch: List[Envelope]):
+        if self._redis is None:
+            self.stats["errors"] += len(batch)
+            logger.error(f"WebSocket broker not started, dropping {len(batch)} broadcasts")
+            return
+        payload = json.dumps(batch, separators=(",", ":"), ensure_ascii=False, default=str)
+        task = asyncio.ensure_future(self._redis.publish(self.channel, payload))
+        self._publishes.add(task)
+        task.add_done_callback(self._published)
+
+    def _published(self, task: asyncio.Future):
+        self._publishes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.stats["errors"] += 1
+            logger.error(f"Error publishing broadcasts: {task.exception()}")
+
+    async def _listen(self):
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message.get("type") == "message":
+                        self._deliver_batch(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"WebSocket broker listener error: {e}")
+                await asyncio.sleep(1)
+
+def create_broker(backend: str = "memory", url: Optional[str] = None) -> Broker:
+    """Broker by name: ``memory`` (single process) or ``redis``"""
+    if backend == "memory":
+        return InProcessBroker()
+    if backend == "redis":
+        if not url:
+            raise ValueError("The redis WebSocket broker needs REDIS_URL")
+        return RedisBroker(url)
+    raise ValueError(f"Unknown WebSocket broker '{backend}'")
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from .codec import EncodedMessage, encode
+from .connection import ClientConnection
+
+logger = logging.getLogger(__name__)
+
+class CoalescedStream:
+    """Updates on one channel root (e.g. ``positions``), sent at most once per ``interval``.
+
+    Between flushes only the latest message per key is kept for each
+    connection. A flush sends each connection one frame: the pending
+    messages' ``data`` batched under ``batch_type`` (each item keeping its
+    message's ``timestamp``, the frame's own being the flush time), or,
+    without a batch type, the latest message itself for each key.
+    """
+
+    def __init__(self, name: str, interval: float, batch_type: Optional[str] = None):
+        self.name = name
+        self.interval = interval
+        self.batch_type = batch_type
+        self.pending: Dict[ClientConnection, "OrderedDict[str, dict]"] = {}
+        self.scheduled = False
+        self.updates = 0
+        self.frames = 0
+
+    def get_metrics(self) -> Dict:
+        return {
+            "interval_ms": self.interval * 1000,
+            "updates": self.updates,
+            "frames": self.frames,
+            "coalescing_ratio": self.updates / self.frames if self.frames else 0.0,
+            "pending_connections": len(self.pending)
+        }
+
+def _batch_item(message: dict):
+    data = message.get("data")
+    if isinstance(data, dict) and "timestamp" in message:
+        return {**data, "timestamp": message["timestamp"]}
+    return data
+
+class UpdateCoalescer:
+    """Per-connection, per-key coalescing for high-rate channels.
+
+    Outbound frames, and the encoding work behind them, scale with the
+    flush rate of each stream instead of the rate updates arrive at.
+    """
+
+    def __init__(self, streams: Dict[str, CoalescedStream]):
+        self.streams = streams
+
+    def stream_for(self, channel: Optional[str]) -> Optional[CoalescedStream]:
+        if not channel:
+            return None
+        return self.streams.get(channel.split(".", 1)[0])
+
+    def add(self, stream: CoalescedStream, connection: ClientConnection, key: str, message: dict):
+        """Queue the latest ``message`` for ``key``, replacing any pending one"""
+        pending = stream.pending.get(connection)
+        if pending is None:
+            pending = stream.pending[connection] = OrderedDict()
+        pending[key] = message
+        pending.move_to_end(key)
+        stream.updates += 1
+        if not stream.scheduled:
+            stream.scheduled = True
+            asyncio.get_running_loop().call_later(stream.interval, self._flush, stream)
+
+    def discard(self, connection: ClientConnection):
+        for stream in self.streams.values():
+            stream.pending.pop(connection, None)
+
+    def _flush(self, stream: CoalescedStream):
+        pending, stream.pending = stream.pending, {}
+        stream.scheduled = False
+        timestamp = time.time()
+        # Unbatched messages are shared between connections: encode each once per encoding
+        encoded: Dict[int, EncodedMessage] = {}
+        for connection, messages in pending.items():
+            if connection.closed:
+                continue
+            try:
+                if stream.batch_type:
+                    batch = {
+                        "type": stream.batch_type,
+                        "data": [_batch_item(message) for message in messages.values()],
+                        "timestamp": timestamp
+                    }
+                    connection.enqueue(encode(batch, connection.encoding))
+                    stream.frames += 1
+                    continue
+                for key, message in messages.items():
+                    shared = encoded.get(id(message))
+                    if shared is None:
+                        shared = encoded[id(message)] = EncodedMessage(message)
+                    connection.enqueue(shared.frame(connection.encoding), key)
+                    stream.frames += 1
+            except Exception as e:
+                logger.error(f"Error flushing {stream.name} updates: {e}")
+
+    def get_metrics(self) -> Dict:
+        return {name: stream.get_metrics() for name, stream in self.streams.items()}
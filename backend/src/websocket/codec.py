@@ -0,0 +1,88 @@
+import enum
+import json
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, Optional, Union
+
+import msgpack
+
+Frame = Union[str, bytes]
+
+class Encoding(str, enum.Enum):
+    """Wire encodings a connection can negotiate; JSON frames are text, the rest binary"""
+    JSON = "json"
+    MSGPACK = "msgpack"
+
+def negotiate(value: Optional[str]) -> Encoding:
+    """The encoding a client asked for (query parameter or message); JSON when unspecified.
+    Raises ValueError for unknown encodings"""
+    return Encoding(value.lower()) if value else Encoding.JSON
+
+def _epoch_ms(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+def _msgpack_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return _epoch_ms(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+def _wire_timestamp(timestamp: float, encoding: Encoding):
+    if encoding == Encoding.MSGPACK:
+        return int(timestamp * 1000)
+    return datetime.utcfromtimestamp(timestamp).isoformat()
+
+def encode(message: dict, encoding: Encoding) -> Frame:
+    """Serialize a message. A float ``timestamp`` (epoch seconds, as stamped by the
+    managers) goes out as an ISO string in JSON and as integer epoch milliseconds
+    in MessagePack; so do those of the items of a batch (a ``data`` list)"""
+    timestamp = message.get("timestamp")
+    if isinstance(timestamp, float):
+        message = {**message, "timestamp": _wire_timestamp(timestamp, encoding)}
+    data = message.get("data")
+    if isinstance(data, list) and any(isinstance(item, dict) and isinstance(item.get("timestamp"), float) for item in data):
+        message = {**message, "data": [
+            {**item, "timestamp": _wire_timestamp(item["timestamp"], encoding)}
+            if isinstance(item, dict) and isinstance(item.get("timestamp"), float) else item
+            for item in data
+        ]}
+    if encoding == Encoding.MSGPACK:
+        return msgpack.packb(message, default=_msgpack_default, use_bin_type=True)
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False, default=_json_default)
+
+class EncodedMessage:
+    """A message with its frames cached per encoding, so a broadcast is
+    serialized at most once for each encoding its recipients use"""
+
+    __slots__ = ("message", "_frames", "encode_seconds")
+
+    def __init__(self, message: dict):
+        self.message = message
+        self._frames: Dict[Encoding, Frame] = {}
+        self.encode_seconds = 0.0
+
+    def frame(self, encoding: Encoding = Encoding.JSON) -> Frame:
+        frame = self._frames.get(encoding)
+        if frame is None:
+            started = time.perf_counter()
+            frame = self._frames[encoding] = encode(self.message, encoding)
+            self.encode_seconds += time.perf_counter() - started
+        return frame
+
+    def frame_bytes(self) -> Dict[str, int]:
+        return {encoding.value: len(frame) for encoding, frame in self._frames.items()}
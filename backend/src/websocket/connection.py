@@ -0,0 +1,151 @@
+import asyncio
+import enum
+import itertools
+import logging
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+from fastapi import WebSocket
+from .codec import Encoding, Frame
+
+logger = logging.getLogger(__name__)
+
+class OverflowPolicy(str, enum.Enum):
+    DROP_OLDEST = "drop_oldest"
+    COALESCE = "coalesce"
+    DISCONNECT = "disconnect"
+
+class ClientConnection:
+    """A WebSocket with a bounded outbound queue drained by its own writer task.
+
+    Producers only call ``enqueue``; a slow client therefore only ever delays
+    itself. When the queue is full the overflow policy decides what happens:
+
+    - ``drop_oldest``: the oldest queued frame is discarded
+    - ``coalesce``: a frame whose coalesce key is already queued replaces the
+      queued frame in place, so only the latest state per key is pending;
+      otherwise the oldest frame is discarded
+    - ``disconnect``: the client is closed and removed
+    """
+
+    _sequence = itertools.count()
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        client_id: str,
+        connection_id: str,
+        max_queue_size: int = 256,
+        overflow_policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        on_close: Optional[Callable[["ClientConnection"], None]] = None,
+        encoding: Encoding = Encoding.JSON
+    ):
+        self.websocket = websocket
+        self.client_id = client_id
+        self.connection_id = connection_id
+        self.max_queue_size = max_queue_size
+        self.overflow_policy = OverflowPolicy(overflow_policy)
+        # Wire encoding negotiated by the client; producers pick the matching frame
+        self.encoding = Encoding(encoding)
+        self._on_close = on_close
+        self._pending: "OrderedDict[object, Frame]" = OrderedDict()
+        self._ready = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    def start(self):
+        """Start the writer task"""
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write_loop())
+
+    def enqueue(self, frame: Frame, coalesce_key: Optional[str] = None) -> bool:
+        """Queue a frame for sending; never blocks. Returns False if the frame was not queued"""
+        if self.closed:
+            return False
+
+        if (self.overflow_policy == OverflowPolicy.COALESCE
+                and coalesce_key is not None and coalesce_key in self._pending):
+            self._pending[coalesce_key] = frame
+            self.coalesced += 1
+            return True
+
+        if len(self._pending) >= self.max_queue_size:
+            if self.overflow_policy == OverflowPolicy.DISCONNECT:
+                logger.warning(
+                    f"Disconnecting slow client {self.client_id} "
+                    f"({self.connection_id}): send queue full"
+                )
+                self.dropped += 1
+                self.close(code=1013)
+                return False
+            self._pending.popitem(last=False)
+            self.dropped += 1
+
+        key = coalesce_key if coalesce_key is not None and coalesce_key not in self._pending \
+            else next(self._sequence)
+        self._pending[key] = frame
+        if len(self._pending) > self.max_depth:
+            self.max_depth = len(self._pending)
+        self._ready.set()
+        return True
+
+    async def _write_loop(self):
+        """Drain the queue to the socket in order"""
+        try:
+            while not self.closed:
+                if not self._pending:
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+                _, frame = self._pending.popitem(last=False)
+                if isinstance(frame, bytes):
+                    await self.websocket.send_bytes(frame)
+                else:
+                    await self.websocket.send_text(frame)
+                self.sent += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Error sending to client {self.client_id}: {e}")
+            self.close()
+
+    def close(self, code: int = 1000):
+        """Stop the writer, close the socket and notify the owner"""
+        if self.closed:
+            return
+        self.closed = True
+        self._pending.clear()
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        asyncio.ensure_future(self._close_socket(code))
+        if self._on_close is not None:
+            self._on_close(self)
+
+    async def _close_socket(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            # Socket already gone
+            pass
+
+    def get_stats(self) -> Dict:
+        """Per-connection queue statistics"""
+        return {
+            "client_id": self.client_id,
+            "connection_id": self.connection_id,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_depth,
+            "max_queue_size": self.max_queue_size,
+            "overflow_policy": self.overflow_policy.value,
+            "encoding": self.encoding.value,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced
+        }
@@ -3,19 +3,77 @@ from typing import Dict, List, Optional, Set
 import json
 import logging
 import asyncio
+import time
 from datetime import datetime
 from ..models.trade import Trade, Position, BotTrade
 from ..database import get_db
+from ..config import settings
+from .codec import EncodedMessage, Encoding
+from .broker import Broker, Envelope, InProcessBroker, create_broker
+from .coalescer import CoalescedStream, UpdateCoalescer
+from .connection import ClientConnection, OverflowPolicy
+from .registry import SubscriptionRegistry
+from ..utils.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+FANOUT_SECONDS = metrics.histogram("ws_fanout_seconds", "Broadcast encode and enqueue time across recipients")
+MESSAGES = metrics.counter("ws_messages_total", "Broadcasts delivered by this worker, by channel root", labels=("channel",))
+FRAMES = metrics.counter("ws_frames_total", "Frames queued to connections, by channel root", labels=("channel",))
+
+# Channel roots whose updates are coalesced per connection and key, and the
+# frame type their batches are sent as (None: latest message per key as is)
+COALESCED_CHANNELS = {
+    "positions": "position_updates",
+    "bot_status": None
+}
+
+def coalesced_streams(window: float, rate_caps: Dict[str, float]) -> Dict[str, CoalescedStream]:
+    """Streams flushed every ``window`` seconds, or less often where a channel's
+    rate cap (frames per second per connection) requires it"""
+    return {
+        name: CoalescedStream(
+            name,
+            max(window, 1 / rate_caps[name]) if rate_caps.get(name) else window,
+            batch_type
+        )
+        for name, batch_type in COALESCED_CHANNELS.items()
+    }
+
 class WebSocketManager:
-    def __init__(self):
-        self.active_connections: Dict[str, Dict[str, WebSocket]] = {}
+    def __init__(
+        self,
+        max_queue_size: int = 256,
+        overflow_policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        broker: Optional[Broker] = None,
+        coalesce_window: float = 0.1,
+        rate_caps: Optional[Dict[str, float]] = None
+    ):
+        self.active_connections: Dict[str, Dict[str, ClientConnection]] = {}
         self.subscriptions: Dict[str, Set[str]] = {}
+        self.registry = SubscriptionRegistry()
         self._lock = asyncio.Lock()
+        self.fanout_stats: Dict = {}
+        self.max_queue_size = max_queue_size
+        self.overflow_policy = OverflowPolicy(overflow_policy)
+        # Broadcasts go through the broker so every worker fans out to its own connections
+        self.broker = broker or InProcessBroker()
+        self.broker.bind(self._deliver)
+        self.coalescer = UpdateCoalescer(coalesced_streams(coalesce_window, rate_caps or {}))
+
+    async def start(self):
+        await self.broker.start()
+
+    async def stop(self):
+        await self.broker.stop()
         
-    async def connect(self, websocket: WebSocket, client_id: str, channels: List[str] = None):
+    async def connect(
+        self,
+        websocket: WebSocket,
+        client_id: str,
+        channels: List[str] = None,
+        encoding: Encoding = Encoding.JSON
+    ):
         """Connect a client and subscribe to specified channels"""
         try:
             await websocket.accept()
@@ -26,11 +84,22 @@ class WebSocketManager:
                 
                 # Generate unique connection ID
                 connection_id = f"{client_id}_{datetime.utcnow().timestamp()}"
-                self.active_connections[client_id][connection_id] = websocket
+                connection = ClientConnection(
+                    websocket,
+                    client_id,
+                    connection_id,
+                    max_queue_size=self.max_queue_size,
+                    overflow_policy=self.overflow_policy,
+                    on_close=self._on_connection_closed,
+                    encoding=encoding
+                )
+                self.active_connections[client_id][connection_id] = connection
+                connection.start()
                 
-                # Subscribe to channels
+                # Subscribe to channels; a new connection inherits the client's subscriptions
                 if channels:
                     self.subscriptions[client_id].update(channels)
+                self.registry.add(connection, self.subscriptions[client_id])
                     
             logger.info(f"Client {client_id} connected. Connection ID: {connection_id}")
             return connection_id
@@ -42,59 +111,158 @@ class WebSocketManager:
     async def disconnect(self, client_id: str, connection_id: str):
         """Disconnect a client connection"""
         try:
+            connection = None
             async with self._lock:
                 if client_id in self.active_connections:
-                    if connection_id in self.active_connections[client_id]:
-                        del self.active_connections[client_id][connection_id]
-                        
+                    connection = self.active_connections[client_id].pop(connection_id, None)
+                    if connection is not None:
+                        self.registry.discard(connection)
+                        self.coalescer.discard(connection)
+
                     if not self.active_connections[client_id]:
                         del self.active_connections[client_id]
                         del self.subscriptions[client_id]
-                        
+
+            if connection is not None:
+                connection.close()
+
             logger.info(f"Client {client_id} disconnected. Connection ID: {connection_id}")
             
         except Exception as e:
             logger.error(f"Error disconnecting client {client_id}: {e}")
             
-    async def broadcast(self, message: dict, channel: str = None, client_id: Optional[str] = None):
-        """Broadcast message to subscribed clients"""
+    async def broadcast(
+        self,
+        message: dict,
+        channel: str = None,
+        client_id: Optional[str] = None,
+        coalesce_key: Optional[str] = None,
+        local: bool = False
+    ):
+        """Broadcast message to subscribed clients on every worker.
+
+        The message is published to the broker once; each worker's manager
+        then delivers it to its own connections. Frames sharing a
+        ``coalesce_key`` may replace each other in a slow client's queue
+        when the coalesce overflow policy is active. ``local`` skips the
+        broker and delivers to this worker's connections only, for messages
+        every worker receives by itself (trading engine events).
+        """
         try:
-            message["timestamp"] = datetime.utcnow().isoformat()
-            
-            async with self._lock:
-                if client_id:
-                    # Send to specific client
-                    if client_id in self.active_connections:
-                        if not channel or channel in self.subscriptions[client_id]:
-                            for connection in self.active_connections[client_id].values():
-                                try:
-                                    await connection.send_json(message)
-                                except Exception as e:
-                                    logger.error(f"Error sending to client {client_id}: {e}")
-                else:
-                    # Broadcast to all subscribed clients
-                    for cid, channels in self.subscriptions.items():
-                        if not channel or channel in channels:
-                            for connection in self.active_connections[cid].values():
-                                try:
-                                    await connection.send_json(message)
-                                except Exception as e:
-                                    logger.error(f"Error broadcasting to client {cid}: {e}")
-                                    
+            # Epoch seconds; each wire encoding renders it once when the message is encoded
+            message["timestamp"] = time.time()
+            envelope = {
+                "message": message,
+                "channel": channel,
+                "client_id": client_id,
+                "coalesce_key": coalesce_key
+            }
+            if local:
+                self._deliver(envelope)
+            else:
+                self.broker.publish(envelope)
         except Exception as e:
             logger.error(f"Error broadcasting message: {e}")
-            
+
+    def _deliver(self, envelope: Envelope):
+        """Fan a published broadcast out to this worker's connections.
+
+        Runs synchronously from the broker; connection state is only ever
+        changed under the lock without awaiting, so it is consistent here.
+        """
+        channel = envelope.get("channel")
+        recipients = self._get_recipients(channel, envelope.get("client_id"))
+        if not recipients:
+            return
+        # Channel roots keep label cardinality bounded
+        root = channel.split(".", 1)[0] if channel else "direct"
+        MESSAGES.labels(root).inc()
+        FRAMES.labels(root).inc(len(recipients))
+
+        # High-rate channels: keep the latest update per key, flushed on the stream's interval
+        coalesce_key = envelope.get("coalesce_key")
+        stream = self.coalescer.stream_for(channel) if coalesce_key else None
+        if stream is not None:
+            for connection in recipients:
+                self.coalescer.add(stream, connection, coalesce_key, envelope["message"])
+            return
+
+        # Serialize once per encoding in use, hand the same frame to every connection's queue
+        started = time.perf_counter()
+        encoded = EncodedMessage(envelope["message"])
+        dropped = 0
+        for connection in recipients:
+            if not connection.enqueue(encoded.frame(connection.encoding), coalesce_key):
+                dropped += 1
+        finished = time.perf_counter()
+        FANOUT_SECONDS.observe(finished - started)
+
+        self.fanout_stats = {
+            "channel": channel,
+            "recipients": len(recipients),
+            "dropped": dropped,
+            "frame_bytes": encoded.frame_bytes(),
+            "encode_ms": encoded.encode_seconds * 1000,
+            "enqueue_ms": (finished - started - encoded.encode_seconds) * 1000,
+            "total_ms": (finished - started) * 1000
+        }
+        logger.debug(f"Broadcast fan-out: {self.fanout_stats}")
+
+    def _get_recipients(self, channel: Optional[str], client_id: Optional[str]) -> List[ClientConnection]:
+        """Collect this worker's connections a message goes to"""
+        if client_id:
+            connections = self.active_connections.get(client_id, {}).values()
+            if not channel:
+                return list(connections)
+            return [c for c in connections if self.registry.is_subscribed(c, channel)]
+
+        if not channel:
+            return [
+                connection
+                for connections in self.active_connections.values()
+                for connection in connections.values()
+            ]
+        return list(self.registry.match(channel))
+
+    def _on_connection_closed(self, connection: ClientConnection):
+        """Remove a connection that was closed by its writer (send error or eviction)"""
+        connections = self.active_connections.get(connection.client_id)
+        if connections and connections.get(connection.connection_id) is connection:
+            asyncio.ensure_future(self.disconnect(connection.client_id, connection.connection_id))
+
+    def set_encoding(self, client_id: str, connection_id: str, encoding: Encoding):
+        """Switch a connection's wire encoding; applies to frames queued from now on"""
+        connection = self.active_connections.get(client_id, {}).get(connection_id)
+        if connection is not None:
+            connection.encoding = Encoding(encoding)
+
+    def get_coalescing_stats(self) -> Dict:
+        """Updates in, frames out and their ratio per coalesced channel"""
+        return self.coalescer.get_metrics()
+
+    def get_connection_stats(self) -> List[Dict]:
+        """Queue depth and drop counters for every open connection"""
+        return [
+            connection.get_stats()
+            for connections in self.active_connections.values()
+            for connection in connections.values()
+        ]
+
     async def subscribe(self, client_id: str, channels: List[str]):
         """Subscribe a client to channels"""
         async with self._lock:
             if client_id in self.subscriptions:
                 self.subscriptions[client_id].update(channels)
+                for connection in self.active_connections[client_id].values():
+                    self.registry.add(connection, channels)
                 
     async def unsubscribe(self, client_id: str, channels: List[str]):
         """Unsubscribe a client from channels"""
         async with self._lock:
             if client_id in self.subscriptions:
                 self.subscriptions[client_id].difference_update(channels)
+                for connection in self.active_connections[client_id].values():
+                    self.registry.remove(connection, channels)
                 
     async def broadcast_trade_update(self, trade: Trade):
         """Broadcast trade update to subscribed clients"""
@@ -109,7 +277,7 @@ class WebSocketManager:
                 "status": trade.status.value
             }
         }
-        await self.broadcast(message, channel="trades")
+        await self.broadcast(message, channel=f"trades.{trade.token_symbol}")
         
     async def broadcast_bot_status(self, status: dict):
         """Broadcast bot status update to subscribed clients"""
@@ -117,10 +285,11 @@ class WebSocketManager:
             "type": "bot_status",
             "data": status
         }
-        await self.broadcast(message, channel="bot_status")
+        await self.broadcast(message, channel="bot_status", coalesce_key="bot_status")
         
     async def broadcast_position_update(self, position: Position):
-        """Broadcast position update to subscribed clients"""
+        """Broadcast position update to the position's owner; updates are coalesced
+        per position and sent as batched ``position_updates`` frames"""
         message = {
             "type": "position_update",
             "data": {
@@ -133,7 +302,16 @@ class WebSocketManager:
                 "status": position.status.value
             }
         }
-        await self.broadcast(message, channel="positions", client_id=str(position.user_id))
+        await self.broadcast(
+            message,
+            channel=f"positions.{position.token_symbol}",
+            client_id=str(position.user_id),
+            coalesce_key=f"position:{position.id}"
+        )
 
 # Create global WebSocket manager instance
-manager = WebSocketManager() 
\ No newline at end of file
+manager = WebSocketManager(
+    broker=create_broker(getattr(settings, "WS_BROKER", "memory"), getattr(settings, "REDIS_URL", None)),
+    coalesce_window=getattr(settings, "WS_COALESCE_WINDOW_MS", 100) / 1000,
+    rate_caps=getattr(settings, "WS_RATE_CAPS", {"positions": 10, "bot_status": 2})
+) 
\ No newline at end of file
@@ -0,0 +1,95 @@
+from typing import Dict, Hashable, Iterable, Set
+
+WILDCARD = "*"
+SEPARATOR = "."
+
+class SubscriptionRegistry:
+    """Inverted index of channel -> subscribed connections.
+
+    Channels are dot separated (``trades``, ``trades.ETH``). A subscription
+    matches its own channel and every channel below it, so ``trades``
+    receives ``trades.ETH``; ``trades.*`` matches only the children and ``*``
+    matches everything. Looking up the recipients of a channel costs one dict
+    probe per level of the channel name plus the size of the result, never a
+    walk over all connections.
+    """
+
+    def __init__(self):
+        self._exact: Dict[str, Set[Hashable]] = {}
+        self._wildcard: Dict[str, Set[Hashable]] = {}
+        self._channels: Dict[Hashable, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    def _bucket(self, channel: str):
+        if channel == WILDCARD:
+            return self._wildcard, ""
+        if channel.endswith(SEPARATOR + WILDCARD):
+            return self._wildcard, channel[:-1]
+        return self._exact, channel
+
+    def add(self, member: Hashable, channels: Iterable[str]):
+        """Subscribe a member to channels"""
+        subscribed = self._channels.setdefault(member, set())
+        for channel in channels:
+            if channel in subscribed:
+                continue
+            subscribed.add(channel)
+            index, key = self._bucket(channel)
+            index.setdefault(key, set()).add(member)
+
+    def remove(self, member: Hashable, channels: Iterable[str]):
+        """Unsubscribe a member from channels"""
+        subscribed = self._channels.get(member)
+        if not subscribed:
+            return
+        for channel in channels:
+            if channel not in subscribed:
+                continue
+            subscribed.discard(channel)
+            index, key = self._bucket(channel)
+            members = index.get(key)
+            if members is not None:
+                members.discard(member)
+                if not members:
+                    del index[key]
+
+    def discard(self, member: Hashable):
+        """Drop a member and all of its subscriptions"""
+        channels = self._channels.get(member)
+        if channels is not None:
+            self.remove(member, list(channels))
+            del self._channels[member]
+
+    def channels(self, member: Hashable) -> Set[str]:
+        return self._channels.get(member, set())
+
+    def match(self, channel: str) -> Set[Hashable]:
+        """All members whose subscriptions match a channel"""
+        result = set(self._exact.get(channel, ()))
+        if self._wildcard:
+            result.update(self._wildcard.get("", ()))
+
+        end = channel.find(SEPARATOR)
+        while end != -1:
+            result.update(self._exact.get(channel[:end], ()))
+            if self._wildcard:
+                result.update(self._wildcard.get(channel[:end + 1], ()))
+            end = channel.find(SEPARATOR, end + 1)
+        return result
+
+    def is_subscribed(self, member: Hashable, channel: str) -> bool:
+        """Whether a single member's subscriptions match a channel"""
+        subscribed = self._channels.get(member)
+        if not subscribed:
+            return False
+        if channel in subscribed or WILDCARD in subscribed:
+            return True
+
+        end = channel.find(SEPARATOR)
+        while end != -1:
+            if channel[:end] in subscribed or channel[:end + 1] + WILDCARD in subscribed:
+                return True
+            end = channel.find(SEPARATOR, end + 1)
+        return False
@@ -1,23 +1,82 @@
 import asyncio
-import json
 import logging
-from typing import Dict, Set
+from typing import Dict, List
 from fastapi import WebSocket
-from ..models.trade import MarketAnalysis
+from ..analysis.indicators import IndicatorEngine
+from .codec import EncodedMessage, Encoding, Frame
+from .connection import ClientConnection, OverflowPolicy
 
 logger = logging.getLogger(__name__)
 
+ANALYSIS_INTERVAL = 5  # seconds
+
+def diff_analysis(old: dict, new: dict) -> dict:
+    """Fields of ``new`` that differ from ``old``; nested dicts are diffed
+    recursively, lists are replaced whole and removed keys map to None"""
+    changes = {}
+    for key, value in new.items():
+        previous = old.get(key)
+        if isinstance(value, dict) and isinstance(previous, dict):
+            nested = diff_analysis(previous, value)
+            if nested:
+                changes[key] = nested
+        elif key not in old or previous != value:
+            changes[key] = value
+    for key in old:
+        if key not in new:
+            changes[key] = None
+    return changes
+
+class AnalysisSnapshot:
+    """The latest analysis for a symbol with its version and frames cached per encoding"""
+
+    def __init__(self, symbol: str, version: int, analysis: dict):
+        self.symbol = symbol
+        self.version = version
+        self.analysis = analysis
+        self._encoded = EncodedMessage({
+            "type": "analysis",
+            "symbol": symbol,
+            "version": version,
+            "analysis": analysis
+        })
+
+    def frame(self, encoding: Encoding = Encoding.JSON) -> Frame:
+        return self._encoded.frame(encoding)
+
 class WebSocketManager:
-    def __init__(self):
-        self.active_connections: Dict[str, Set[WebSocket]] = {}
+    def __init__(
+        self,
+        max_queue_size: int = 32,
+        overflow_policy: OverflowPolicy = OverflowPolicy.COALESCE
+    ):
+        self.active_connections: Dict[str, Dict[WebSocket, ClientConnection]] = {}
         self.analysis_tasks: Dict[str, asyncio.Task] = {}
+        self.snapshots: Dict[str, AnalysisSnapshot] = {}
+        self.indicators = IndicatorEngine()
+        self.max_queue_size = max_queue_size
+        self.overflow_policy = OverflowPolicy(overflow_policy)
 
-    async def connect(self, websocket: WebSocket, symbol: str):
+    async def connect(self, websocket: WebSocket, symbol: str, encoding: Encoding = Encoding.JSON):
         await websocket.accept()
         if symbol not in self.active_connections:
-            self.active_connections[symbol] = set()
-        self.active_connections[symbol].add(websocket)
-        
+            self.active_connections[symbol] = {}
+        connection = ClientConnection(
+            websocket,
+            symbol,
+            f"{symbol}_{id(websocket)}",
+            max_queue_size=self.max_queue_size,
+            overflow_policy=self.overflow_policy,
+            on_close=self._on_connection_closed,
+            encoding=encoding
+        )
+        self.active_connections[symbol][websocket] = connection
+        connection.start()
+
+        # Late joiners get the cached snapshot right away instead of waiting for the next tick
+        snapshot = self.snapshots.get(symbol) or self._update_snapshot(symbol)[0]
+        connection.enqueue(snapshot.frame(connection.encoding), coalesce_key=f"analysis:{symbol}")
+
         # Start analysis task if not already running
         if symbol not in self.analysis_tasks:
             self.analysis_tasks[symbol] = asyncio.create_task(
@@ -26,82 +85,137 @@ class WebSocketManager:
 
     def disconnect(self, websocket: WebSocket, symbol: str):
         if symbol in self.active_connections:
-            self.active_connections[symbol].remove(websocket)
+            connection = self.active_connections[symbol].pop(websocket, None)
+            if connection is not None:
+                connection.close()
             if not self.active_connections[symbol]:
                 del self.active_connections[symbol]
+                self.snapshots.pop(symbol, None)
                 # Cancel analysis task
                 if symbol in self.analysis_tasks:
                     self.analysis_tasks[symbol].cancel()
                     del self.analysis_tasks[symbol]
 
+    def _on_connection_closed(self, connection: ClientConnection):
+        """Remove a connection that was closed by its writer (send error or eviction)"""
+        symbol = connection.client_id
+        if self.active_connections.get(symbol, {}).get(connection.websocket) is connection:
+            self.disconnect(connection.websocket, symbol)
+
+    def on_price_tick(self, symbol: str, price: float):
+        """Feed a price tick into the indicator engine behind the analysis feed"""
+        self.indicators.update(symbol, price)
+
+    def on_bot_event(self, event: str, data: Dict):
+        """Bot listener: the bot's price events are the analysis feed's ticks"""
+        if event == "price":
+            self.on_price_tick(data["symbol"], data["price"])
+
+    def _build_analysis(self, symbol: str) -> dict:
+        """Generate market analysis data; technical and Fibonacci blocks come
+        from the indicator engine once the symbol has received price ticks"""
+        analysis = {
+            "sentiment": {
+                "score": 75,
+                "trend": "bullish",
+                "confidence": 85
+            },
+            "technical": {
+                "rsi": 65,
+                "macd": 2.5,
+                "ma": 1850,
+                "volume": "HIGH"
+            },
+            "wyckoff": {
+                "phase": "markup",
+                "progress": 65,
+                "description": "Market showing strong momentum with increasing volume",
+                "keyLevels": {
+                    "support": 1800,
+                    "resistance": 1900
+                }
+            },
+            "fibonacci": {
+                "levels": [
+                    {"name": "0.236", "value": 1880, "type": "resistance"},
+                    {"name": "0.382", "value": 1860, "type": "resistance"},
+                    {"name": "0.5", "value": 1840, "type": "resistance"},
+                    {"name": "0.618", "value": 1820, "type": "support"},
+                    {"name": "0.786", "value": 1800, "type": "support"}
+                ],
+                "currentPrice": 1850
+            }
+        }
+
+        indicators = self.indicators.snapshot(symbol)
+        if indicators is not None:
+            analysis["technical"] = {**indicators["technical"], "volume": analysis["technical"]["volume"]}
+            analysis["fibonacci"] = indicators["fibonacci"]
+        return analysis
+
+    def _update_snapshot(self, symbol: str):
+        """Rebuild the analysis for a symbol; returns the snapshot and the changes since the last one"""
+        analysis = self._build_analysis(symbol)
+        previous = self.snapshots.get(symbol)
+        if previous is None:
+            changes = analysis
+            snapshot = AnalysisSnapshot(symbol, 1, analysis)
+        else:
+            changes = diff_analysis(previous.analysis, analysis)
+            if not changes:
+                return previous, {}
+            snapshot = AnalysisSnapshot(symbol, previous.version + 1, analysis)
+        self.snapshots[symbol] = snapshot
+        return snapshot, changes
+
     async def _generate_analysis(self, symbol: str):
-        """Generate mock market analysis data periodically"""
+        """Refresh the analysis periodically and push versioned deltas"""
         while True:
             try:
-                # Generate mock analysis data
-                analysis = {
-                    "sentiment": {
-                        "score": 75,
-                        "trend": "bullish",
-                        "confidence": 85
-                    },
-                    "technical": {
-                        "rsi": 65,
-                        "macd": 2.5,
-                        "ma": 1850,
-                        "volume": "HIGH"
-                    },
-                    "wyckoff": {
-                        "phase": "markup",
-                        "progress": 65,
-                        "description": "Market showing strong momentum with increasing volume",
-                        "keyLevels": {
-                            "support": 1800,
-                            "resistance": 1900
-                        }
-                    },
-                    "fibonacci": {
-                        "levels": [
-                            {"name": "0.236", "value": 1880, "type": "resistance"},
-                            {"name": "0.382", "value": 1860, "type": "resistance"},
-                            {"name": "0.5", "value": 1840, "type": "resistance"},
-                            {"name": "0.618", "value": 1820, "type": "support"},
-                            {"name": "0.786", "value": 1800, "type": "support"}
-                        ],
-                        "currentPrice": 1850
-                    }
+                await asyncio.sleep(ANALYSIS_INTERVAL)
+                previous = self.snapshots.get(symbol)
+                snapshot, changes = self._update_snapshot(symbol)
+                # Unchanged ticks send nothing
+                if not changes or symbol not in self.active_connections:
+                    continue
+                if previous is None:
+                    self._broadcast(symbol, snapshot)
+                    continue
+                message = {
+                    "type": "analysis_delta",
+                    "symbol": symbol,
+                    "version": snapshot.version,
+                    "base_version": previous.version,
+                    "changes": changes
                 }
-
-                # Broadcast to all connected clients for this symbol
-                if symbol in self.active_connections:
-                    message = {
-                        "type": "analysis",
-                        "symbol": symbol,
-                        "analysis": analysis
-                    }
-                    await self._broadcast(symbol, message)
-
-                await asyncio.sleep(5)  # Update every 5 seconds
+                self._broadcast_delta(symbol, message, snapshot)
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"Error generating analysis for {symbol}: {e}")
-                await asyncio.sleep(5)
 
-    async def _broadcast(self, symbol: str, message: dict):
-        """Broadcast message to all connected clients for a symbol"""
-        if symbol in self.active_connections:
-            disconnected = set()
-            for connection in self.active_connections[symbol]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    logger.error(f"Error broadcasting to client: {e}")
-                    disconnected.add(connection)
-            
-            # Clean up disconnected clients
-            for connection in disconnected:
-                self.disconnect(connection, symbol)
+    def _broadcast_delta(self, symbol: str, message: dict, snapshot: AnalysisSnapshot):
+        """Queue a delta for every client; clients still holding an unsent frame get the full snapshot"""
+        key = f"analysis:{symbol}"
+        delta = EncodedMessage(message)
+        for connection in list(self.active_connections.get(symbol, {}).values()):
+            # A pending frame means this client is behind: replace it with the snapshot,
+            # which supersedes any delta it would have needed
+            source = snapshot if connection.queue_depth else delta
+            connection.enqueue(source.frame(connection.encoding), coalesce_key=key)
+
+    def _broadcast(self, symbol: str, snapshot: AnalysisSnapshot):
+        """Queue a snapshot for all connected clients for a symbol"""
+        for connection in list(self.active_connections.get(symbol, {}).values()):
+            connection.enqueue(snapshot.frame(connection.encoding), coalesce_key=f"analysis:{symbol}")
+
+    def get_connection_stats(self) -> List[Dict]:
+        """Queue depth and drop counters for every open connection"""
+        return [
+            connection.get_stats()
+            for connections in self.active_connections.values()
+            for connection in connections.values()
+        ]
 
 # Global WebSocket manager instance
 manager = WebSocketManager() 
\ No newline at end of file
@@ -0,0 +1,117 @@
+import asyncio
+import json
+from datetime import datetime
+
+from src.websocket.connection import ClientConnection, OverflowPolicy
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed_with = None
+
+    async def send_text(self, frame):
+        self.sent.append(frame)
+
+    async def send_bytes(self, frame):
+        self.sent.append(frame)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+def _connection(policy, size=3, on_close=None):
+    return ClientConnection(FakeWebSocket(), "client", "client_1", max_queue_size=size,
+                            overflow_policy=policy, on_close=on_close)
+
+def _queued(connection):
+    return list(connection._pending.values())
+
+def test_drop_oldest_discards_the_oldest_frame():
+    connection = _connection(OverflowPolicy.DROP_OLDEST)
+    for i in range(5):
+        assert connection.enqueue(f"frame-{i}")
+    assert _queued(connection) == ["frame-2", "frame-3", "frame-4"]
+    assert connection.dropped == 2
+    assert connection.max_depth == 3
+
+def test_drop_oldest_does_not_coalesce():
+    connection = _connection(OverflowPolicy.DROP_OLDEST)
+    connection.enqueue("a-1", coalesce_key="a")
+    connection.enqueue("a-2", coalesce_key="a")
+    assert _queued(connection) == ["a-1", "a-2"]
+    assert connection.coalesced == 0
+
+def test_coalesce_replaces_the_queued_frame_in_place():
+    connection = _connection(OverflowPolicy.COALESCE)
+    connection.enqueue("a-1", coalesce_key="a")
+    connection.enqueue("other")
+    connection.enqueue("a-2", coalesce_key="a")
+    assert _queued(connection) == ["a-2", "other"]
+    assert connection.coalesced == 1
+    assert connection.dropped == 0
+
+def test_coalesce_on_a_full_queue_keeps_every_key():
+    connection = _connection(OverflowPolicy.COALESCE)
+    for key in "abc":
+        connection.enqueue(f"{key}-1", coalesce_key=key)
+    # Full, but "b" is already queued: replaced without dropping anything
+    assert connection.enqueue("b-2", coalesce_key="b")
+    assert _queued(connection) == ["a-1", "b-2", "c-1"]
+    # A new key on a full queue falls back to dropping the oldest
+    assert connection.enqueue("d-1", coalesce_key="d")
+    assert _queued(connection) == ["b-2", "c-1", "d-1"]
+    assert connection.dropped == 1
+
+def test_disconnect_closes_a_full_client():
+    async def scenario():
+        closed = []
+        connection = _connection(OverflowPolicy.DISCONNECT, on_close=closed.append)
+        for i in range(3):
+            assert connection.enqueue(f"frame-{i}")
+        assert not connection.enqueue("frame-3")
+        await asyncio.sleep(0)
+        return connection, closed
+
+    connection, closed = asyncio.run(scenario())
+    assert connection.closed
+    assert closed == [connection]
+    assert connection.websocket.closed_with == 1013
+    assert connection.queue_depth == 0
+    assert not connection.enqueue("late")
+
+def test_writer_drains_in_order():
+    async def scenario():
+        connection = _connection(OverflowPolicy.COALESCE, size=8)
+        connection.start()
+        connection.enqueue("text")
+        connection.enqueue(b"binary")
+        for _ in range(5):
+            await asyncio.sleep(0)
+        connection.close()
+        await asyncio.sleep(0)
+        return connection
+
+    connection = asyncio.run(scenario())
+    assert connection.websocket.sent == ["text", b"binary"]
+    assert connection.sent == 2
+
+def test_coalesced_batches_keep_each_update_timestamp():
+    from benchmarks.loadtest import _sent_timestamps
+    from src.websocket.coalescer import CoalescedStream, UpdateCoalescer
+
+    async def scenario():
+        connection = _connection(OverflowPolicy.COALESCE, size=10)
+        stream = CoalescedStream("positions", 0.01, batch_type="position_updates")
+        coalescer = UpdateCoalescer({"positions": stream})
+        for key, timestamp in (("a", 100.0), ("b", 101.0), ("a", 102.0)):
+            coalescer.add(stream, connection, key, {"type": "position_update", "data": {"id": key},
+                                                    "timestamp": timestamp})
+        coalescer._flush(stream)
+        return _queued(connection)
+
+    frame, = asyncio.run(scenario())
+    batch = json.loads(frame)
+    assert [item["id"] for item in batch["data"]] == ["b", "a"]
+    assert _sent_timestamps(batch) == [
+        datetime.utcfromtimestamp(101.0).isoformat(), datetime.utcfromtimestamp(102.0).isoformat()
+    ]
+    assert _sent_timestamps({"type": "trade", "timestamp": 5}) == [5]
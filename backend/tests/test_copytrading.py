@@ -0,0 +1,83 @@
+import asyncio
+
+import numpy as np
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.copytrading.engine import CopyTradingEngine
+from src.models.base import Base
+from src.models.trade import CopySubscription, Trade, TradeStatus
+
+class TradeSink:
+    def __init__(self):
+        self.trades = []
+
+    def submit_trades(self, trades):
+        self.trades.extend(trades)
+        return True
+
+def leader_trade(index, side="buy", amount=100.0, price=1.0):
+    return {
+        "user_id": "leader", "token_symbol": "ETH", "token_address": "0xeth",
+        "amount": amount, "price": price, "type": side, "status": "executed", "tx_hash": f"0x{index}"
+    }
+
+def test_concurrent_leader_fills_share_the_exposure_cap():
+    async def slow_fill(trade, orders):
+        await asyncio.sleep(0.01)
+        return np.full(len(orders), float(trade["price"]))
+
+    async def run():
+        engine = CopyTradingEngine(submit_batch=slow_fill)
+        engine.follow("leader", "alice", 1.0, max_exposure=100.0)
+        engine.follow("leader", "bob", 0.5, max_exposure=100.0)
+        await asyncio.gather(*(engine.on_leader_fill("leader", leader_trade(i)) for i in range(2)))
+        await asyncio.gather(*(engine.on_leader_fill("leader", leader_trade(i, "sell", 80.0)) for i in range(2, 4)))
+        return engine.books["leader"]
+
+    book = asyncio.run(run())
+    alice, bob = book.get("alice"), book.get("bob")
+    assert alice["exposure"] == 0.0 and "ETH" not in alice["holdings"]
+    # Bob bought 50 + 50, then sold 40 + 40
+    assert bob["exposure"] == pytest.approx(20.0)
+    assert bob["holdings"]["ETH"]["amount"] == pytest.approx(20.0)
+
+def test_load_rebuilds_copy_positions_from_persisted_trades():
+    subscriptions = [("alice", 1.0, None), ("bob", 0.5, 150.0)]
+    fills = [leader_trade(1, price=1.0), leader_trade(2, price=2.0), leader_trade(3, "sell", 40.0, price=3.0)]
+
+    async def run():
+        sink = TradeSink()
+        live = CopyTradingEngine(persistence=sink)
+        for follower_id, allocation, max_exposure in subscriptions:
+            live.follow("leader", follower_id, allocation, max_exposure=max_exposure)
+        for trade in fills:
+            await live.on_leader_fill("leader", trade)
+
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        async with sessions() as db:
+            db.add_all(
+                CopySubscription(leader_id="leader", follower_id=follower_id, allocation=allocation,
+                                 max_exposure=max_exposure, max_slippage=1.0)
+                for follower_id, allocation, max_exposure in subscriptions
+            )
+            db.add_all(Trade(**{**trade, "status": TradeStatus(trade["status"])}) for trade in sink.trades)
+            # Neither a failed copy trade nor the leader's own trade counts
+            db.add(Trade(**{**sink.trades[0], "tx_hash": "copy:failed", "status": TradeStatus.FAILED}))
+            db.add(Trade(**{**leader_trade(1), "status": TradeStatus.EXECUTED}))
+            await db.commit()
+
+        restored = CopyTradingEngine()
+        async with sessions() as db:
+            await restored.load_from(db)
+        await engine.dispose()
+        return live.books["leader"], restored.books["leader"]
+
+    live, restored = asyncio.run(run())
+    assert len(restored) == 2
+    for follower_id in ("alice", "bob"):
+        assert restored.get(follower_id) == live.get(follower_id)
+    assert restored.get("bob")["exposure"] > 0
@@ -0,0 +1,58 @@
+import asyncio
+
+import aiohttp
+
+from src.engine.server import serve_metrics
+from src.utils.metrics import metrics
+from tests.test_execution import free_port
+
+def test_engine_serves_its_own_metrics_registry():
+    async def run():
+        metrics.counter("engine_events_total", "", labels=("event",)).labels("trade").inc()
+        port = free_port()
+        runner = await serve_metrics(port, host="127.0.0.1")
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+                    return response.headers["Content-Type"], await response.text()
+        finally:
+            await runner.cleanup()
+
+    content_type, body = asyncio.run(run())
+    assert content_type.startswith("text/plain; version=0.0.4")
+    assert 'engine_events_total{event="trade"}' in body
+
+class RecordingManager:
+    def __init__(self):
+        self.sent = []
+
+    async def broadcast(self, message, **options):
+        self.sent.append((message["type"], options))
+
+def test_bot_events_reach_websocket_clients_in_either_mode():
+    from src.engine.client import EngineClient
+    from src.websocket.bot_events import BotEventBroadcaster
+
+    trade = {"tx_hash": "0x01", "token_symbol": "ETH", "amount": 1.0, "price": 2.0, "type": "buy", "status": "executed"}
+    position = {"id": "0x01", "token": "ETH", "status": "open"}
+
+    async def run(listener, manager):
+        listener("trade", trade)
+        listener("position", position)
+        listener("stats", {"total_trades": 1})
+        listener("price", {"symbol": "ETH", "price": 2.0})
+        await asyncio.sleep(0)
+        return manager.sent
+
+    inprocess = RecordingManager()
+    broadcaster = BotEventBroadcaster(inprocess)
+    sent = asyncio.run(run(broadcaster.on_bot_event, inprocess))
+    assert [kind for kind, _ in sent] == ["trade_update", "position_update", "bot_status"]
+    assert sent[0][1] == {"channel": "trades.ETH", "local": False}
+    assert not broadcaster._tasks
+
+    attached = RecordingManager()
+    client = EngineClient(manager=attached)
+    sent = asyncio.run(run(client._on_event, attached))
+    assert [kind for kind, _ in sent] == ["trade_update", "position_update", "bot_status"]
+    assert all(options["local"] for _, options in sent)
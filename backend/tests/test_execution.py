@@ -0,0 +1,215 @@
+import asyncio
+import socket
+
+import pytest
+
+from eth_abi import decode
+from eth_account import Account
+
+from benchmarks.stub_rpc import StubNode
+from src.hft.bot import HFTBot
+from src.hft.decoder import WETH
+from src.hft.execution import MAX_UINT256, UNISWAP_V2_ROUTER, ExecutionPipeline
+from src.hft.replay import ReplaySink, SimulatedClock
+from src.hft.rpc import JsonRpcClient
+from src.hft.strategies.base import Decision
+from tests.test_replay import USDC, snapshot, sync_log
+
+KEY = "0x" + "42" * 32
+ADDRESS = Account.from_key(KEY).address.lower()
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def with_nodes(test, count: int = 1):
+    """Run ``test(*nodes, *urls)`` against in-process stub nodes"""
+    async def run():
+        nodes = [StubNode(tx_rate=0) for _ in range(count)]
+        urls = [await node.start(port=free_port()) for node in nodes]
+        try:
+            return await test(*nodes, *urls)
+        finally:
+            for node in nodes:
+                await node.stop()
+    return asyncio.run(run())
+
+async def close(pipeline):
+    await pipeline.close()
+    await pipeline.rpc.close()
+
+def test_nonces_are_reserved_locally_after_one_sync():
+    async def test(node, url):
+        node.nonces[ADDRESS] = 7
+        pipeline = ExecutionPipeline(JsonRpcClient(url), KEY)
+        results = await asyncio.gather(*(
+            pipeline.execute("buy", 1, token=USDC, amount_in=10 ** 16, amount_out_min=1) for _ in range(3)
+        ))
+        assert sorted(result.nonce for result in results) == [7, 8, 9]
+        assert [tx["nonce"] for tx in sorted(node.mempool, key=lambda tx: tx["nonce"])] == [7, 8, 9]
+
+        # A nonce the node already saw fails the submit and forces a resync
+        pipeline.nonces._next = 8
+        failed = await pipeline.execute("buy", 1, token=USDC, amount_in=10 ** 16, amount_out_min=1)
+        assert failed.tx_hash is None and "nonce too low" in failed.error
+        retried = await pipeline.execute("buy", 1, token=USDC, amount_in=10 ** 16, amount_out_min=1)
+        assert retried.nonce == 10 and retried.tx_hash is not None
+        await close(pipeline)
+    with_nodes(test)
+
+def test_templates_fill_fields_into_the_encoded_calldata():
+    async def test(node, url):
+        pipeline = ExecutionPipeline(JsonRpcClient(url), KEY)
+        node.allowances[(USDC, ADDRESS, UNISWAP_V2_ROUTER)] = MAX_UINT256
+        await pipeline.execute("sell", 1, token=USDC, amount_in=123, amount_out_min=45, deadline=6789)
+        tx, = node.mempool
+        assert tx["to"] == UNISWAP_V2_ROUTER and tx["value"] == 0
+        amount_in, amount_out_min, path, to, deadline = decode(
+            ["uint256", "uint256", "address[]", "address", "uint256"], tx["input"][4:]
+        )
+        assert (amount_in, amount_out_min, deadline) == (123, 45, 6789)
+        assert [address.lower() for address in path] == [USDC, WETH]
+        assert to.lower() == ADDRESS
+
+        await pipeline.execute("buy", 1, token=USDC, amount_in=10 ** 17, amount_out_min=9)
+        buy = node.mempool[-1]
+        assert buy["value"] == 10 ** 17
+        amount_out_min, path, _, _ = decode(["uint256", "address[]", "address", "uint256"], buy["input"][4:])
+        assert amount_out_min == 9 and [address.lower() for address in path] == [WETH, USDC]
+        await close(pipeline)
+    with_nodes(test)
+
+def test_submitter_returns_the_first_endpoint_to_accept():
+    async def test(bad, good, bad_url, good_url):
+        def reject(raw):
+            raise ValueError("rejected")
+        bad.handlers["eth_sendRawTransaction"] = reject
+        pipeline = ExecutionPipeline(JsonRpcClient(good_url), KEY, submit_urls=[bad_url, good_url])
+        result = await pipeline.execute("buy", 1, token=USDC, amount_in=10 ** 16, amount_out_min=1)
+        assert result.tx_hash == good.mempool[0]["hash"]
+        await asyncio.sleep(0.05)
+        assert pipeline.submitter.stats[good_url]["accepted"] == 1
+        assert pipeline.submitter.stats[bad_url]["failed"] == 1
+        await close(pipeline)
+    with_nodes(test, count=2)
+
+def test_first_sell_of_a_token_approves_the_router_ahead_of_it():
+    async def test(node, url):
+        pipeline = ExecutionPipeline(JsonRpcClient(url), KEY)
+        await asyncio.gather(*(
+            pipeline.execute("sell", 1, token=USDC, amount_in=1, amount_out_min=0) for _ in range(2)
+        ))
+        approve, *sells = sorted(node.mempool, key=lambda tx: tx["nonce"])
+        assert approve["to"] == USDC and len(sells) == 2
+        assert all(sell["to"] == UNISWAP_V2_ROUTER for sell in sells)
+        spender, amount = decode(["address", "uint256"], approve["input"][4:])
+        assert spender.lower() == UNISWAP_V2_ROUTER and amount == MAX_UINT256
+
+        node.mine()
+        await pipeline.receipts.poll(node.block_number)
+        assert node.allowances[(USDC, ADDRESS, UNISWAP_V2_ROUTER)] == MAX_UINT256
+        await pipeline.execute("sell", 2, token=USDC, amount_in=1, amount_out_min=0)
+        assert [tx["to"] for tx in node.mempool] == [UNISWAP_V2_ROUTER]
+        await close(pipeline)
+    with_nodes(test)
+
+def test_reverted_approval_is_checked_again():
+    async def test(node, url):
+        pipeline = ExecutionPipeline(JsonRpcClient(url), KEY)
+        node.reverts = lambda tx: tx["to"] == USDC
+        await pipeline.execute("sell", 1, token=USDC, amount_in=1, amount_out_min=0)
+        node.mine()
+        await pipeline.receipts.poll(node.block_number)
+        await asyncio.sleep(0)
+        node.reverts = lambda tx: False
+        await pipeline.execute("sell", 2, token=USDC, amount_in=1, amount_out_min=0)
+        assert [tx["to"] for tx in node.mempool] == [USDC, UNISWAP_V2_ROUTER]
+        await close(pipeline)
+    with_nodes(test)
+
+def live_bot(url):
+    clock = SimulatedClock()
+    clock.advance(0)
+    sink = ReplaySink(clock)
+    bot = HFTBot(url, private_key=KEY, persistence=sink)
+    bot.amm.add_pools(snapshot())
+    bot.execution = ExecutionPipeline(bot.rpc, KEY)
+    return bot, sink
+
+async def settle(bot, node):
+    node.mine()
+    await bot.on_block(node.block_number)
+    await asyncio.sleep(0)
+
+def test_positions_open_and_close_only_once_mined():
+    async def test(node, url):
+        bot, sink = live_bot(url)
+        buy = Decision("test", USDC, "buy", 100.0, profit_target=0.0004)
+        await bot._execute_trade({"hash": "0x01"}, buy)
+        assert len(bot.active_positions) == 0 and sink.trades == []
+
+        await settle(bot, node)
+        position, = bot.active_positions
+        trade, = sink.trades
+        assert trade["status"] == "executed" and trade["gas_used"] > 0
+        assert position["id"] == trade["tx_hash"]
+
+        # The position's token gets approved as soon as the buy is in
+        await asyncio.gather(*bot._tasks)
+        assert node.mempool[-1]["to"] == USDC
+        # ... and the price doubles in the same block
+        node.block_number += 1
+        node.add_log(sync_log(1_000_000 * 10 ** 6, 1000 * 10 ** 18))
+        await settle(bot, node)
+
+        await bot.check_positions()
+        assert bot._closing == {position["id"]}
+        await bot.check_positions()
+        sells = [tx for tx in node.mempool if tx["to"] == UNISWAP_V2_ROUTER]
+        assert len(sells) == 1 and len(bot.active_positions) == 1
+
+        await settle(bot, node)
+        assert len(bot.active_positions) == 0 and not bot._closing
+        assert [trade["status"] for trade in sink.trades] == ["executed", "executed"]
+        closed = sink.trades[-1]
+        assert closed["pnl"] == closed["meta"]["pnl"] == pytest.approx((0.001 - 0.0005) * 100)
+        assert "pnl" not in sink.trades[0]
+        await close(bot.execution)
+    with_nodes(test)
+
+def test_reverted_trades_leave_the_book_alone():
+    async def test(node, url):
+        bot, sink = live_bot(url)
+        node.reverts = lambda tx: tx["to"] == UNISWAP_V2_ROUTER
+        await bot._execute_trade({"hash": "0x01"}, Decision("test", USDC, "buy", 100.0))
+        await settle(bot, node)
+        assert len(bot.active_positions) == 0
+        assert sink.trades[0]["status"] == "failed" and sink.trades[0]["error"] == "reverted"
+
+        bot.active_positions.add("0xabc", USDC, 0.0005, 100.0, take_profit=0.0004)
+        await bot.check_positions()
+        await settle(bot, node)
+        assert "0xabc" in bot.active_positions and not bot._closing
+        assert sink.trades[-1]["status"] == "failed"
+        await close(bot.execution)
+    with_nodes(test)
+
+def test_a_close_that_was_not_sent_is_retried():
+    async def test(node, url):
+        bot, sink = live_bot(url)
+        pipeline, bot.execution = bot.execution, None
+        bot.active_positions.add("0xabc", USDC, 0.0005, 100.0, take_profit=0.0004)
+        position = bot.active_positions.get("0xabc")
+        await bot._close_position(position)
+        assert not bot._closing
+
+        async def fail(*args, **kwargs):
+            raise ConnectionError("node down")
+        bot.execution = pipeline
+        pipeline.execute = fail
+        with pytest.raises(ConnectionError):
+            await bot._close_position(position)
+        assert not bot._closing and "0xabc" in bot.active_positions
+        await close(pipeline)
+    with_nodes(test)
@@ -0,0 +1,79 @@
+import json
+from datetime import datetime
+
+from src.persistence.journal import Journal
+
+def _journal(tmp_path):
+    journal = Journal(str(tmp_path / "journal.jsonl"))
+    journal.open()
+    return journal
+
+def test_replay_yields_only_uncommitted_records(tmp_path):
+    journal = _journal(tmp_path)
+    records = [journal.append("trade", {"n": i}) for i in range(5)]
+    journal.commit(records[2]["seq"])
+    journal.close()
+
+    reopened = Journal(journal.path)
+    assert [record["data"]["n"] for record in reopened.replay()] == [3, 4]
+    # New records continue the sequence instead of reusing replayed numbers
+    reopened.open()
+    assert reopened.append("trade", {"n": 5})["seq"] == records[-1]["seq"] + 1
+
+def test_append_many_and_serialized_values(tmp_path):
+    journal = _journal(tmp_path)
+    now = datetime(2024, 1, 1, 12, 0)
+    records = journal.append_many("trade", [{"created_at": now}, {"created_at": now}])
+    journal.close()
+
+    assert [record["seq"] for record in records] == [1, 2]
+    replayed = list(Journal(journal.path).replay())
+    assert [record["data"]["created_at"] for record in replayed] == [now.isoformat()] * 2
+
+def test_torn_final_line_is_skipped(tmp_path):
+    journal = _journal(tmp_path)
+    journal.append("trade", {"n": 1})
+    journal.close()
+    with open(journal.path, "ab") as f:
+        f.write(b'{"seq": 2, "kind": "tra')
+
+    assert [record["seq"] for record in Journal(journal.path).replay()] == [1]
+
+def test_compaction_keeps_pending_records_and_checkpoint(tmp_path):
+    journal = _journal(tmp_path)
+    records = [journal.append("trade", {"n": i}) for i in range(6)]
+    journal.commit(records[3]["seq"])
+    before = journal.size
+    journal.compact(records[4:])
+
+    assert journal.size < before
+    with open(journal.path) as f:
+        assert [json.loads(line)["seq"] for line in f] == [5, 6]
+    # Appends after compaction land in the rewritten file
+    journal.append("trade", {"n": 6})
+    journal.close()
+    assert [record["data"]["n"] for record in Journal(journal.path).replay()] == [4, 5, 6]
+
+def test_compaction_to_empty_resumes_numbering_from_checkpoint(tmp_path):
+    journal = _journal(tmp_path)
+    records = [journal.append("trade", {"n": i}) for i in range(3)]
+    journal.commit(records[-1]["seq"])
+    journal.compact([])
+    journal.close()
+
+    reopened = Journal(journal.path)
+    assert list(reopened.replay()) == []
+    reopened.open()
+    assert reopened.append("trade", {})["seq"] == 4
+
+def test_dead_letters_are_not_replayed(tmp_path):
+    journal = _journal(tmp_path)
+    record = journal.append("trade", {"n": 1})
+    journal.dead_letter(record, "constraint violated")
+    journal.commit(record["seq"])
+    journal.close()
+
+    assert list(Journal(journal.path).replay()) == []
+    with open(journal.dead_letter_path) as f:
+        dead = [json.loads(line) for line in f]
+    assert dead == [{**record, "error": "constraint violated"}]
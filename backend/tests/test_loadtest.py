@@ -0,0 +1,20 @@
+from types import SimpleNamespace
+
+from benchmarks.loadtest import check_delivery, client_channels, position_owners
+
+def test_position_updates_go_to_subscribed_clients():
+    args = SimpleNamespace(clients=50)
+    channels = client_channels(args, {"trades": 0.5, "positions": 0.5}, ["ETH", "BTC"])
+    owners = position_owners(channels)
+    assert owners and set(owners) <= {"ETH", "BTC"}
+    for symbol, clients in owners.items():
+        assert all(channels[int(client[3:])] == f"positions.{symbol}" for client in clients)
+
+def test_a_run_that_delivered_nothing_is_an_error():
+    report = {
+        "broadcast": {"sent": {"trade_update": 10, "position_update": 5, "price_tick": 15}},
+        "delivery": {"updates": {"analysis": 4, "trade_update": 30}}
+    }
+    assert "position_update" in check_delivery(report)
+    report["delivery"]["updates"]["position_updates"] = 5
+    assert check_delivery(report) is None
@@ -0,0 +1,66 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.models.base import Base
+from src.models.trade import BotTrade
+from src.utils.pagination import decode_cursor, encode_cursor, keyset_page, page_of
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", encode_cursor(datetime(2024, 1, 1), 1)[:-3]])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+async def _pages(created_at, limit, **filters):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessions() as db:
+        db.add_all(
+            BotTrade(bot_id="bot", strategy=f"s{i % 2}", created_at=timestamp, updated_at=timestamp)
+            for i, timestamp in enumerate(created_at)
+        )
+        await db.commit()
+
+        pages, cursor = [], None
+        while True:
+            query = select(BotTrade)
+            for name, value in filters.items():
+                query = query.where(getattr(BotTrade, name) == value)
+            result = await db.execute(keyset_page(query, BotTrade, cursor, limit))
+            rows, cursor = page_of(result.scalars().all(), limit)
+            pages.append([(row.created_at, row.id) for row in rows])
+            if cursor is None:
+                break
+    await engine.dispose()
+    return pages
+
+def test_pages_cover_every_row_once_with_ties_on_created_at():
+    base = datetime(2024, 1, 1)
+    # Runs of identical timestamps that straddle page boundaries
+    created_at = [base + timedelta(seconds=i // 3) for i in range(10)]
+    pages = asyncio.run(_pages(created_at, limit=2))
+
+    rows = [row for page in pages for row in page]
+    assert [len(page) for page in pages] == [2, 2, 2, 2, 2]
+    assert len(set(rows)) == 10
+    assert rows == sorted(rows, reverse=True)
+
+def test_last_page_has_no_cursor():
+    base = datetime(2024, 1, 1)
+    pages = asyncio.run(_pages([base] * 4, limit=4))
+    assert len(pages) == 1 and len(pages[0]) == 4
+
+def test_cursor_applies_on_top_of_filters():
+    base = datetime(2024, 1, 1)
+    created_at = [base + timedelta(seconds=i // 4) for i in range(12)]
+    pages = asyncio.run(_pages(created_at, limit=4, strategy="s1"))
+    assert [len(page) for page in pages] == [4, 2]
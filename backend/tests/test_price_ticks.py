@@ -0,0 +1,37 @@
+import asyncio
+
+from src.engine.client import EngineClient
+from src.websocket.server import WebSocketManager
+from tests.test_execution import live_bot, settle, with_nodes
+from tests.test_replay import USDC, snapshot, sync_log
+
+def test_new_blocks_tick_the_analysis_indicators():
+    async def test(node, url):
+        bot, _ = live_bot(url)
+        bot.amm.symbols[USDC] = "USDC"
+        analysis = WebSocketManager()
+        bot.listeners.append(analysis.on_bot_event)
+
+        await settle(bot, node)
+        assert not analysis.indicators.has_data("USDC")
+
+        node.block_number += 1
+        node.add_log(sync_log(1_000_000 * 10 ** 6, 1000 * 10 ** 18))
+        await settle(bot, node)
+        assert analysis.indicators.snapshot("USDC")["fibonacci"]["currentPrice"] == 0.001
+        await bot.execution.close()
+        await bot.rpc.close()
+    with_nodes(test)
+
+def test_pool_symbols_round_trip_through_a_snapshot():
+    bot, _ = live_bot("http://replay.invalid")
+    bot.amm.add_pools([{**snapshot()[0], "address": "0x" + "22" * 20, "symbol0": "USDC", "symbol1": "WETH"}])
+    assert bot.amm.symbols == {USDC: "USDC", bot.amm.quote_token: "WETH"}
+    assert {"symbol0": "USDC", "symbol1": "WETH"}.items() <= bot.amm.snapshot()[0].items()
+
+def test_engine_client_passes_events_to_its_listeners():
+    client = EngineClient()
+    analysis = WebSocketManager()
+    client.listeners.append(analysis.on_bot_event)
+    client._on_event("price", {"token": USDC, "symbol": "USDC", "price": 0.0005, "block_number": 1})
+    assert analysis.indicators.has_data("USDC")
@@ -0,0 +1,41 @@
+import asyncio
+from decimal import Decimal
+
+from src.hft.pricing import PriceService
+
+def test_concurrent_requests_share_one_fetch():
+    calls = []
+
+    async def fetcher(tokens):
+        calls.append(sorted(tokens))
+        await asyncio.sleep(0.01)
+        return {token: Decimal(len(token)) for token in tokens}
+
+    async def scenario():
+        service = PriceService(fetcher)
+        first, second = await asyncio.gather(service.get_prices(["a", "bb"]), service.get_prices(["bb"]))
+        cached = await service.get_prices(["a"])
+        return service, first, second, cached
+
+    service, first, second, cached = asyncio.run(scenario())
+    assert calls == [["a", "bb"]]
+    assert first == {"a": Decimal(1), "bb": Decimal(2)}
+    assert second == {"bb": Decimal(2)}
+    assert cached == {"a": Decimal(1)}
+    assert service.stats["joined"] == 1 and service.stats["hits"] == 1
+
+def test_failed_tokens_are_nan_and_do_not_fail_the_rest():
+    async def fetcher(tokens):
+        if "bad" in tokens:
+            raise RuntimeError("no pool")
+        return {token: Decimal(1) for token in tokens if token != "missing"}
+
+    async def scenario():
+        service = PriceService(fetcher, max_batch=1)
+        return service, await service.get_prices(["good", "bad", "missing"])
+
+    service, prices = asyncio.run(scenario())
+    assert prices["good"] == Decimal(1)
+    assert prices["bad"].is_nan() and prices["missing"].is_nan()
+    # Failures are not cached
+    assert service.get_metrics()["cached"] == 1
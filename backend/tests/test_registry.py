@@ -0,0 +1,47 @@
+from src.websocket.registry import SubscriptionRegistry
+
+def _registry():
+    registry = SubscriptionRegistry()
+    registry.add("trades", ["trades"])
+    registry.add("eth", ["trades.ETH"])
+    registry.add("children", ["trades.*"])
+    registry.add("everything", ["*"])
+    registry.add("positions", ["positions.ETH"])
+    return registry
+
+def test_parent_channel_receives_children():
+    registry = _registry()
+    assert registry.match("trades.ETH") == {"trades", "eth", "children", "everything"}
+    assert registry.match("trades.ETH.fills") == {"trades", "eth", "children", "everything"}
+
+def test_child_wildcard_does_not_match_the_parent():
+    registry = _registry()
+    assert registry.match("trades") == {"trades", "everything"}
+
+def test_wildcard_matches_every_channel():
+    registry = _registry()
+    assert registry.match("positions.ETH") == {"positions", "everything"}
+    assert registry.match("bot_status") == {"everything"}
+
+def test_prefix_must_end_at_a_separator():
+    registry = _registry()
+    assert registry.match("tradesX") == {"everything"}
+    assert registry.match("trades.ETHX") == {"trades", "children", "everything"}
+
+def test_is_subscribed_agrees_with_match():
+    registry = _registry()
+    for channel in ("trades", "trades.ETH", "trades.BTC", "positions.ETH", "positions.BTC", "bot_status"):
+        matched = registry.match(channel)
+        for member in ("trades", "eth", "children", "everything", "positions"):
+            assert registry.is_subscribed(member, channel) == (member in matched), (member, channel)
+
+def test_remove_and_discard():
+    registry = _registry()
+    registry.remove("children", ["trades.*"])
+    registry.discard("everything")
+    assert registry.match("trades.BTC") == {"trades"}
+    assert not registry.is_subscribed("everything", "trades")
+    assert registry.channels("children") == set()
+    assert len(registry) == 4
+    # Emptied index buckets are dropped, so matching skips the wildcard pass again
+    assert not registry._wildcard
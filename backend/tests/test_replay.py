@@ -0,0 +1,133 @@
+import asyncio
+import json
+import math
+
+import pytest
+from eth_abi import encode
+from eth_utils import function_signature_to_4byte_selector
+
+from src.hft.amm import SYNC_TOPIC
+from src.hft.bot import HFTBot
+from src.hft.decoder import WETH
+from src.hft.replay import ReplayEngine, ReplaySink, SimulatedClock, import_corpus, main
+from src.hft.strategies.base import Decision, Strategy
+
+ROUTER = "0x7a250d5630b4cf539739df2c5dacb4c659f2488d"
+USDC = "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48"
+POOL = "0xb4e16d0168e52d35cacd2c6185b44281ec28c9dc"
+
+class BuyUSDC(Strategy):
+    name = "buy_usdc"
+    tokens = frozenset({USDC})
+
+    def evaluate(self, swap, context):
+        return Decision(self.name, USDC, "buy", 100.0)
+
+def swap_transaction(index: int) -> dict:
+    signature = "swapExactETHForTokens(uint256,address[],address,uint256)"
+    calldata = function_signature_to_4byte_selector(signature) + encode(
+        ["uint256", "address[]", "address", "uint256"], [1, [WETH, USDC], "0x" + "11" * 20, 2 ** 32]
+    )
+    return {
+        "hash": "0x" + f"{index:064x}",
+        "from": "0x" + "11" * 20,
+        "to": ROUTER,
+        "input": "0x" + calldata.hex(),
+        "value": hex(10 ** 18),
+        "gas": hex(200000),
+        "gasPrice": hex(10 ** 9),
+        "nonce": hex(index)
+    }
+
+def sync_log(reserve0: int, reserve1: int) -> dict:
+    data = reserve0.to_bytes(32, "big") + reserve1.to_bytes(32, "big")
+    return {"address": POOL, "topics": [SYNC_TOPIC], "data": "0x" + data.hex(), "blockNumber": "0x1"}
+
+def snapshot(reserve0: int = 2_000_000 * 10 ** 6, reserve1: int = 1000 * 10 ** 18) -> list:
+    return [{
+        "address": POOL, "kind": "v2", "token0": USDC, "token1": WETH,
+        "decimals0": 6, "decimals1": 18, "fee": 3000, "reserve0": reserve0, "reserve1": reserve1
+    }]
+
+def replay(tmp_path, blocks, pools=None, strategies=()):
+    corpus = tmp_path / "corpus.jsonl"
+    corpus.write_text("".join(json.dumps(block) + "\n" for block in blocks))
+    path = str(tmp_path / "session.dxr")
+    import_corpus(str(corpus), path, pools=pools)
+
+    clock = SimulatedClock()
+    sink = ReplaySink(clock)
+    bot = HFTBot("http://replay.invalid", persistence=sink, strategies=list(strategies), dry_run=True)
+    report = asyncio.run(ReplayEngine(bot, clock).run(path))
+    return bot, sink, report
+
+def test_pool_snapshot_and_logs_price_the_replay(tmp_path):
+    blocks = [
+        {"number": "0x1", "transactions": [swap_transaction(1)], "logs": [sync_log(1_000_000 * 10 ** 6, 1000 * 10 ** 18)]},
+        {"number": "0x2", "transactions": [swap_transaction(2)]}
+    ]
+    bot, sink, report = replay(tmp_path, blocks, pools=snapshot(), strategies=[BuyUSDC()])
+
+    assert report["pools"] == 1 and report["logs"] == 1
+    prices = [trade["price"] for trade in sink.trades if trade["type"] == "buy"]
+    # The first fill is priced from the snapshot, the second after block 1's Sync
+    assert prices == [0.0005, 0.001]
+    assert all(not math.isnan(trade["price"]) for trade in sink.trades)
+
+def test_pools_from_config_round_trip_through_a_snapshot():
+    bot = HFTBot("http://replay.invalid", dry_run=True)
+    bot.amm.add_pools(snapshot())
+    restored = HFTBot("http://replay.invalid", dry_run=True)
+    restored.amm.add_pools(json.loads(json.dumps(bot.amm.snapshot())))
+    assert restored.amm.snapshot() == bot.amm.snapshot()
+    assert float(restored.amm.price(USDC)) == 0.0005
+    assert restored.amm.decimals[USDC] == 6
+
+class BuyUSDCWithExits(Strategy):
+    name = "buy_usdc_exits"
+    tokens = frozenset({USDC})
+
+    def evaluate(self, swap, context):
+        return Decision(self.name, USDC, "buy", 100.0, profit_target=0.0009, stop_loss=0.0003)
+
+def test_paper_positions_open_on_buys_and_close_on_their_exits(tmp_path):
+    blocks = [
+        # Bought at 0.0005; the block doubles the price, past the take profit
+        {"number": "0x1", "transactions": [swap_transaction(1)], "logs": [sync_log(1_000_000 * 10 ** 6, 1000 * 10 ** 18)]},
+        # Bought at 0.001; the block drops the price to 0.00025, under the stop loss
+        {"number": "0x2", "transactions": [swap_transaction(2)], "logs": [sync_log(4_000_000 * 10 ** 6, 1000 * 10 ** 18)]}
+    ]
+    bot, sink, _ = replay(tmp_path, blocks, pools=snapshot(), strategies=[BuyUSDCWithExits()])
+
+    assert [(trade["type"], trade["price"]) for trade in sink.trades] == [
+        ("buy", 0.0005), ("sell", 0.001), ("buy", 0.001), ("sell", 0.00025)
+    ]
+    assert sink.trades[1]["pnl"] == pytest.approx(0.05)
+    assert sink.trades[3]["pnl"] == pytest.approx(-0.075)
+    assert sink.trades[3]["meta"]["pnl"] == sink.trades[3]["pnl"]
+    assert len(bot.active_positions) == 0 and not bot._closing
+    assert bot.performance.total_pnl == pytest.approx(-0.025)
+
+def test_unpriced_paper_fills_are_recorded_as_failed(tmp_path):
+    blocks = [{"number": "0x1", "transactions": [swap_transaction(1)]}]
+    bot, sink, _ = replay(tmp_path, blocks, strategies=[BuyUSDCWithExits()])
+
+    trade, = sink.trades
+    assert (trade["status"], trade["error"]) == ("failed", "unpriced")
+    assert bot.performance.total_trades == 1 and bot.performance.successful_trades == 0
+    assert len(bot.active_positions) == 0
+
+def test_trades_output_is_valid_json(tmp_path, monkeypatch, capsys):
+    # No pools: fills are unpriced (NaN)
+    corpus = tmp_path / "corpus.jsonl"
+    corpus.write_text(json.dumps({"number": "0x1", "transactions": [swap_transaction(1)]}) + "\n")
+    path, trades = str(tmp_path / "session.dxr"), tmp_path / "trades.jsonl"
+    import_corpus(str(corpus), path)
+    monkeypatch.setattr("sys.argv", ["replay", "run", path, "--strategy", "tests.test_replay:BuyUSDC", "--trades", str(trades)])
+    main()
+
+    rows = [json.loads(line, parse_constant=pytest.fail) for line in trades.read_text().splitlines()]
+    assert [(row["strategy"], row["type"], row["price"], row["status"]) for row in rows] == [
+        ("buy_usdc", "buy", None, "failed")
+    ]
+    json.loads(capsys.readouterr().out, parse_constant=pytest.fail)
@@ -0,0 +1,61 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.models.analytics import TradeRollup
+from src.models.base import Base
+from src.persistence import rollups
+
+def _trade(user, token, amount, price, status="executed", minute=0, pnl=None):
+    return {
+        "user_id": user,
+        "token_symbol": token,
+        "amount": amount,
+        "price": price,
+        "status": status,
+        "created_at": datetime(2024, 1, 1, 12, minute, 30),
+        "meta": {"pnl": pnl} if pnl is not None else {}
+    }
+
+BATCHES = [
+    [_trade("alice", "ETH", 1, 2000, pnl=50), _trade("bob", "ETH", 2, 2000, status="failed")],
+    [_trade("alice", "ETH", 1, 2100, minute=1, pnl=-20), _trade("alice", "BTC", 0.1, 40000)]
+]
+
+async def _rollups(apply):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    for batch in BATCHES:
+        async with sessions() as db:
+            delta = rollups.RollupDelta()
+            for trade in batch:
+                delta.add_trade(trade)
+            await apply(db, delta)
+            await db.commit()
+    async with sessions() as db:
+        result = await db.execute(select(TradeRollup))
+        rows = {
+            (row.dimension, row.key, row.resolution, row.bucket_start):
+                tuple(getattr(row, name) for name in rollups.METRICS)
+            for row in result.scalars()
+        }
+    await engine.dispose()
+    return rows
+
+def test_batches_add_up():
+    rows = asyncio.run(_rollups(rollups.apply))
+    day = datetime(2024, 1, 1)
+    assert rows[("user", "alice", "day", day)] == (3, 3, 2000 + 2100 + 4000, 30.0, 0.0)
+    assert rows[("token", "ETH", "hour", datetime(2024, 1, 1, 12))] == (3, 2, 2000 + 4000 + 2100, 30.0, 0.0)
+    assert rows[("user", "alice", "minute", datetime(2024, 1, 1, 12, 0))][0] == 2
+    assert rows[("user", "alice", "minute", datetime(2024, 1, 1, 12, 1))][0] == 1
+
+def test_fallback_without_upsert_matches_upsert():
+    async def apply_each(db, delta):
+        await rollups._apply_each(db, delta.rows())
+
+    assert asyncio.run(_rollups(apply_each)) == asyncio.run(_rollups(rollups.apply))
@@ -0,0 +1,41 @@
+import asyncio
+
+from src.hft.decoder import WETH, DecodedSwap
+from src.hft.strategies.base import Decision, Strategy
+from src.hft.strategies.engine import StrategyEngine
+
+USDC = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
+DAI = "0x6B175474E89094C44Da98b954EedeAC495271d0F"
+
+class Buyer(Strategy):
+    def __init__(self, name, routers=None, functions=None, tokens=None):
+        self.name = name
+        self.routers = routers
+        self.functions = functions
+        self.tokens = tokens
+
+    def evaluate(self, swap, context):
+        return Decision("whatever", swap.token_out, "buy", 1.0)
+
+def _swap(router="uniswap_v2", function="swapExactETHForTokens", path=(WETH, USDC.lower())):
+    return DecodedSwap(None, router, function, "0x", path[0], path[-1], 1, None, True, tuple(path), {})
+
+def test_checksummed_tokens_match_lowercased_paths():
+    engine = StrategyEngine([Buyer("usdc", tokens=frozenset({USDC}))])
+    assert [s.name for s in engine.route(_swap())] == ["usdc"]
+    assert engine.route(_swap(path=(WETH, DAI.lower()))) == []
+
+def test_routing_by_router_and_function():
+    engine = StrategyEngine([
+        Buyer("any"),
+        Buyer("v2", routers=frozenset({"uniswap_v2"})),
+        Buyer("exact_in", functions=frozenset({"swapExactETHForTokens"})),
+        Buyer("v3", routers=frozenset({"uniswap_v3"}))
+    ])
+    assert [s.name for s in engine.route(_swap())] == ["v2", "exact_in", "any"]
+
+def test_decisions_are_tagged_with_the_strategy():
+    engine = StrategyEngine([Buyer("usdc", tokens=frozenset({USDC}))])
+    decisions = asyncio.run(engine.evaluate(_swap()))
+    assert [decision.strategy for decision in decisions] == ["usdc"]
+    assert engine.get_metrics()["strategies"]["usdc"]["decisions"] == 1